@@ -0,0 +1,118 @@
+"""Decode-time and allocation benchmark for API payload decoding.
+
+Compares the stdlib `json` full decode (what `response.json()` did) with the codec in
+src/json_codec.py, with and without the field projections the bot uses, on synthetic
+payloads shaped like GitHub's search results and follower pages.
+
+    python benchmarks/bench_json.py --pages 50
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import json_codec  # noqa: E402
+from src.github_api import SEARCH_REPO_FIELDS, decode_logins  # noqa: E402
+from src.json_codec import decode_items  # noqa: E402
+
+
+def user_stub(i):
+    login = f"user{i}"
+    base = f"https://api.github.com/users/{login}"
+    return {
+        'login': login, 'id': 1000 + i, 'node_id': f"MDQ6VXNlcj{i:08d}", 'avatar_url': f"https://avatars.githubusercontent.com/u/{1000 + i}?v=4",
+        'gravatar_id': '', 'url': base, 'html_url': f"https://github.com/{login}", 'followers_url': f"{base}/followers",
+        'following_url': f"{base}/following{{/other_user}}", 'gists_url': f"{base}/gists{{/gist_id}}",
+        'starred_url': f"{base}/starred{{/owner}}{{/repo}}", 'subscriptions_url': f"{base}/subscriptions",
+        'organizations_url': f"{base}/orgs", 'repos_url': f"{base}/repos", 'events_url': f"{base}/events{{/privacy}}",
+        'received_events_url': f"{base}/received_events", 'type': 'User', 'site_admin': False,
+    }
+
+
+def repository(i):
+    owner = user_stub(i)
+    full_name = f"{owner['login']}/portfolio-{i}"
+    base = f"https://api.github.com/repos/{full_name}"
+    repo = {
+        'id': 5_000_000 + i, 'node_id': f"R_kgDO{i:08d}", 'name': f"portfolio-{i}", 'full_name': full_name, 'private': False,
+        'owner': owner, 'html_url': f"https://github.com/{full_name}", 'description': "My personal developer portfolio built with React",
+        'fork': False, 'url': base, 'created_at': '2026-10-01T12:00:00Z', 'updated_at': '2026-10-02T12:00:00Z',
+        'pushed_at': '2026-10-02T12:00:00Z', 'homepage': None, 'size': 1234, 'stargazers_count': 1, 'watchers_count': 1,
+        'language': 'JavaScript', 'forks_count': 0, 'open_issues_count': 0, 'master_branch': 'main', 'default_branch': 'main',
+        'score': 1.0, 'license': None, 'topics': ['portfolio', 'react'], 'visibility': 'public', 'has_issues': True,
+        'has_projects': True, 'has_wiki': True, 'has_pages': False, 'has_downloads': True, 'archived': False, 'disabled': False,
+    }
+    for name in ('forks', 'keys', 'collaborators', 'teams', 'hooks', 'issue_events', 'events', 'assignees', 'branches',
+                 'tags', 'blobs', 'git_tags', 'git_refs', 'trees', 'statuses', 'languages', 'stargazers', 'contributors',
+                 'subscribers', 'subscription', 'commits', 'git_commits', 'comments', 'issue_comment', 'contents', 'compare',
+                 'merges', 'archive', 'downloads', 'issues', 'pulls', 'milestones', 'notifications', 'labels', 'releases',
+                 'deployments'):
+        repo[f"{name}_url"] = f"{base}/{name}"
+    return repo
+
+
+def search_page(page, per_page=100):
+    items = [repository(page * per_page + i) for i in range(per_page)]
+    return json.dumps({'total_count': 100_000, 'incomplete_results': False, 'items': items}).encode('utf-8')
+
+
+def follower_page(page, per_page=100):
+    return json.dumps([user_stub(page * per_page + i) for i in range(per_page)]).encode('utf-8')
+
+
+def measure(name, pages, decode):
+    """Decodes every page, keeping what the bot keeps, and reports time and allocations."""
+    gc.collect()
+    tracemalloc.start()
+    kept = []
+    start = time.perf_counter()
+    for payload in pages:
+        kept.append(decode(payload))
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Re-time without tracemalloc, whose hooks dominate the decode time
+    start = time.perf_counter()
+    for payload in pages:
+        decode(payload)
+    untraced = time.perf_counter() - start
+    return {'case': name, 'ms_per_page': round(untraced / len(pages) * 1000, 3),
+            'traced_ms_per_page': round(elapsed / len(pages) * 1000, 3),
+            'retained_kb': round(retained / 1024, 1), 'peak_kb': round(peak / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON decoding of GitHub API payloads.")
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--json', dest='json_path', help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    search_pages = [search_page(p) for p in range(args.pages)]
+    follower_pages = [follower_page(p) for p in range(args.pages)]
+    cases = [
+        ('search: json full', search_pages, lambda c: json.loads(c)['items']),
+        (f"search: {json_codec.BACKEND} full", search_pages, lambda c: json_codec.loads(c)['items']),
+        (f"search: {json_codec.BACKEND} projected", search_pages, lambda c: decode_items(c, SEARCH_REPO_FIELDS, 'items')[0]),
+        ('followers: json full', follower_pages, lambda c: [u['login'] for u in json.loads(c)]),
+        (f"followers: {json_codec.BACKEND} logins", follower_pages, decode_logins),
+    ]
+
+    results = []
+    print(f"{'case':<28} {'ms/page':>9} {'retained KB':>12} {'peak KB':>9}")
+    for name, pages, decode in cases:
+        result = measure(name, pages, decode)
+        results.append(result)
+        print(f"{name:<28} {result['ms_per_page']:>9} {result['retained_kb']:>12} {result['peak_kb']:>9}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""End-to-end throughput benchmark for the scan, follow and unfollow pipelines.
+
+Every scenario runs in its own subprocess against the offline GitHub simulator and a
+throwaway SQLite database, so peak RSS numbers are not polluted by earlier runs.
+The bot's pacing sleeps are skipped (their requested duration is still reported);
+simulated network latency is kept.
+
+    python benchmarks/bench_pipeline.py --scales 1000 10000 --stages scan follow
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_real_sleep = asyncio.sleep
+
+SCALES = [1000, 10000, 100000]
+STAGES = ['scan', 'follow', 'unfollow']
+
+
+def bench_settings(scale):
+    return {
+        'delays': {'action_min': 10, 'action_max': 90, 'rate_limit_sleep': 900},
+        'limits': {'max_scan': scale, 'max_follow': scale, 'max_unfollow': scale, 'rate_limit_buffer': 100},
+    }
+
+
+def bench_criteria():
+    return {
+        'repository_keywords': ['portfolio-website', 'developer-portfolio', 'portfolio', 'resume', 'cv'],
+        'target_repos': [f"org{i}/repo{i}" for i in range(10)],
+        'negative_signals': {'max_followers': 100, 'max_following': 500, 'max_inactivity_days': 180,
+                             'seniority_keywords': ['google', 'meta']},
+    }
+
+
+def _seed_targeted_users(database, count):
+    """Bulk inserts `count` targeted users so the follow stage has work to do."""
+    rows = [{'username': f"user{i}", 'github_id': 1_000_000 + i, 'status': 'targeted', 'score': float(i % 10)}
+            for i in range(count)]
+    with database.engine.begin() as conn:
+        conn.execute(database.User.__table__.insert(), rows)
+
+
+def run_scenario(stage, scale, latency, log_level, result_queue):
+    """Runs one stage at one scale and puts its measurements on `result_queue`."""
+    from sqlalchemy import event
+    from src import database
+    from src.github_api import GithubAPI
+    from src.metrics import metrics_tracker
+    from src.simulator import FakeGitHub
+    import src.scanner as scanner
+    import src.actions as actions
+
+    logging.basicConfig(level=log_level)
+    os.environ.setdefault('GITHUB_PAT', 'benchmark-token')
+    workdir = tempfile.mkdtemp(prefix='reach-bench-')
+    os.chdir(workdir)
+    engine = database.use_database(os.path.join(workdir, 'reach.db'))
+    database.initialize_database()
+
+    db_writes = 0
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_writes(conn, cursor, statement, parameters, context, executemany):
+        nonlocal db_writes
+        if statement.lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            db_writes += len(parameters) if executemany else 1
+
+    if stage == 'scan':
+        sim = FakeGitHub(num_users=scale, search_total=scale, latency=latency)
+    elif stage == 'follow':
+        sim = FakeGitHub(num_users=scale, latency=latency)
+        _seed_targeted_users(database, scale)
+    else:
+        sim = FakeGitHub(num_users=scale, following=scale, followers=scale // 3, latency=latency)
+    GithubAPI.transport = sim.transport()
+
+    requested_sleep = 0.0
+
+    async def skip_sleep(delay, result=None):
+        nonlocal requested_sleep
+        requested_sleep += delay
+        return await _real_sleep(0, result)
+
+    config = (bench_settings(scale), bench_criteria())
+    entry = {'scan': scanner.scan_for_users, 'follow': actions.follow_users, 'unfollow': actions.unfollow_users}[stage]
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    with patch('src.scanner.load_config', return_value=config), \
+         patch('src.actions.load_config', return_value=config), \
+         patch('asyncio.sleep', skip_sleep):
+        asyncio.run(entry(dry_run=False))
+    wall = time.perf_counter() - start_wall
+    cpu = time.process_time() - start_cpu
+
+    if stage == 'scan':
+        users = metrics_tracker.users_processed
+    elif stage == 'follow':
+        users = metrics_tracker.users_followed
+    else:
+        users = metrics_tracker.users_unfollowed
+
+    result_queue.put({
+        'stage': stage,
+        'scale': scale,
+        'users': users,
+        'scheduled': metrics_tracker.users_scheduled,
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'users_per_sec': round(users / wall, 1) if wall else 0.0,
+        'requests': sim.total_requests,
+        'requests_per_user': round(sim.total_requests / users, 2) if users else None,
+        'requests_per_scheduled_user': round(sim.total_requests / metrics_tracker.users_scheduled, 2) if metrics_tracker.users_scheduled else None,
+        'db_writes': db_writes,
+        'db_writes_per_sec': round(db_writes / wall, 1) if wall else 0.0,
+        'skipped_sleep_seconds': round(requested_sleep, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'requests_by_route': dict(sim.requests),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot pipelines against the offline GitHub simulator.")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--stages', choices=STAGES, nargs='+', default=STAGES)
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds of latency per request.")
+    parser.add_argument('--log-level', default='ERROR', help="Log level for the bot inside each scenario.")
+    parser.add_argument('--json', dest='json_path', help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    print(f"{'stage':<9} {'scale':>7} {'users':>7} {'users/s':>9} {'req/user':>9} {'req/sched':>10} {'db w/s':>9} {'rss MB':>7} {'wall s':>8}")
+    for stage in args.stages:
+        for scale in args.scales:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_scenario, args=(stage, scale, args.latency, args.log_level, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            results.append(result)
+            print(f"{stage:<9} {scale:>7} {result['users']:>7} {result['users_per_sec']:>9} "
+                  f"{str(result['requests_per_user']):>9} {str(result['requests_per_scheduled_user']):>10} {result['db_writes_per_sec']:>9} "
+                  f"{result['peak_rss_mb']:>7} {result['wall_seconds']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,12 @@ import asyncio
 import random
 from datetime import datetime, timedelta, timezone
 from .github_api import GithubAPI
-from .database import update_user_status, get_users_to_check, count_followed_users, get_users_by_status_and_score, get_followed_users
+from .database import update_user_status, get_users_to_check, count_followed_users, get_users_by_status_and_score, get_followed_users, select_unfollow_candidates, sync_followers
 from .config_loader import load_config
 from .metrics import metrics_tracker
 from .scoring import UserValidator
+from .db_executor import run_db
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +17,7 @@ async def follow_users(dry_run=False):
     settings, _ = load_config()
     max_follow_per_run = settings['limits'].get('max_follow', 350)
     
-    users_to_follow = get_users_by_status_and_score('targeted', min_score=0, limit=max_follow_per_run)
+    users_to_follow = await run_db(get_users_by_status_and_score, 'targeted', min_score=0, limit=max_follow_per_run)
 
     if not users_to_follow:
         logger.info("No users scheduled for following in this run.")
@@ -35,31 +37,33 @@ async def follow_users(dry_run=False):
             batch_users = users_to_follow[user_index:end_index]
             
             # Log the batch in the desired format
-            usernames_in_batch = [user['username'] for user in batch_users]
+            usernames_in_batch = [user.username for user in batch_users]
             logger.info(f'batch of {len(usernames_in_batch)}: {", ".join(usernames_in_batch)}')
 
-            for user_dict in batch_users:
+            for user in batch_users:
                 if followed_today_count >= max_follow_per_run:
                     logger.info(f"Daily follow limit of {max_follow_per_run} reached.")
                     break
 
-                username = user_dict['username']
+                username = user.username
                 
-                if dry_run:
-                    logger.info(f"[DRY-RUN] Would follow user: {username}", extra={'props': {"username": username, "dry_run": True}})
-                    update_user_status(username, 'skipped')
-                    followed_today_count += 1
-                    continue
-
-                success = await api.follow_user(username)
-                if success:
-                    logger.info(f"Successfully followed user: {username}", extra={'props': {"username": username}})
-                    update_user_status(username, 'followed')
-                    metrics_tracker.users_followed += 1
-                    followed_today_count += 1
-                else:
-                    logger.error(f"Failed to follow user: {username}", extra={'props': {"username": username}})
-                    update_user_status(username, 'skipped')
+                with tracer.span('follow', candidate=username, score=user.score) as span:
+                    if dry_run:
+                        logger.info(f"[DRY-RUN] Would follow user: {username}", extra={'props': {"username": username, "dry_run": True}})
+                        await run_db(update_user_status, username, 'skipped')
+                        followed_today_count += 1
+                        continue
+
+                    success = await api.follow_user(username)
+                    span.set(followed=success)
+                    if success:
+                        logger.info(f"Successfully followed user: {username}", extra={'props': {"username": username}})
+                        await run_db(update_user_status, username, 'followed')
+                        metrics_tracker.users_followed += 1
+                        followed_today_count += 1
+                    else:
+                        logger.error(f"Failed to follow user: {username}", extra={'props': {"username": username}})
+                        await run_db(update_user_status, username, 'skipped')
 
             user_index += len(batch_users)
 
@@ -96,35 +100,28 @@ async def unfollow_users(dry_run=False):
 
         logger.info(f"Fetching users followed by {my_username} from GitHub...")
         all_following = await api.get_following(my_username)
-        all_following_set = set(all_following)
-        logger.info(f"Bot currently follows {len(all_following_set)} users.")
+        logger.info(f"Bot currently follows {len(all_following)} users.")
 
         logger.info("Fetching bot's current followers to identify who to exclude (those following back).")
         my_followers = await api.get_my_followers()
-        my_followers_set = set(my_followers)
-        logger.info(f"Bot has {len(my_followers_set)} followers.")
-
-        logger.info("Fetching all usernames in database to exclude them from the unfollow list.")
-        from .database import get_all_usernames_in_db
-        usernames_in_db = get_all_usernames_in_db()
-        logger.info(f"There are {len(usernames_in_db)} usernames in the database.")
+        logger.info(f"Bot has {len(my_followers)} followers.")
+        # The follower list is already here, so keep the follow-back snapshot current for free
+        if my_followers and not dry_run:
+            log_follower_changes(await run_db(sync_followers, my_followers))
 
         # Candidates for unfollowing are:
         # Those I follow who:
         # 1. Don't follow me back.
         # 2. Are not in the database.
-        candidates = [user for user in all_following_set if user not in my_followers_set and user not in usernames_in_db]
-        
-        logger.info(f"Identified {len(candidates)} potential candidates for unfollowing (not in DB and not following back).")
+        # The anti-join and the random sample both run inside SQLite.
+        users_to_unfollow, candidate_count = await run_db(select_unfollow_candidates, all_following, my_followers, limit)
+
+        logger.info(f"Identified {candidate_count} potential candidates for unfollowing (not in DB and not following back).")
 
-        if not candidates:
+        if not users_to_unfollow:
             logger.info("No candidates for unfollowing found (either all follow back or all are in the database).")
             return
 
-        # Pick random candidates up to the limit
-        num_to_unfollow = min(len(candidates), limit)
-        users_to_unfollow = random.sample(candidates, num_to_unfollow)
-
         logger.info(f"Starting unfollow sequence for {len(users_to_unfollow)} random users.")
 
         unfollowed_count = 0
@@ -134,17 +131,43 @@ async def unfollow_users(dry_run=False):
                 unfollowed_count += 1
                 continue
 
-            success = await api.unfollow_user(username)
-            if success:
-                logger.info(f"Successfully unfollowed user: {username}", extra={'props': {"username": username}})
-                update_user_status(username, 'unfollowed')
-                metrics_tracker.users_unfollowed += 1
-                unfollowed_count += 1
-            else:
-                logger.error(f"Failed to unfollow user: {username}", extra={'props': {"username": username}})
+            with tracer.span('unfollow', candidate=username) as span:
+                success = await api.unfollow_user(username)
+                span.set(unfollowed=success)
+                if success:
+                    logger.info(f"Successfully unfollowed user: {username}", extra={'props': {"username": username}})
+                    await run_db(update_user_status, username, 'unfollowed')
+                    metrics_tracker.users_unfollowed += 1
+                    unfollowed_count += 1
+                else:
+                    logger.error(f"Failed to unfollow user: {username}", extra={'props': {"username": username}})
 
             # Use shorter interval for unfollowing to speed up 200 unfollows, but still be safe
             sleep_duration = random.uniform(0.5, 1.5) 
             await asyncio.sleep(sleep_duration)
 
         logger.info(f"Unfollow sequence complete. Total unfollowed: {unfollowed_count}")
+
+def log_follower_changes(counts):
+    if counts:
+        logger.info(f"Follower snapshot: {counts['followers']} followers, {counts['new']} new, {counts['lost']} lost. "
+                    f"{counts['followed_back']} followed users followed back, {counts['stopped_following']} stopped; "
+                    f"{counts['checked']} followed users checked.")
+
+async def track_follow_backs(dry_run=False):
+    """Detects follow-backs by diffing the bot's follower list against the stored snapshot.
+    One paginated follower fetch covers every followed user."""
+    async with GithubAPI() as api:
+        logger.info("Fetching the bot's followers to detect follow-backs...")
+        my_followers = await api.get_my_followers(strict=True)
+        if my_followers is None:
+            # Followers on the missing pages would be recorded as lost
+            logger.warning("Follower list is incomplete. Keeping the previous follower snapshot.")
+            return None
+        if not my_followers and await run_db(count_followed_users):
+            # An empty list is far more likely a failed fetch than every follower leaving at once
+            logger.warning("Follower list came back empty. Keeping the previous follower snapshot.")
+            return None
+        counts = await run_db(sync_followers, my_followers, dry_run=dry_run)
+        log_follower_changes(counts)
+        return counts
@@ -0,0 +1,154 @@
+"""Plans a run's API spending before it starts.
+
+`plan_run` reads `/rate_limit` once, estimates what every stage of the run will cost and
+splits the remaining core budget between them, keeping `budget.reserve` requests
+untouched so `_request` never falls into its long sleep before the window resets:
+
+* unfollow: pages of the bot's following and follower lists, plus one call per unfollow
+* track: pages of the follower list
+* follow: one call per follow
+* scan: pages of the following list, discovery (target repos and public feed, from
+  earlier runs) and validation, i.e. candidates times the per-candidate cost seen before
+
+The follow-up stages are planned first, and the scan gets the rest. When it does not fit,
+the number of candidates validated is capped (`RunPlan.max_candidates`) and the others
+stay queued for the next run. Stages record what they actually spent, and
+`RunPlan.log_report` compares the two at the end.
+"""
+import logging
+import math
+import time
+
+from .database import get_stage_costs, count_users_with_status
+from .db_executor import run_db
+from .github_api import GithubAPI
+from .search_planner import merge_keywords, MAX_TERMS_PER_QUERY
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
+
+def pages(count):
+    """Requests needed to list `count` users, 100 per page."""
+    return max(1, math.ceil((count or 0) / PAGE_SIZE))
+
+
+class RunPlan:
+    def __init__(self, core_remaining, core_reset, search_limit, reserve):
+        self.core_remaining = core_remaining
+        self.core_reset = core_reset
+        self.search_limit = search_limit
+        self.reserve = reserve
+        self.planned = {}
+        self.actual = {}
+        self.units = {}
+        self.max_candidates = None
+
+    @property
+    def available(self):
+        return max(0, self.core_remaining - self.reserve)
+
+    def plan(self, stage, core, search=0):
+        self.planned[stage] = {'core': int(math.ceil(core)), 'search': int(math.ceil(search))}
+
+    def record(self, stage, counter, units=None):
+        """Stores what a stage spent, from a metrics.ApiCallCounter."""
+        self.actual[stage] = {'core': counter.core_calls, 'search': counter.search_calls}
+        if units is not None:
+            self.units[stage] = units
+
+    def history_costs(self):
+        """This run's scan costs in the shape `record_stage_costs` stores."""
+        if 'scan' not in self.actual or 'scan.validate' not in self.actual:
+            return {}
+        scan, validate = self.actual['scan'], self.actual['scan.validate']
+        return {
+            'scan.discovery': {'core_calls': scan['core'] - validate['core'], 'search_calls': scan['search'] - validate['search']},
+            'scan.validate': {'core_calls': validate['core'], 'search_calls': validate['search'],
+                              'units': self.units.get('scan.validate', 0)},
+        }
+
+    def log_report(self):
+        logger.info(f"API budget: {self.core_remaining} core requests left at the start, {self.reserve} kept in reserve.")
+        for stage, planned in self.planned.items():
+            actual = self.actual.get(stage)
+            spent = f"{actual['core']} core / {actual['search']} search" if actual else "not run"
+            logger.info(f"Stage {stage}: planned {planned['core']} core / {planned['search']} search, actual {spent}.")
+        total = sum(actual['core'] for stage, actual in self.actual.items() if stage in self.planned)
+        if total > self.available:
+            logger.warning(f"The run spent {total} core requests, more than the {self.available} it had to spare.")
+
+
+def estimate_scan(settings, criteria, history, following):
+    """Returns (fixed core cost, core cost per candidate, expected candidates, search cost)."""
+    discovery = history.get('scan.discovery')
+    validate = history.get('scan.validate')
+    budget = settings.get('budget', {})
+    max_follow = settings.get('limits', {}).get('max_follow', 350)
+    if discovery:
+        discovery_core, search = discovery['core_calls'], discovery['search_calls']
+    else:
+        discovery_core = len(criteria.get('target_repos', [])) + settings.get('public_events', {}).get('max_pages', 3)
+        queries = len(merge_keywords(criteria.get('repository_keywords', ['portfolio']),
+                                     settings.get('search', {}).get('max_terms_per_query', MAX_TERMS_PER_QUERY)))
+        search = queries * budget.get('default_search_pages_per_query', 3)
+    if validate and validate['units']:
+        per_candidate = max(1.0, validate['core_calls'] / validate['units'])
+        expected = validate['units']
+    else:
+        per_candidate = budget.get('default_candidate_cost', 6)
+        expected = max_follow * 3
+    # The authenticated user and its following list come first
+    fixed = 1 + pages(following) + discovery_core
+    return fixed, per_candidate, expected, search
+
+
+async def plan_run(settings, criteria, stages, dry_run=False):
+    """Builds the RunPlan for `stages` (names out of 'scan', 'unfollow', 'track', 'follow').
+    Returns None if the rate limit or the bot's profile cannot be read."""
+    budget = settings.get('budget', {})
+    limits = settings.get('limits', {})
+    async with GithubAPI() as api:
+        resources = await api.get_rate_limit()
+        profile = await api.get_authenticated_profile()
+    if not resources or not profile:
+        logger.warning("Could not read the rate limit or the bot's profile. Running without an API budget plan.")
+        return None
+
+    core, search = resources.get('core', {}), resources.get('search', {})
+    plan = RunPlan(core.get('remaining', 0), core.get('reset'), search.get('limit', 30),
+                   budget.get('reserve', limits.get('rate_limit_buffer', 100) + 50))
+    following, followers = profile.get('following', 0), profile.get('followers', 0)
+
+    max_unfollow = limits.get('max_unfollow', 200)
+    max_follow = limits.get('max_follow', 350)
+    if 'unfollow' in stages and max_unfollow > 0:
+        plan.plan('unfollow', 1 + pages(following) + pages(followers) + (0 if dry_run else max_unfollow))
+    if 'track' in stages:
+        plan.plan('track', pages(followers))
+    if 'follow' in stages:
+        targeted = await run_db(count_users_with_status, 'targeted')
+        expected_targets = targeted + (max_follow if 'scan' in stages else 0)
+        plan.plan('follow', 0 if dry_run else min(max_follow, expected_targets))
+
+    if 'scan' in stages:
+        history = await run_db(get_stage_costs)
+        fixed, per_candidate, expected, search_cost = estimate_scan(settings, criteria, history, following)
+        left = plan.available - sum(p['core'] for p in plan.planned.values())
+        plan.max_candidates = max(0, int((left - fixed) // per_candidate))
+        candidates = min(expected, plan.max_candidates)
+        plan.plan('scan', fixed + candidates * per_candidate, search_cost)
+        if plan.max_candidates < expected:
+            logger.warning(f"API budget allows validating {plan.max_candidates} of about {expected:.0f} expected candidates "
+                           f"({per_candidate:.1f} requests each). The rest stay queued for the next run.")
+
+    total = sum(p['core'] for p in plan.planned.values())
+    resets_in = max(0, (plan.core_reset or time.time()) - time.time()) / 60
+    logger.info(f"API budget plan: {total} of {plan.available} spare core requests (window resets in {resets_in:.0f} min); "
+                + ", ".join(f"{stage} {p['core']}" for stage, p in plan.planned.items()) + ".")
+    search_pages = sum(p['search'] for p in plan.planned.values())
+    if search_pages:
+        # The search bucket refills every minute, so searches cost time rather than budget
+        logger.info(f"Planned {search_pages} search requests, about {search_pages / max(1, plan.search_limit):.0f} min of search rate limit.")
+    return plan
@@ -0,0 +1,73 @@
+import heapq
+import itertools
+import logging
+
+from .database import enqueue_candidates, lease_candidates, complete_candidates, prune_candidates, count_queued_candidates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE_PRIORITY = {'repo': 3.0, 'public_events': 2.0, 'keyword': 1.0}
+
+
+def source_kind(source):
+    """Returns the kind of a source tag, e.g. 'keyword' for 'keyword:portfolio'."""
+    return (source or '').split(':', 1)[0]
+
+
+class CandidateQueue:
+    """Queue of discovered users waiting for validation.
+
+    Backed by the `candidates` table so that candidates left over when a run hits its
+    follow limit, or is killed, carry over to the next run. In dry-run mode the queue
+    lives in memory only and the database is not touched.
+    """
+
+    def __init__(self, settings=None, dry_run=False):
+        queue_settings = (settings or {}).get('queue', {})
+        self.dry_run = dry_run
+        self.lease_seconds = queue_settings.get('lease_seconds', 600)
+        self.max_attempts = queue_settings.get('max_attempts', 3)
+        self.max_age_days = queue_settings.get('max_age_days', 14)
+        self.source_priority = {**DEFAULT_SOURCE_PRIORITY, **queue_settings.get('source_priority', {})}
+        self._heap = []
+        self._queued = set()
+        self._counter = itertools.count()
+
+    def priority(self, source):
+        return float(self.source_priority.get(source_kind(source), 0.0))
+
+    def prune(self):
+        if self.dry_run:
+            return 0
+        removed = prune_candidates(self.max_attempts, self.max_age_days)
+        if removed:
+            logger.info(f"Dropped {removed} stale or repeatedly failing candidates from the queue.")
+        return removed
+
+    def enqueue(self, candidates):
+        """Queues {username: source} candidates. Returns the number submitted."""
+        if self.dry_run:
+            for username, source in candidates.items():
+                if username not in self._queued:
+                    self._queued.add(username)
+                    heapq.heappush(self._heap, (-self.priority(source), next(self._counter), username, source))
+            return len(candidates)
+        priorities = {username: self.priority(source) for username, source in candidates.items()}
+        return enqueue_candidates(candidates, priorities)
+
+    def lease(self, limit):
+        """Takes up to `limit` candidates in priority order as (username, source) pairs."""
+        if self.dry_run:
+            batch = []
+            while self._heap and len(batch) < limit:
+                _, _, username, source = heapq.heappop(self._heap)
+                batch.append((username, source))
+            return batch
+        return lease_candidates(limit, self.lease_seconds, self.max_attempts)
+
+    def complete(self, usernames):
+        if not self.dry_run:
+            complete_candidates(usernames)
+
+    def __len__(self):
+        return len(self._heap) if self.dry_run else count_queued_candidates()
@@ -0,0 +1,237 @@
+"""Record and replay GitHub API traffic for deterministic performance regression runs.
+
+A cassette is a gzip-compressed NDJSON file: one header line followed by one line per
+request/response pair, including headers, the raw response body and timing.
+
+    python -m src.main --action all --record run.cassette.jsonl.gz
+    python -m src.main --action all --replay run.cassette.jsonl.gz --record after.cassette.jsonl.gz
+    python -m src.cassette compare run.cassette.jsonl.gz after.cassette.jsonl.gz
+"""
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+REDACTED_HEADERS = {'authorization', 'cookie', 'set-cookie'}
+
+# Captured at import time so replayed latency is not affected by patched sleeps.
+_real_sleep = asyncio.sleep
+
+# Collapses concrete URLs into endpoint templates for per-endpoint request counts.
+ENDPOINT_PATTERNS = [
+    (re.compile(r'^/users/[^/]+/(following|followers|repos|starred|orgs|events)$'), r'/users/{user}/\1'),
+    (re.compile(r'^/users/[^/]+$'), '/users/{user}'),
+    (re.compile(r'^/user/following/[^/]+$'), '/user/following/{user}'),
+    (re.compile(r'^/repos/[^/]+/[^/]+/(events|commits|readme)$'), r'/repos/{owner}/{repo}/\1'),
+]
+
+
+def endpoint_template(method, url):
+    """Returns e.g. 'GET /users/{user}' for 'GET https://api.github.com/users/octocat'."""
+    path = httpx.URL(url).path
+    for pattern, template in ENDPOINT_PATTERNS:
+        if pattern.match(path):
+            path = pattern.sub(template, path)
+            break
+    return f"{method} {path}"
+
+
+# Search qualifiers that depend on when the run happened, e.g. the created: window that
+# search_window() stamps to the second. They are left out when replayed requests are matched.
+VOLATILE_QUALIFIERS = re.compile(r'\bcreated:\S+')
+
+
+def match_key(method, url):
+    """The key a replayed request is matched on: method and URL, with the volatile search
+    qualifiers in `q` replaced by a placeholder."""
+    url = httpx.URL(url)
+    query = url.params.get('q')
+    if query is not None:
+        url = url.copy_set_param('q', VOLATILE_QUALIFIERS.sub(lambda m: m.group(0).split(':', 1)[0] + ':*', query))
+    return method, str(url)
+
+
+def _headers_to_list(headers):
+    return [[k, '<redacted>' if k.lower() in REDACTED_HEADERS else v] for k, v in headers.multi_items()]
+
+
+def read_cassette(path):
+    """Yields the header dict followed by each recorded interaction, streaming from disk."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Wraps another transport and appends every interaction to a cassette file.
+
+    The transport is shared by every GithubAPI client of a run, so `aclose()` only
+    flushes; call `close()` once at the end of the run to finish the file.
+    """
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.inner = transport
+        self.owns_inner = transport is None
+        self.started = time.monotonic()
+        self.count = 0
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self._write({'cassette': CASSETTE_VERSION, 'recorded_at': datetime.now(timezone.utc).isoformat()})
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    async def handle_async_request(self, request):
+        if self.inner is None:
+            self.inner = httpx.AsyncHTTPTransport()
+        started = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        # Keep the body exactly as sent on the wire, so content-encoding headers stay valid
+        try:
+            raw = b''.join([chunk async for chunk in response.aiter_raw()])
+        except httpx.StreamConsumed:
+            # In-memory transports (e.g. httpx.MockTransport) hand back already-read responses
+            raw = response.content
+        await response.aclose()
+        elapsed = time.monotonic() - started
+
+        request_body = request.content if request.method != 'GET' else b''
+        self._write({
+            'offset': round(started - self.started, 6),
+            'elapsed': round(elapsed, 6),
+            'method': request.method,
+            'url': str(request.url),
+            'request_headers': _headers_to_list(request.headers),
+            'request_body': base64.b64encode(request_body).decode('ascii') if request_body else None,
+            'status': response.status_code,
+            'headers': _headers_to_list(response.headers),
+            'body': base64.b64encode(raw).decode('ascii'),
+        })
+        self.count += 1
+        return httpx.Response(response.status_code, headers=response.headers, content=raw,
+                              request=request, extensions=response.extensions)
+
+    async def aclose(self):
+        self.file.flush()
+        if self.owns_inner and self.inner is not None:
+            await self.inner.aclose()
+            self.inner = None
+
+    def close(self):
+        """Finishes the cassette file."""
+        if not self.file.closed:
+            self.file.close()
+            logger.info(f"Recorded {self.count} API interactions to {self.path}.")
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves responses from a cassette instead of the network.
+
+    Requests are matched on method and full URL, ignoring time-dependent search
+    qualifiers (see `match_key`); repeated requests with the same key are answered in
+    recorded order, so a scan whose `created:` windows move with the clock still replays. `latency_scale` replays each response after its original
+    latency multiplied by the scale (0 disables the delay). Requests that are not in the
+    cassette get a 404 and are counted in `misses`.
+    """
+
+    def __init__(self, path, latency_scale=1.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.interactions = defaultdict(deque)
+        self.served = Counter()
+        self.misses = Counter()
+        entries = read_cassette(path)
+        header = next(entries, {})
+        if header.get('cassette') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette format in {path}: {header}")
+        for entry in entries:
+            self.interactions[match_key(entry['method'], entry['url'])].append(entry)
+
+    async def handle_async_request(self, request):
+        key = match_key(request.method, str(request.url))
+        queue = self.interactions.get(key)
+        if not queue:
+            self.misses[endpoint_template(*key)] += 1
+            logger.warning(f"Replay miss: {request.method} {request.url}")
+            return httpx.Response(404, json={'message': 'Not recorded in cassette'}, request=request)
+
+        entry = queue.popleft() if len(queue) > 1 else queue[0]
+        self.served[endpoint_template(*key)] += 1
+        if self.latency_scale:
+            await _real_sleep(entry['elapsed'] * self.latency_scale)
+        return httpx.Response(entry['status'], headers=entry['headers'],
+                              content=base64.b64decode(entry['body']), request=request)
+
+
+def summarize(path):
+    """Returns request counts per endpoint, total requests and recorded wall time."""
+    endpoints = Counter()
+    wall = 0.0
+    total = 0
+    for entry in read_cassette(path):
+        if 'method' not in entry:
+            continue
+        total += 1
+        endpoints[endpoint_template(entry['method'], entry['url'])] += 1
+        wall = max(wall, entry['offset'] + entry['elapsed'])
+    return {'requests': total, 'wall_seconds': round(wall, 3), 'endpoints': dict(endpoints)}
+
+
+def compare(before_path, after_path):
+    """Compares two cassettes and returns (summary_before, summary_after, per-endpoint deltas)."""
+    before = summarize(before_path)
+    after = summarize(after_path)
+    deltas = {}
+    for endpoint in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        delta = after['endpoints'].get(endpoint, 0) - before['endpoints'].get(endpoint, 0)
+        if delta:
+            deltas[endpoint] = delta
+    return before, after, deltas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and compare recorded API cassettes.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary_parser = sub.add_parser('summary', help="Show request counts per endpoint.")
+    summary_parser.add_argument('path')
+    compare_parser = sub.add_parser('compare', help="Compare request counts and wall time of two cassettes.")
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--max-increase', type=float, default=0.0,
+                                help="Fail if total requests grow by more than this fraction.")
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        summary = summarize(args.path)
+        print(f"{summary['requests']} requests, {summary['wall_seconds']}s recorded wall time")
+        for endpoint, count in sorted(summary['endpoints'].items(), key=lambda item: -item[1]):
+            print(f"{count:>8}  {endpoint}")
+        return 0
+
+    before, after, deltas = compare(args.before, args.after)
+    print(f"requests: {before['requests']} -> {after['requests']}")
+    print(f"wall time: {before['wall_seconds']}s -> {after['wall_seconds']}s")
+    for endpoint, delta in deltas.items():
+        print(f"{delta:>+8}  {endpoint}")
+    allowed = before['requests'] * (1 + args.max_increase)
+    if after['requests'] > allowed:
+        print(f"Regression: {after['requests']} requests exceeds the allowed {allowed:.0f}.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
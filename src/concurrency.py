@@ -0,0 +1,125 @@
+"""Adaptive limit on concurrent GitHub API requests.
+
+`AIMDLimiter` works like TCP congestion control. Once per round of `limit` completed
+requests it raises the limit by `increase`, as long as the window's p95 latency stays
+within `latency_tolerance` times the best p95 seen so far and few requests fail. A
+secondary rate limit response (403/429) or a latency spike cuts the limit by
+`decrease_factor`, at most once per `cooldown` seconds so that one burst of throttled
+responses counts as one congestion event.
+
+    await limiter.acquire()
+    try:
+        response = await client.request(...)
+    finally:
+        await limiter.release(latency, outcome)  # 'ok', 'throttled' or 'error'
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from .metrics import metrics_tracker
+
+logger = logging.getLogger(__name__)
+
+OK = 'ok'
+THROTTLED = 'throttled'
+ERROR = 'error'
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(fraction * len(ordered))) - 1)]
+
+
+class AIMDLimiter:
+    def __init__(self, initial=8, min_limit=1, max_limit=64, increase=1, decrease_factor=0.5, window=50,
+                 latency_tolerance=2.0, baseline_drift=0.05, max_error_rate=0.05, cooldown=5.0, min_samples=10):
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.baseline_drift = baseline_drift
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.in_flight = 0
+        self.baseline_p95 = None
+        self._latencies = deque(maxlen=window)
+        self._errors = deque(maxlen=window)
+        self._since_adjust = 0
+        self._last_decrease = -math.inf
+        self._condition = asyncio.Condition()
+        metrics_tracker.set_api_concurrency(int(self.limit))
+
+    @classmethod
+    def from_settings(cls, settings):
+        concurrency = settings.get('concurrency', {})
+        return cls(
+            initial=concurrency.get('initial', 8),
+            min_limit=concurrency.get('min', 1),
+            max_limit=concurrency.get('max', 64),
+            increase=concurrency.get('increase', 1),
+            decrease_factor=concurrency.get('decrease_factor', 0.5),
+            window=concurrency.get('window', 50),
+            latency_tolerance=concurrency.get('latency_tolerance', 2.0),
+            max_error_rate=concurrency.get('max_error_rate', 0.05),
+            cooldown=concurrency.get('cooldown_seconds', 5.0),
+        )
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency, outcome=OK):
+        async with self._condition:
+            self.in_flight -= 1
+            self._observe(latency, outcome)
+            self._condition.notify_all()
+
+    def _observe(self, latency, outcome):
+        if outcome == THROTTLED:
+            metrics_tracker.api_throttled += 1
+            self._decrease("secondary rate limit")
+            return
+        if latency is not None:
+            self._latencies.append(latency)
+        self._errors.append(outcome == ERROR)
+        self._since_adjust += 1
+        if self._since_adjust < max(int(self.limit), 1) or len(self._latencies) < self.min_samples:
+            return
+
+        # One adjustment per round of `limit` completed requests
+        self._since_adjust = 0
+        p95 = percentile(self._latencies, 0.95)
+        if self.baseline_p95 is None:
+            self.baseline_p95 = p95
+        if p95 > self.baseline_p95 * self.latency_tolerance:
+            self._decrease(f"p95 latency {p95 * 1000:.0f}ms over baseline {self.baseline_p95 * 1000:.0f}ms")
+            return
+        # Let the baseline follow slow changes in the request mix, but not sudden spikes
+        self.baseline_p95 = min(p95, self.baseline_p95 * (1 + self.baseline_drift))
+        error_rate = sum(self._errors) / len(self._errors)
+        if error_rate <= self.max_error_rate and self.limit < self.max_limit:
+            self._set_limit(min(self.max_limit, self.limit + self.increase))
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._since_adjust = 0
+        # Samples from before the cut describe the old load
+        self._latencies.clear()
+        self._errors.clear()
+        previous = int(self.limit)
+        self._set_limit(max(self.min_limit, self.limit * self.decrease_factor))
+        logger.warning(f"API concurrency cut from {previous} to {int(self.limit)} ({reason}).")
+
+    def _set_limit(self, limit):
+        self.limit = float(limit)
+        metrics_tracker.set_api_concurrency(int(self.limit))
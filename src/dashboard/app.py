@@ -1,15 +1,47 @@
-from flask import Flask, jsonify, render_template
+from flask import Flask, jsonify, render_template, request, Response, stream_with_context
 import sys
 import os
+import csv
+import io
+import json
+from datetime import datetime
 
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_dashboard_data, Session, User, Log
+from database import get_dashboard_data, get_users_page, iter_users, user_columns, USER_COLUMNS, Session, User, Log
 from config_loader import load_config
 
 app = Flask(__name__)
 
+MAX_PAGE_SIZE = 500
+
+def _serialize_value(value):
+    """Converts a database value into a JSON/CSV friendly value."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+def _parse_int(value):
+    return int(value) if value not in (None, '') else None
+
+def _parse_user_query(args):
+    """Parses the filter and projection query parameters shared by the user APIs."""
+    statuses = [s for s in args.get('status', '').split(',') if s]
+    columns = [c for c in args.get('fields', '').split(',') if c] or USER_COLUMNS
+    user_columns(columns)  # Raises ValueError on unknown names
+    filters = {
+        'statuses': statuses,
+        'min_followers': _parse_int(args.get('min_followers')),
+        'max_followers': _parse_int(args.get('max_followers')),
+        'followed_after': _parse_datetime(args.get('followed_after')),
+        'followed_before': _parse_datetime(args.get('followed_before')),
+    }
+    return columns, filters
+
 @app.route('/')
 def index():
     settings, criteria = load_config()
@@ -23,5 +55,53 @@ def api_data():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/users')
+def api_users():
+    """Keyset-paginated user browser. Pass `cursor` from the previous page to continue."""
+    try:
+        columns, filters = _parse_user_query(request.args)
+        limit = min(max(_parse_int(request.args.get('limit')) or 50, 1), MAX_PAGE_SIZE)
+        page = get_users_page(cursor=request.args.get('cursor'), limit=limit, columns=columns, **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    page['users'] = [{k: _serialize_value(v) for k, v in user.items()} for user in page['users']]
+    return jsonify(page)
+
+@app.route('/api/users/export')
+def api_users_export():
+    """Streams all matching users as NDJSON (default) or CSV without buffering them."""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"error": f"Unsupported format: {export_format}"}), 400
+    try:
+        columns, filters = _parse_user_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = iter_users(columns=columns, **filters)
+
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(dict(zip(columns, map(_serialize_value, row)))) + '\n'
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        for row in rows:
+            buffer.seek(0)
+            buffer.truncate(0)
+            writer.writerow([_serialize_value(v) for v in row])
+            yield buffer.getvalue()
+
+    if export_format == 'csv':
+        return Response(stream_with_context(generate_csv()), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=users.csv'})
+    return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -1,8 +1,12 @@
 import logging
 import json
+import base64
 from datetime import datetime, timezone, timedelta
+from typing import NamedTuple, Optional
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, Index, and_, or_, func, inspect, text
+from sqlalchemy import select, insert, update, delete, literal, table as sql_table, column as sql_column
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import IntegrityError
 
@@ -14,6 +18,27 @@ engine = create_engine(f"sqlite:///{DB_FILE}")
 Base = declarative_base()
 Session = sessionmaker(bind=engine)
 
+class TargetRow(NamedTuple):
+    """A user picked for an action, with only the columns the action reads."""
+    username: str
+    score: float
+
+
+class FollowedUserRow(NamedTuple):
+    """A followed user, as needed for follow-back checks."""
+    username: str
+    followed_at: Optional[datetime]
+    last_checked_at: Optional[datetime]
+
+
+def use_database(db_file):
+    """Points the module at a different SQLite file, e.g. for benchmarks or tools."""
+    global engine, DB_FILE
+    DB_FILE = db_file
+    engine = create_engine(f"sqlite:///{db_file}")
+    Session.configure(bind=engine)
+    return engine
+
 class User(Base):
     __tablename__ = 'users'
 
@@ -27,6 +52,7 @@ class User(Base):
     followed_at = Column(DateTime)
     unfollowed_at = Column(DateTime)
     last_checked_at = Column(DateTime)
+    followed_back_at = Column(DateTime) # First seen in the bot's follower list while followed
     followers_count = Column(Integer, default=0)
     following_count = Column(Integer, default=0)
     public_repos_count = Column(Integer, default=0)
@@ -52,6 +78,7 @@ class User(Base):
             'followed_at': self.followed_at.isoformat() if self.followed_at else None,
             'unfollowed_at': self.unfollowed_at.isoformat() if self.unfollowed_at else None,
             'last_checked_at': self.last_checked_at.isoformat() if self.last_checked_at else None,
+            'followed_back_at': self.followed_back_at.isoformat() if self.followed_back_at else None,
             'followers_count': self.followers_count,
             'following_count': self.following_count,
             'public_repos_count': self.public_repos_count,
@@ -68,6 +95,12 @@ class User(Base):
     def __repr__(self):
         return f"<User(username='{self.username}', score={self.score}, status='{self.status}')>"
 
+# Matches the keyset order used by the user browser: (status ASC, score DESC, id ASC)
+Index('ix_users_status_score_id', User.status, User.score.desc(), User.id)
+
+# Columns that may be requested through the user browser and export APIs
+USER_COLUMNS = [column.name for column in User.__table__.columns]
+
 class Log(Base):
     __tablename__ = 'logs'
 
@@ -79,15 +112,21 @@ class Log(Base):
     def __repr__(self):
         return f"<Log(level='{self.level}', message='{self.message[:50]}...')>"
 
+# Serves the dashboard's recent-logs query and the retention deletes
+Index('ix_logs_timestamp', Log.timestamp)
+
 class DisqualifiedUser(Base):
     __tablename__ = 'disqualified_users'
 
     id = Column(Integer, primary_key=True)
     username = Column(String, unique=True, nullable=False)
     disqualified_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    reason = Column(String) # Disqualification reason code, e.g. 'followers' or 'organization'
 
     def __repr__(self):
-        return f"<DisqualifiedUser(username='{self.username}', disqualified_at='{self.disqualified_at}')>"
+        return f"<DisqualifiedUser(username='{self.username}', reason='{self.reason}', disqualified_at='{self.disqualified_at}')>"
+
+Index('ix_disqualified_users_disqualified_at', DisqualifiedUser.disqualified_at)
 
 
 class RepoState(Base):
@@ -101,6 +140,96 @@ class RepoState(Base):
         return f"<RepoState(repo_name='{self.repo_name}', last_scanned_at='{self.last_scanned_at}')>"
 
 
+class SearchCursor(Base):
+    __tablename__ = 'search_cursors'
+
+    id = Column(Integer, primary_key=True)
+    query_key = Column(String, unique=True, nullable=False)
+    newest_created_at = Column(DateTime) # Newest repository created_at already processed
+    last_full_sweep_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<SearchCursor(query_key='{self.query_key}', newest_created_at='{self.newest_created_at}')>"
+
+
+class Candidate(Base):
+    __tablename__ = 'candidates'
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String, unique=True, nullable=False)
+    source = Column(String) # Discovery source, e.g. 'keyword:portfolio', 'repo:owner/name', 'public_events'
+    discovered_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    priority = Column(Float, default=0.0)
+    attempts = Column(Integer, default=0)
+    lease_until = Column(DateTime) # Set while a run is validating the candidate
+
+    def __repr__(self):
+        return f"<Candidate(username='{self.username}', source='{self.source}', priority={self.priority})>"
+
+Index('ix_candidates_priority', Candidate.priority.desc(), Candidate.discovered_at)
+
+
+class NegativeResult(Base):
+    __tablename__ = 'negative_cache'
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String, unique=True, nullable=False)
+    reason = Column(String, nullable=False) # 'not_found', 'unavailable' or 'error'
+    status_code = Column(Integer) # Last HTTP status, None if no response arrived
+    failures = Column(Integer, default=1)
+    last_failed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    retry_after = Column(DateTime, nullable=False) # Skip the login until this time
+
+    def __repr__(self):
+        return f"<NegativeResult(username='{self.username}', reason='{self.reason}', retry_after='{self.retry_after}')>"
+
+Index('ix_negative_cache_retry_after', NegativeResult.retry_after)
+
+
+class Follower(Base):
+    __tablename__ = 'followers'
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String, unique=True, nullable=False)
+    first_seen_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<Follower(username='{self.username}', first_seen_at='{self.first_seen_at}')>"
+
+
+class SourceStat(Base):
+    __tablename__ = 'source_stats'
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, unique=True, nullable=False) # e.g. 'keyword:portfolio', 'repo:owner/name', 'public_events'
+    # Decayed totals: each recorded run first multiplies the old values by the decay factor
+    api_calls = Column(Float, default=0.0)
+    candidates = Column(Float, default=0.0)
+    disqualified = Column(Float, default=0.0)
+    scheduled = Column(Float, default=0.0)
+    runs = Column(Integer, default=0)
+    last_run_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<SourceStat(source='{self.source}', scheduled={self.scheduled:.1f}, api_calls={self.api_calls:.1f})>"
+
+
+class StageCost(Base):
+    __tablename__ = 'stage_costs'
+
+    id = Column(Integer, primary_key=True)
+    stage = Column(String, unique=True, nullable=False) # 'scan.discovery' or 'scan.validate'
+    # Moving averages of one run's cost; `units` is what the stage worked through, e.g. candidates validated
+    core_calls = Column(Float, default=0.0)
+    search_calls = Column(Float, default=0.0)
+    units = Column(Float, default=0.0)
+    runs = Column(Integer, default=0)
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<StageCost(stage='{self.stage}', core_calls={self.core_calls:.1f}, units={self.units:.1f})>"
+
+
 class BotStatus(Base):
     __tablename__ = 'bot_status'
 
@@ -108,9 +237,31 @@ class BotStatus(Base):
     current_phase = Column(String, default='Idle')
     last_update = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+def _ensure_columns():
+    """Adds columns that were added to a model after its table already existed."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    logger.info(f"Added column {table.name}.{column.name}.")
+
+def _ensure_indexes():
+    """Creates indexes that were added after a table already existed."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
 def initialize_database():
     """Creates the necessary database tables if they don't exist."""
     Base.metadata.create_all(engine)
+    _ensure_columns()
+    _ensure_indexes()
     session = Session()
     try:
         # Ensure there's always a status entry
@@ -124,13 +275,13 @@ def initialize_database():
         session.close()
     logger.info("Database initialized successfully with SQLAlchemy.")
 
-def add_disqualified_user(username):
+def add_disqualified_user(username, reason=None):
     """Adds a user to the disqualified list."""
     session = Session()
     try:
         existing_user = session.query(DisqualifiedUser).filter_by(username=username).first()
         if not existing_user:
-            new_disqualified_user = DisqualifiedUser(username=username)
+            new_disqualified_user = DisqualifiedUser(username=username, reason=reason)
             session.add(new_disqualified_user)
             session.commit()
             logger.info(f"User '{username}' added to the disqualified list.")
@@ -143,29 +294,58 @@ def add_disqualified_user(username):
         session.close()
 
 def is_user_disqualified(username):
-    """Checks if a user is in the disqualified list and if 3 months have passed."""
+    """Checks if a user is in the disqualified list. Expired entries are removed in bulk
+    by `expire_disqualified_users` at the start of a run."""
     session = Session()
     try:
-        user = session.query(DisqualifiedUser).filter_by(username=username).first()
-        if user:
-            three_months_ago = datetime.now(timezone.utc) - timedelta(days=90)
-            if user.disqualified_at > three_months_ago:
-                return True  # User is disqualified and within the 3-month period
-            else:
-                # User's disqualification period has expired, so remove them from the list
-                session.delete(user)
-                session.commit()
-                logger.info(f"User '{username}' has been removed from the disqualified list after 3 months.")
-                return False
-        return False  # User is not in the disqualified list
+        return session.query(DisqualifiedUser.id).filter_by(username=username).first() is not None
+    finally:
+        session.close()
+
+def load_disqualified_usernames():
+    """Returns the set of all currently disqualified usernames."""
+    session = Session()
+    try:
+        return {username for (username,) in session.query(DisqualifiedUser.username)}
+    finally:
+        session.close()
+
+def expire_disqualified_users(ttl_days, default_ttl_days=90):
+    """Deletes disqualifications older than their reason's TTL in one sweep per reason.
+
+    `ttl_days` maps reason code -> days; reasons without an entry use `default_ttl_days`.
+    Returns the number of users removed from the disqualified list.
+    """
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        removed = 0
+        for reason, days in ttl_days.items():
+            removed += session.query(DisqualifiedUser).filter(
+                DisqualifiedUser.reason == reason,
+                DisqualifiedUser.disqualified_at < now - timedelta(days=days)
+            ).delete(synchronize_session=False)
+        removed += session.query(DisqualifiedUser).filter(
+            or_(DisqualifiedUser.reason == None, DisqualifiedUser.reason.notin_(list(ttl_days))),
+            DisqualifiedUser.disqualified_at < now - timedelta(days=default_ttl_days)
+        ).delete(synchronize_session=False)
+        session.commit()
+        if removed:
+            logger.info(f"Removed {removed} users from the disqualified list after their disqualification expired.")
+        return removed
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error expiring disqualified users: {e}")
+        return 0
     finally:
         session.close()
 
 
-def add_or_update_user(user_data, status):
-    """Adds a new user or updates their score and scan time if they already exist."""
-    if status == 'Disqualified':
-        add_disqualified_user(user_data['login'])
+def add_or_update_user(user_data, status, reason=None):
+    """Adds a new user or updates their score and scan time if they already exist.
+    Disqualified users are also added to the disqualified list with `reason`."""
+    if status.lower() == 'disqualified':
+        add_disqualified_user(user_data['login'], reason)
 
     session = Session()
     try:
@@ -222,28 +402,130 @@ def get_all_usernames_in_db():
     finally:
         session.close()
 
-def get_followed_users():
-    """Retrieves all users with 'followed' status, ordered by follow date."""
+def iter_known_usernames(batch_size=5000, skipped_max_age_days=None):
+    """Streams every username the bot has already seen: users it followed, targeted or
+    skipped plus the current disqualified list. Users whose disqualification expired are
+    left out so they can be evaluated again, and so are skipped users last checked more
+    than `skipped_max_age_days` ago. Unfollowed users are deleted from `users`, so they
+    drop out as well."""
+    session = Session()
+    try:
+        users = session.query(User.username).filter(User.status != 'disqualified')
+        if skipped_max_age_days:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=skipped_max_age_days)
+            users = users.filter(or_(
+                User.status != 'skipped',
+                func.coalesce(User.last_checked_at, User.last_scanned_at) >= cutoff
+            ))
+        queries = (users, session.query(DisqualifiedUser.username))
+        for query in queries:
+            for (username,) in query.execution_options(yield_per=batch_size):
+                yield username
+    finally:
+        session.close()
+
+def _load_temp_logins(conn, table_name, logins, chunk_size=5000):
+    """Bulk loads logins into a connection-local temporary table."""
+    conn.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {table_name} (username TEXT PRIMARY KEY)"))
+    conn.execute(text(f"DELETE FROM {table_name}"))
+    insert_statement = text(f"INSERT OR IGNORE INTO {table_name} (username) VALUES (:username)")
+    batch = []
+    for login in logins:
+        batch.append({'username': login})
+        if len(batch) >= chunk_size:
+            conn.execute(insert_statement, batch)
+            batch = []
+    if batch:
+        conn.execute(insert_statement, batch)
+
+def select_unfollow_candidates(following, followers, limit):
+    """Picks up to `limit` random logins that are followed, do not follow back and are not in `users`.
+
+    Both login lists are bulk-loaded into temporary tables and filtered with one anti-join,
+    and the random sample is drawn by SQLite. Returns (sampled logins, total candidate count).
+    """
+    with engine.begin() as conn:
+        try:
+            _load_temp_logins(conn, 'tmp_following', following)
+            _load_temp_logins(conn, 'tmp_followers', followers)
+            candidates = """
+                FROM tmp_following f
+                WHERE NOT EXISTS (SELECT 1 FROM tmp_followers r WHERE r.username = f.username)
+                  AND NOT EXISTS (SELECT 1 FROM users u WHERE u.username = f.username)
+            """
+            total = conn.execute(text(f"SELECT COUNT(*) {candidates}")).scalar()
+            sample = conn.execute(text(f"SELECT f.username {candidates} ORDER BY RANDOM() LIMIT :limit"), {'limit': limit}).scalars().all()
+            return sample, total
+        finally:
+            conn.execute(text("DROP TABLE IF EXISTS tmp_following"))
+            conn.execute(text("DROP TABLE IF EXISTS tmp_followers"))
+
+def sync_followers(followers, dry_run=False):
+    """Diffs the bot's current follower list against the stored snapshot in bulk.
+
+    New followers are added to the snapshot and lost ones removed. Followed users who
+    appear in the list get `followed_back_at` set, users who left get it cleared, and
+    every followed user's `last_checked_at` is bumped, all in a handful of set-based
+    statements. With `dry_run` the changes are computed and rolled back.
+    Returns a dict of counts.
+    """
+    now = datetime.now(timezone.utc)
+    users = User.__table__
+    snapshot = Follower.__table__
+    tmp_followers = sql_table('tmp_followers', sql_column('username'))
+    current = select(tmp_followers.c.username)
+    with engine.connect() as conn:
+        try:
+            _load_temp_logins(conn, 'tmp_followers', followers)
+            counts = {'followers': conn.execute(text("SELECT COUNT(*) FROM tmp_followers")).scalar()}
+            counts['new'] = conn.execute(insert(snapshot).from_select(
+                ['username', 'first_seen_at'],
+                select(tmp_followers.c.username, literal(now, DateTime)).where(tmp_followers.c.username.notin_(select(snapshot.c.username)))
+            )).rowcount
+            counts['lost'] = conn.execute(delete(snapshot).where(snapshot.c.username.notin_(current))).rowcount
+            counts['followed_back'] = conn.execute(update(users).where(
+                users.c.status == 'followed', users.c.followed_back_at == None, users.c.username.in_(current)
+            ).values(followed_back_at=now)).rowcount
+            counts['stopped_following'] = conn.execute(update(users).where(
+                users.c.followed_back_at != None, users.c.username.notin_(current)
+            ).values(followed_back_at=None)).rowcount
+            counts['checked'] = conn.execute(update(users).where(users.c.status == 'followed').values(last_checked_at=now)).rowcount
+            conn.execute(text("DROP TABLE IF EXISTS tmp_followers"))
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+            return counts
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error syncing follower snapshot: {e}")
+            return None
+
+def iter_followed_users(batch_size=1000):
+    """Streams FollowedUserRow tuples for all followed users, ordered by follow date."""
     session = Session()
     try:
-        users = session.query(User).filter_by(status='followed').order_by(User.followed_at.asc()).all()
-        return [{
-            'username': user.username,
-            'followed_at': user.followed_at 
-        } for user in users]
+        query = session.query(User.username, User.followed_at, User.last_checked_at) \
+            .filter_by(status='followed').order_by(User.followed_at.asc())
+        for row in query.execution_options(yield_per=batch_size):
+            yield FollowedUserRow(*row)
     finally:
         session.close()
 
+def get_followed_users():
+    """Retrieves all users with 'followed' status, ordered by follow date."""
+    return list(iter_followed_users())
+
 def get_users_to_check(check_interval_days, limit):
-    """Retrieves followed users who haven't been checked recently."""
+    """Retrieves followed users who haven't been checked recently as FollowedUserRow tuples."""
     session = Session()
     try:
         threshold = datetime.now(timezone.utc) - timedelta(days=check_interval_days)
-        users = session.query(User).filter(
+        rows = session.query(User.username, User.followed_at, User.last_checked_at).filter(
             User.status == 'followed',
             (User.last_checked_at == None) | (User.last_checked_at < threshold)
         ).limit(limit).all()
-        return [user.to_dict() for user in users]
+        return [FollowedUserRow(*row) for row in rows]
     finally:
         session.close()
 
@@ -256,11 +538,11 @@ def count_followed_users():
         session.close()
 
 def get_users_to_follow(limit):
-    """Retrieves a list of the highest-scoring users with 'targeted' status."""
+    """Retrieves the highest-scoring users with 'targeted' status as TargetRow tuples."""
     session = Session()
     try:
-        users = session.query(User).filter_by(status='targeted').order_by(User.score.desc()).limit(limit).all()
-        return [user.to_dict() for user in users]
+        rows = session.query(User.username, User.score).filter_by(status='targeted').order_by(User.score.desc()).limit(limit).all()
+        return [TargetRow(*row) for row in rows]
     finally:
         session.close()
 
@@ -290,14 +572,15 @@ def update_user_status(username, status, last_checked_at=None):
         session.close()
 
 def get_users_by_status_and_score(status, min_score, limit, max_score=None):
-    """Retrieves users by status and within a score range, ordered by score."""
+    """Retrieves users by status and within a score range, ordered by score, as TargetRow tuples.
+    Only the projected columns are loaded, however wide the users table is."""
     session = Session()
     try:
-        query = session.query(User).filter(User.status == status, User.score >= min_score)
+        query = session.query(User.username, User.score).filter(User.status == status, User.score >= min_score)
         if max_score is not None:
             query = query.filter(User.score <= max_score)
-        users = query.order_by(User.score.desc()).limit(limit).all()
-        return [user.to_dict() for user in users]
+        rows = query.order_by(User.score.desc()).limit(limit).all()
+        return [TargetRow(*row) for row in rows]
     finally:
         session.close()
 
@@ -363,6 +646,305 @@ def update_repo_last_scanned_at(repo_name, timestamp):
     finally:
         session.close()
 
+def get_search_cursor(query_key):
+    """Retrieves the incremental search cursor for a keyword query, or None if it has never run."""
+    session = Session()
+    try:
+        cursor = session.query(SearchCursor).filter_by(query_key=query_key).first()
+        if not cursor:
+            return None
+        return {
+            'newest_created_at': cursor.newest_created_at.replace(tzinfo=timezone.utc) if cursor.newest_created_at else None,
+            'last_full_sweep_at': cursor.last_full_sweep_at.replace(tzinfo=timezone.utc) if cursor.last_full_sweep_at else None
+        }
+    finally:
+        session.close()
+
+def update_search_cursor(query_key, newest_created_at, full_sweep=False):
+    """Advances the search cursor for a keyword query, recording a full sweep if one was done."""
+    session = Session()
+    try:
+        cursor = session.query(SearchCursor).filter_by(query_key=query_key).first()
+        if not cursor:
+            cursor = SearchCursor(query_key=query_key)
+            session.add(cursor)
+        if newest_created_at:
+            previous = cursor.newest_created_at.replace(tzinfo=timezone.utc) if cursor.newest_created_at else None
+            if not previous or newest_created_at > previous:
+                cursor.newest_created_at = newest_created_at
+        if full_sweep:
+            cursor.last_full_sweep_at = datetime.now(timezone.utc)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error updating search cursor for '{query_key}': {e}")
+    finally:
+        session.close()
+
+def enqueue_candidates(candidates, priorities=None):
+    """Adds discovered users to the candidate queue in bulk.
+
+    `candidates` maps username -> source and `priorities` maps username -> priority.
+    A user that is already queued keeps its place but takes the higher priority.
+    Returns the number of candidates submitted.
+    """
+    if not candidates:
+        return 0
+    priorities = priorities or {}
+    now = datetime.now(timezone.utc)
+    rows = [{'username': username, 'source': source, 'discovered_at': now,
+             'priority': priorities.get(username, 0.0), 'attempts': 0}
+            for username, source in candidates.items()]
+    session = Session()
+    try:
+        statement = sqlite_insert(Candidate)
+        statement = statement.on_conflict_do_update(
+            index_elements=['username'],
+            set_={'priority': func.max(Candidate.priority, statement.excluded.priority)}
+        )
+        session.execute(statement, rows)
+        session.commit()
+        return len(rows)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error enqueueing {len(rows)} candidates: {e}")
+        return 0
+    finally:
+        session.close()
+
+def lease_candidates(limit, lease_seconds=600, max_attempts=3):
+    """Leases up to `limit` queued candidates in priority order.
+
+    Leased candidates are hidden from other runs until the lease expires, so a run that
+    is killed mid-way hands its candidates back automatically. Returns (username, source) pairs.
+    """
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        rows = session.query(Candidate.id, Candidate.username, Candidate.source).filter(
+            (Candidate.lease_until == None) | (Candidate.lease_until < now),
+            Candidate.attempts < max_attempts
+        ).order_by(Candidate.priority.desc(), Candidate.discovered_at.asc()).limit(limit).all()
+        if rows:
+            session.query(Candidate).filter(Candidate.id.in_([r.id for r in rows])).update({
+                'lease_until': now + timedelta(seconds=lease_seconds),
+                'attempts': Candidate.attempts + 1
+            }, synchronize_session=False)
+            session.commit()
+        return [(r.username, r.source) for r in rows]
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error leasing candidates: {e}")
+        return []
+    finally:
+        session.close()
+
+def complete_candidates(usernames):
+    """Removes processed candidates from the queue."""
+    if not usernames:
+        return
+    session = Session()
+    try:
+        session.query(Candidate).filter(Candidate.username.in_(list(usernames))).delete(synchronize_session=False)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error completing {len(usernames)} candidates: {e}")
+    finally:
+        session.close()
+
+def prune_candidates(max_attempts=3, max_age_days=14):
+    """Drops candidates that failed too often or have waited too long. Returns the number removed."""
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        removed = session.query(Candidate).filter(
+            ((Candidate.attempts >= max_attempts) & ((Candidate.lease_until == None) | (Candidate.lease_until < now)))
+            | (Candidate.discovered_at < now - timedelta(days=max_age_days))
+        ).delete(synchronize_session=False)
+        session.commit()
+        return removed
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error pruning candidate queue: {e}")
+        return 0
+    finally:
+        session.close()
+
+def count_queued_candidates():
+    """Counts the candidates waiting in the queue."""
+    session = Session()
+    try:
+        return session.query(Candidate).count()
+    finally:
+        session.close()
+
+def record_negative_result(username, reason, status_code, ttl_hours, backoff_factor=2.0, max_ttl_hours=2160):
+    """Remembers a failed profile lookup. Each repeated failure multiplies the TTL by
+    `backoff_factor`, up to `max_ttl_hours`. Returns the time the login may be retried."""
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        entry = session.query(NegativeResult).filter_by(username=username).first()
+        if not entry:
+            entry = NegativeResult(username=username, failures=0)
+            session.add(entry)
+        entry.failures += 1
+        entry.reason = reason
+        entry.status_code = status_code
+        entry.last_failed_at = now
+        hours = min(ttl_hours * backoff_factor ** (entry.failures - 1), max_ttl_hours)
+        entry.retry_after = now + timedelta(hours=hours)
+        session.commit()
+        return entry.retry_after
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error recording negative result for '{username}': {e}")
+        return None
+    finally:
+        session.close()
+
+def get_negative_cached(usernames, chunk_size=500):
+    """Returns the subset of `usernames` whose negative cache entry has not expired yet."""
+    usernames = list(usernames)
+    now = datetime.now(timezone.utc)
+    cached = set()
+    session = Session()
+    try:
+        for i in range(0, len(usernames), chunk_size):
+            rows = session.query(NegativeResult.username).filter(
+                NegativeResult.username.in_(usernames[i:i + chunk_size]),
+                NegativeResult.retry_after > now
+            ).all()
+            cached.update(r[0] for r in rows)
+        return cached
+    finally:
+        session.close()
+
+def prune_negative_cache(max_ttl_hours=2160):
+    """Drops entries that expired more than `max_ttl_hours` ago, so a login that recovered
+    starts from the base TTL again."""
+    session = Session()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=max_ttl_hours)
+        removed = session.query(NegativeResult).filter(NegativeResult.retry_after < cutoff).delete(synchronize_session=False)
+        session.commit()
+        return removed
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error pruning negative cache: {e}")
+        return 0
+    finally:
+        session.close()
+
+def get_source_stats():
+    """Returns {source: {'api_calls', 'candidates', 'disqualified', 'scheduled', 'runs'}}."""
+    session = Session()
+    try:
+        return {
+            row.source: {'api_calls': row.api_calls, 'candidates': row.candidates, 'disqualified': row.disqualified,
+                         'scheduled': row.scheduled, 'runs': row.runs}
+            for row in session.query(SourceStat).all()
+        }
+    finally:
+        session.close()
+
+def record_source_stats(tallies, decay=1.0):
+    """Adds one run's per-source tallies ({source: {'api_calls': .., 'candidates': .., ...}}).
+    Every stored source, ran or not, is first multiplied by `decay` so old runs fade out."""
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        fields = ('api_calls', 'candidates', 'disqualified', 'scheduled')
+        if decay != 1.0:
+            session.query(SourceStat).update({getattr(SourceStat, f): getattr(SourceStat, f) * decay for f in fields},
+                                             synchronize_session=False)
+        existing = {row.source: row for row in session.query(SourceStat).filter(SourceStat.source.in_(list(tallies))).all()}
+        for source, tally in tallies.items():
+            row = existing.get(source)
+            if row is None:
+                row = SourceStat(source=source, runs=0, **{f: 0.0 for f in fields})
+                session.add(row)
+            for f in fields:
+                setattr(row, f, (getattr(row, f) or 0.0) + tally.get(f, 0))
+            row.runs += 1
+            row.last_run_at = now
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error recording source stats: {e}")
+    finally:
+        session.close()
+
+def get_stage_costs():
+    """Returns {stage: {'core_calls', 'search_calls', 'units', 'runs'}} from earlier runs."""
+    session = Session()
+    try:
+        return {
+            row.stage: {'core_calls': row.core_calls, 'search_calls': row.search_calls, 'units': row.units, 'runs': row.runs}
+            for row in session.query(StageCost).all()
+        }
+    finally:
+        session.close()
+
+def record_stage_costs(costs, weight=0.3):
+    """Folds one run's per-stage costs into the moving averages; `weight` is the share of the
+    new run. The first run of a stage is taken as is."""
+    session = Session()
+    try:
+        now = datetime.now(timezone.utc)
+        existing = {row.stage: row for row in session.query(StageCost).filter(StageCost.stage.in_(list(costs))).all()}
+        for stage, cost in costs.items():
+            row = existing.get(stage)
+            if row is None:
+                row = StageCost(stage=stage, runs=0)
+                session.add(row)
+            for field in ('core_calls', 'search_calls', 'units'):
+                value = cost.get(field, 0)
+                setattr(row, field, value if not row.runs else getattr(row, field) * (1 - weight) + value * weight)
+            row.runs += 1
+            row.updated_at = now
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error recording stage costs: {e}")
+    finally:
+        session.close()
+
+def count_users_with_status(status):
+    session = Session()
+    try:
+        return session.query(func.count(User.id)).filter(User.status == status).scalar()
+    finally:
+        session.close()
+
+def write_log_records(records):
+    """Inserts a batch of log records ({'timestamp', 'level', 'message'}) in one transaction."""
+    if not records:
+        return
+    with engine.begin() as conn:
+        conn.execute(insert(Log.__table__), records)
+
+def prune_logs(max_rows=None, max_age_days=None):
+    """Deletes log rows older than `max_age_days` and all but the newest `max_rows`, using the
+    timestamp index for both. Returns the number of rows deleted."""
+    deleted = 0
+    with engine.begin() as conn:
+        if max_age_days:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+            deleted += conn.execute(delete(Log.__table__).where(Log.timestamp < cutoff)).rowcount
+        if max_rows:
+            # Timestamp of the newest row past the limit; everything at or before it goes
+            boundary = conn.execute(
+                select(Log.timestamp, Log.id).order_by(Log.timestamp.desc(), Log.id.desc()).offset(max_rows).limit(1)
+            ).first()
+            if boundary is not None:
+                deleted += conn.execute(delete(Log.__table__).where(or_(
+                    Log.timestamp < boundary.timestamp,
+                    and_(Log.timestamp == boundary.timestamp, Log.id <= boundary.id)
+                ))).rowcount
+    return deleted
+
 def get_dashboard_data():
     """Fetches all data required for the dashboard."""
     session = Session()
@@ -404,6 +986,100 @@ def get_dashboard_data():
     finally:
         session.close()
 
+def encode_user_cursor(status, score, user_id):
+    """Encodes the keyset position of a row into an opaque cursor string."""
+    raw = json.dumps([status, score, user_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_user_cursor(cursor):
+    """Decodes a cursor produced by encode_user_cursor. Raises ValueError if it is malformed."""
+    try:
+        status, score, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return status, None if score is None else float(score), int(user_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _filter_users(query, statuses=None, min_followers=None, max_followers=None, followed_after=None, followed_before=None):
+    """Applies the user browser filters to a query over the users table."""
+    if statuses:
+        query = query.filter(User.status.in_(statuses))
+    if min_followers is not None:
+        query = query.filter(User.followers_count >= min_followers)
+    if max_followers is not None:
+        query = query.filter(User.followers_count <= max_followers)
+    if followed_after is not None:
+        query = query.filter(User.followed_at >= followed_after)
+    if followed_before is not None:
+        query = query.filter(User.followed_at < followed_before)
+    return query
+
+def user_columns(columns):
+    """Resolves requested column names to User attributes. Raises ValueError on unknown names."""
+    columns = columns or USER_COLUMNS
+    unknown = [name for name in columns if name not in USER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return [getattr(User, name) for name in columns]
+
+def get_users_page(cursor=None, limit=50, columns=None, **filters):
+    """Returns one keyset-paginated page of users ordered by (status, score DESC, id).
+
+    SQLite sorts NULL scores last in descending order, so they come at the end of each
+    status. Only the requested columns are selected. The returned dict holds the rows and the
+    cursor for the next page, which is None once the last page has been reached.
+    """
+    columns = columns or USER_COLUMNS
+    selected = user_columns(columns)
+    session = Session()
+    try:
+        query = session.query(*selected, User.status, User.score, User.id)
+        query = _filter_users(query, **filters)
+        if cursor:
+            status, score, user_id = decode_user_cursor(cursor)
+            if score is None:
+                # Only the rest of the NULL scores of this status are left before the next one
+                query = query.filter(or_(
+                    User.status > status,
+                    and_(User.status == status, User.score.is_(None), User.id > user_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    User.status > status,
+                    and_(User.status == status, or_(User.score < score, User.score.is_(None))),
+                    and_(User.status == status, User.score == score, User.id > user_id)
+                ))
+        rows = query.order_by(User.status.asc(), User.score.desc(), User.id.asc()).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_user_cursor(last[-3], last[-2], last[-1])
+
+        width = len(columns)
+        return {
+            'users': [dict(zip(columns, row[:width])) for row in rows],
+            'next_cursor': next_cursor
+        }
+    finally:
+        session.close()
+
+def iter_users(columns=None, batch_size=1000, **filters):
+    """Streams projected user rows as tuples straight from a database cursor.
+
+    Rows are fetched `batch_size` at a time, so memory use does not grow with the
+    number of users exported.
+    """
+    selected = user_columns(columns)
+    session = Session()
+    try:
+        query = _filter_users(session.query(*selected), **filters)
+        query = query.order_by(User.status.asc(), User.score.desc(), User.id.asc())
+        for row in query.execution_options(yield_per=batch_size):
+            yield tuple(row)
+    finally:
+        session.close()
+
 def get_user_stats():
     """Calculates statistics about the users in the database."""
     session = Session()
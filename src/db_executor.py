@@ -0,0 +1,71 @@
+"""Runs blocking database calls on a dedicated thread so the event loop keeps serving HTTP.
+
+SQLite allows one writer at a time, so every call goes through a single worker thread
+and is executed in submission order. Coroutines simply await the result:
+
+    user = await run_db(get_user_data_from_db, username)
+
+Pass the function object itself (looked up from the calling module), so tests that
+patch module attributes keep working.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import metrics_tracker
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseExecutor:
+    """A single-thread command queue for database calls that records queue wait times."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reach-db')
+            return self._executor
+
+    def _timed(self, func, submitted_at, args, kwargs):
+        started_at = time.perf_counter()
+        try:
+            with tracer.span(f"db.{getattr(func, '__name__', 'call')}", queue_wait_ms=round((started_at - submitted_at) * 1000, 3)):
+                return func(*args, **kwargs)
+        finally:
+            metrics_tracker.add_db_call(started_at - submitted_at, time.perf_counter() - started_at)
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # run_in_executor does not carry context variables over, so hand the caller's
+        # context to the worker for its trace spans
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._timed, func, time.perf_counter(), args, kwargs)
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    def call(self, func, *args, **kwargs):
+        """Runs `func` on the database thread from a thread without an event loop (e.g. the
+        log handler's writer) and blocks until it returns."""
+        return self._get_executor().submit(self._timed, func, time.perf_counter(), args, kwargs).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+db_executor = DatabaseExecutor()
+
+
+async def run_db(func, *args, **kwargs):
+    """Runs `func(*args, **kwargs)` on the database thread and returns its result."""
+    return await db_executor.run(func, *args, **kwargs)
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from .github_api import PUBLIC_EVENT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class RingBufferSet:
+    """A set that remembers only the most recent `maxlen` items."""
+
+    def __init__(self, maxlen):
+        self.order = deque(maxlen=maxlen)
+        self.items = set()
+
+    def add(self, item):
+        """Adds an item and returns False if it was already present."""
+        if item in self.items:
+            return False
+        if len(self.order) == self.order.maxlen:
+            self.items.discard(self.order[0])
+        self.order.append(item)
+        self.items.add(item)
+        return True
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class PublicEventPoller:
+    """Polls every available page of the public events feed for star/fork activity.
+
+    Each page is fetched with its last ETag, so unchanged pages cost no rate limit,
+    and the server's X-Poll-Interval is respected between polls. Event IDs already
+    seen are skipped using a bounded ring buffer.
+    """
+
+    def __init__(self, api, on_actor, event_types=('WatchEvent', 'ForkEvent'), max_age_days=14,
+                 max_pages=3, per_page=100, dedupe_size=10000):
+        self.api = api
+        self.on_actor = on_actor
+        self.event_types = frozenset(event_types)
+        self.max_age = timedelta(days=max_age_days)
+        self.max_pages = max_pages
+        self.per_page = per_page
+        self.seen_ids = RingBufferSet(dedupe_size)
+        self.etags = {}
+        self.poll_interval = 60
+        self.polls = 0
+        self.actors_found = 0
+        self._stopped = asyncio.Event()
+
+    def _handle_events(self, events, cutoff):
+        for event in events:
+            # Cheap checks first; timestamps are only parsed for events we keep
+            if event.get('type') not in self.event_types:
+                continue
+            if not self.seen_ids.add(event.get('id')):
+                continue
+            actor = event.get('actor')
+            if not actor:
+                continue
+            event_time = datetime.fromisoformat(event['created_at'].replace('Z', '+00:00'))
+            if event_time > cutoff:
+                self.actors_found += 1
+                self.on_actor(actor['login'])
+
+    async def poll_once(self):
+        """Walks the feed pages once. Returns the number of pages that had new content."""
+        self.polls += 1
+        cutoff = datetime.now(timezone.utc) - self.max_age
+        changed_pages = 0
+        for page in range(1, self.max_pages + 1):
+            events, etag, poll_interval, has_next = await self.api.get_public_events_page(
+                page=page, per_page=self.per_page, etag=self.etags.get(page), projection=PUBLIC_EVENT_FIELDS)
+            if poll_interval:
+                self.poll_interval = poll_interval
+            if events is None:
+                # Unchanged since the last poll (or failed); later pages will not have moved either
+                break
+            self.etags[page] = etag
+            changed_pages += 1
+            self._handle_events(events, cutoff)
+            if not has_next or len(events) < self.per_page:
+                break
+        return changed_pages
+
+    def stop(self):
+        """Ends `run` after the poll in progress, if any, instead of at the end of its window."""
+        self._stopped.set()
+
+    async def run(self, window_seconds=0):
+        """Polls until `window_seconds` have passed or `stop` is called, always polling at least once."""
+        deadline = time.monotonic() + window_seconds
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Error polling public events: {e}")
+            remaining = deadline - time.monotonic()
+            if remaining < self.poll_interval or self._stopped.is_set():
+                break
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.poll_interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+        logger.info(f"Public event poller finished after {self.polls} poll(s): {self.actors_found} new star/fork actors, "
+                    f"{len(self.seen_ids)} event IDs remembered.")
@@ -0,0 +1,85 @@
+"""Offline user discovery from GH Archive (https://www.gharchive.org) hourly event dumps.
+
+Each dump is a gzip-compressed NDJSON file with one public GitHub event per line.
+Files are decompressed and decoded incrementally, one line at a time, so memory use
+does not depend on the size of the dump.
+"""
+import gzip
+import json
+import logging
+from collections import Counter
+
+from .search_planner import tokenize
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EVENT_TYPES = ('WatchEvent', 'ForkEvent')
+
+
+def iter_archive_events(path, event_types=ARCHIVE_EVENT_TYPES):
+    """Yields the events of one dump whose `type` is in `event_types`.
+
+    Lines that cannot contain one of the wanted types are skipped without being
+    decoded; malformed lines are logged and skipped.
+    """
+    # Raw byte markers used to skip lines before paying for a JSON decode
+    markers = tuple(f'"{event_type}"'.encode('ascii') for event_type in event_types)
+    with gzip.open(path, 'rb') as raw:
+        for line_number, line in enumerate(raw, 1):
+            if not any(marker in line for marker in markers):
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed line {line_number} in {path}.")
+                continue
+            if event.get('type') in event_types:
+                yield event
+
+
+class ArchiveMatcher:
+    """Decides whether an archived event's repository is one we watch.
+
+    Keywords match whole words of the repository name, as GitHub search does: `cv`
+    matches `my-cv` but not `opencv`.
+    """
+
+    def __init__(self, target_repos, keywords):
+        self.target_repos = {repo.lower() for repo in target_repos}
+        self.keywords = [(keyword.lower(), tokenize(keyword)) for keyword in keywords]
+
+    def match(self, repo_full_name):
+        """Returns the discovery source for a repository, or None if it is not relevant."""
+        full_name = repo_full_name.lower()
+        if full_name in self.target_repos:
+            return f"repo:{full_name}"
+        repo_tokens = tokenize(full_name.rsplit('/', 1)[-1])
+        for keyword, keyword_tokens in self.keywords:
+            if keyword_tokens and keyword_tokens <= repo_tokens:
+                return f"keyword:{keyword}"
+        return None
+
+
+def discover_archive_users(paths, target_repos, keywords):
+    """Streams the given dumps and returns {login: source} for matching star/fork actors.
+
+    Also returns a Counter with the number of matched events per source.
+    """
+    matcher = ArchiveMatcher(target_repos, keywords)
+    found_users = {}
+    matches = Counter()
+    for path in paths:
+        events_seen = 0
+        for event in iter_archive_events(path):
+            events_seen += 1
+            repo = event.get('repo') or {}
+            actor = event.get('actor') or {}
+            login = actor.get('login')
+            if not login or login.endswith('[bot]'):
+                continue
+            source = matcher.match(repo.get('name', ''))
+            if source:
+                matches[source] += 1
+                found_users.setdefault(login, source)
+        logger.info(f"Read {events_seen} star/fork events from {path}; {len(found_users)} candidate users so far.")
+    return found_users, matches
@@ -3,18 +3,66 @@ import httpx
 import asyncio
 import logging
 import time
-import time
 import random
 import re
 from datetime import datetime, timezone
 from .metrics import metrics_tracker
+from .tracing import tracer
+from .config_loader import load_config
+from .concurrency import AIMDLimiter, OK, THROTTLED, ERROR
+from .response_cache import ResponseCache, SingleFlight, request_key
+from . import json_codec
+from .json_codec import Projection, decode_items
 
 logger = logging.getLogger(__name__)
 
+# Fields the bot reads from search results and public events. Everything else is
+# dropped right after decoding.
+SEARCH_REPO_FIELDS = Projection('full_name', 'created_at', 'owner.login', 'owner.type')
+PUBLIC_EVENT_FIELDS = Projection('id', 'type', 'created_at', 'actor.login', 'repo.name')
+
+# Responses kept in the per-session response cache: found, and gone for good
+CACHEABLE_STATUS = (200, 404, 410)
+# Per-user and per-repo resources that several discovery sources or validation stages ask
+# for again. Search pages, follower lists and feeds are never re-requested within a
+# session, so caching them would only keep their raw payloads alive.
+CACHEABLE_PATHS = re.compile(r'^(/user|/users/[^/]+(/(repos|starred|orgs|events)|/following/[^/]+)?|/repos/[^/]+/[^/]+/readme)$')
+
+
+def decode_logins(content):
+    """Decodes a page of user stubs straight into a list of logins."""
+    return [item['login'] for item in json_codec.loads(content)]
+
+
+def rate_limit_wait(response, attempt=0, secondary_backoff=60):
+    """Tells whether a response was refused by a rate limit.
+
+    Returns (seconds to wait before retrying, is_secondary), or (None, False) for any
+    other response. Secondary limits (429, or 403 with Retry-After or GitHub's
+    "secondary rate limit" message) honour Retry-After and otherwise back off
+    exponentially from `secondary_backoff`. An exhausted primary limit waits for its reset.
+    """
+    if response.status_code not in (403, 429):
+        return None, False
+    retry_after = response.headers.get('Retry-After')
+    if response.headers.get('X-RateLimit-Remaining') == '0' and not retry_after:
+        reset = int(response.headers.get('X-RateLimit-Reset', 0))
+        return max(0, reset - time.time()) + 1, False
+    if response.status_code == 403 and not retry_after and b'secondary rate limit' not in response.content.lower():
+        # A plain permission error, e.g. a suspended account
+        return None, False
+    if retry_after and retry_after.isdigit():
+        return int(retry_after), True
+    return secondary_backoff * 2 ** attempt, True
+
 class GithubAPI:
     """An asynchronous wrapper for the GitHub API using httpx."""
 
-    def __init__(self, pat=None, timeout=30.0):
+    # Default transport for new clients. Left as None for the real network; the offline
+    # simulator and benchmarks swap in an httpx.MockTransport here.
+    transport = None
+
+    def __init__(self, pat=None, timeout=30.0, transport=None, limiter=None):
         if not pat:
             pat = os.getenv("GITHUB_PAT")
         if not pat:
@@ -25,7 +73,16 @@ class GithubAPI:
             "Authorization": f"token {pat}",
             "Accept": "application/vnd.github.v3+json"
         }
-        self.client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers, timeout=timeout)
+        self.client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers, timeout=timeout,
+                                        transport=transport or GithubAPI.transport)
+        settings, _ = load_config()
+        concurrency = settings.get('concurrency', {})
+        self.limiter = limiter or AIMDLimiter.from_settings(settings)
+        self.max_retries = concurrency.get('max_retries', 3)
+        self.secondary_backoff = concurrency.get('secondary_backoff_seconds', 60)
+        cache = settings.get('response_cache', {})
+        self.response_cache = ResponseCache(ttl=cache.get('ttl_seconds', 300), max_entries=cache.get('max_entries', 2048))
+        self.in_flight = SingleFlight()
 
     async def __aenter__(self):
         return self
@@ -33,40 +90,125 @@ class GithubAPI:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.client.aclose()
 
-    async def _request(self, method, url, return_response=False, **kwargs):
-        """A helper method to handle all API requests."""
-        metrics_tracker.increment_api_requests()
-        logger.debug(f"Request: {method} {url}", extra={'props': {"method": method, "url": url, "params": kwargs.get('params')}})
+    async def _request(self, method, url, return_response=False, with_status=False, decode=json_codec.loads, **kwargs):
+        """A helper method to handle all API requests.
+
+        With `with_status`, returns (data, status_code) so callers can tell a missing
+        resource from a failed request; status_code is None if no response arrived, and
+        429 for any rate-limited refusal, including GitHub's rate-limit 403s.
+        `decode` turns the raw response body into the returned data.
+
+        Identical GETs share one request: a recent response is served from the cache, and
+        callers that arrive while the same request is in flight wait for its response.
+        """
         try:
-            response = await self.client.request(method, url, **kwargs)
-            
-            # Rate limit handling
-            if 'X-RateLimit-Remaining' in response.headers:
-                remaining = int(response.headers['X-RateLimit-Remaining'])
-                if remaining < 100:
-                    reset_time = int(response.headers['X-RateLimit-Reset'])
-                    time_until_reset = max(0, reset_time - time.time())
-                    sleep_duration = time_until_reset + random.randint(19, 199) # time to reset plus random bonus room after reset of 199 seconds to  27 minutes
-                    logger.warning(f"Rate limit approaching ({remaining} left). Sleeping for {sleep_duration:.0f} seconds until after reset.")
-                    metrics_tracker.add_sleep_time(sleep_duration)
-                    await asyncio.sleep(sleep_duration)
-            
+            if method == 'GET':
+                response = await self._get_shared(url, **kwargs)
+            else:
+                response = await self._send(method, url, **kwargs)
+
+            if response.status_code == 304:
+                # Conditional request hit: nothing changed, and it did not count against the rate limit
+                return response if return_response else None
             response.raise_for_status() # Raise an exception for bad status codes
             if return_response:
                 return response
-            return response.json()
+            if with_status:
+                return decode(response.content), response.status_code
+            return decode(response.content)
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error occurred: {e.response.status_code} for URL {e.request.url}")
-            return None if not return_response else None
+            status_code = e.response.status_code
+            if rate_limit_wait(e.response)[0] is not None:
+                # Retries ran out on a rate limit; unlike other 403s this says nothing about the resource
+                status_code = 429
+            return (None, status_code) if with_status else None
         except Exception as e:
             logger.error(f"An error occurred: {e}")
-            return None if not return_response else None
+            return (None, None) if with_status else None
+
+    async def _get_shared(self, url, **kwargs):
+        key = request_key('GET', url, kwargs.get('params'), kwargs.get('headers'))
+        response = self.response_cache.get(key)
+        if response is not None:
+            metrics_tracker.api_cache_hits += 1
+            return response
+        response, shared = await self.in_flight.do(key, lambda: self._send('GET', url, **kwargs))
+        if shared:
+            metrics_tracker.api_coalesced += 1
+        elif response.status_code in CACHEABLE_STATUS and 'headers' not in kwargs and CACHEABLE_PATHS.match(url):
+            # Conditional requests (If-None-Match) are left to the caller's own ETag cache
+            self.response_cache.put(key, response)
+        return response
+
+    async def _send(self, method, url, **kwargs):
+        """Sends one request through the concurrency limiter, retrying rate-limited attempts
+        (see `rate_limit_wait`), and returns the response."""
+        for attempt in range(self.max_retries + 1):
+            metrics_tracker.increment_api_requests(search=url.startswith('/search/'))
+            logger.debug(f"Request: {method} {url}", extra={'props': {"method": method, "url": url, "params": kwargs.get('params')}})
+            await self.limiter.acquire()
+            sent_at = time.perf_counter()
+            outcome = ERROR
+            try:
+                with tracer.span('http', method=method, url=url) as span:
+                    try:
+                        response = await self.client.request(method, url, **kwargs)
+                    finally:
+                        metrics_tracker.add_api_time(time.perf_counter() - sent_at)
+                    span.set(status_code=response.status_code)
+                wait, secondary = rate_limit_wait(response, attempt, self.secondary_backoff)
+                outcome = THROTTLED if secondary else (ERROR if response.status_code >= 500 else OK)
+            finally:
+                await self.limiter.release(time.perf_counter() - sent_at, outcome)
+            if wait is None or attempt == self.max_retries:
+                break
+            kind = "Secondary rate limit" if secondary else "Rate limit exhausted"
+            logger.warning(f"{kind} on {method} {url} ({response.status_code}). Retrying in {wait:.0f} seconds.")
+            metrics_tracker.api_retries += 1
+            metrics_tracker.add_sleep_time(wait)
+            with tracer.span('rate_limit_sleep', seconds=round(wait)):
+                await asyncio.sleep(wait)
+        
+        # Rate limit handling. The search bucket only holds 30 requests per minute and is
+        # paced by the search planner, so the core buffer below does not apply to it.
+        if 'X-RateLimit-Remaining' in response.headers and response.headers.get('X-RateLimit-Resource') != 'search':
+            remaining = int(response.headers['X-RateLimit-Remaining'])
+            if remaining < 100:
+                reset_time = int(response.headers['X-RateLimit-Reset'])
+                time_until_reset = max(0, reset_time - time.time())
+                sleep_duration = time_until_reset + random.randint(19, 199) # time to reset plus random bonus room after reset of 199 seconds to  27 minutes
+                logger.warning(f"Rate limit approaching ({remaining} left). Sleeping for {sleep_duration:.0f} seconds until after reset.")
+                metrics_tracker.add_sleep_time(sleep_duration)
+                with tracer.span('rate_limit_sleep', seconds=round(sleep_duration)):
+                    await asyncio.sleep(sleep_duration)
+        return response
 
     async def search_repositories(self, query, limit, page=1):
         params = {"q": query, "per_page": limit, "page": page}
         data = await self._request("GET", "/search/repositories", params=params)
         return data['items'] if data and 'items' in data else []
 
+    async def search_repositories_page(self, query, per_page=100, page=1, projection=None):
+        """Fetches one page of a repository search.
+
+        Returns (items, total_count, (remaining, reset)) where the last element describes the
+        search rate-limit bucket. `items` is None if the request failed. With a `projection`
+        (e.g. SEARCH_REPO_FIELDS) only those fields of each repository are kept.
+        """
+        params = {"q": query, "per_page": per_page, "page": page}
+        response = await self._request("GET", "/search/repositories", return_response=True, params=params)
+        if response is None:
+            return None, 0, (None, None)
+        if projection:
+            _, data = decode_items(response.content, projection, items_key='items')
+        else:
+            data = json_codec.loads(response.content)
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        rate = (int(remaining) if remaining else None, int(reset) if reset else None)
+        return data.get('items', []), data.get('total_count', 0), rate
+
     async def search_users(self, query, limit, sort='followers', order='asc', page=1):
         params = {"q": query, "sort": sort, "order": order, "per_page": limit, "page": page}
         data = await self._request("GET", "/search/users", params=params)
@@ -74,7 +216,7 @@ class GithubAPI:
 
     async def follow_user(self, username):
         try:
-            response = await self.client.put(f"/user/following/{username}")
+            response = await self._send("PUT", f"/user/following/{username}")
             response.raise_for_status()
             return True
         except httpx.HTTPStatusError as e:
@@ -86,7 +228,7 @@ class GithubAPI:
 
     async def unfollow_user(self, username):
         try:
-            response = await self.client.delete(f"/user/following/{username}")
+            response = await self._send("DELETE", f"/user/following/{username}")
             response.raise_for_status()
             return True
         except httpx.HTTPStatusError as e:
@@ -96,9 +238,18 @@ class GithubAPI:
             logger.error(f"An error occurred while unfollowing {username}: {e}")
             return False
 
-    async def check_is_follower(self, username):
+    async def check_is_follower(self, username, me=None):
+        """Checks whether `username` follows the authenticated user (`me`).
+
+        Costs one request per user; `sync_followers` covers every followed user from a
+        single paginated follower list and should be preferred for bulk checks.
+        """
+        me = me or await self.get_authenticated_user()
+        if not me:
+            return False
         try:
-            response = await self.client.get(f"/user/following/{username}")
+            # Through the shared GET path, so the check is limited, retried, counted and cached
+            response = await self._get_shared(f"/users/{username}/following/{me}")
             if response.status_code == 204: # 204 No Content means following
                 return True
             elif response.status_code == 404: # 404 Not Found means not following
@@ -114,32 +265,36 @@ class GithubAPI:
             logger.error(f"An error occurred checking follower status for {username}: {e}")
             return False
 
-    async def get_user_details(self, username):
-        return await self._request("GET", f"/users/{username}")
+    async def get_user_details(self, username, with_status=False):
+        return await self._request("GET", f"/users/{username}", with_status=with_status)
 
-    async def get_user_repos(self, username):
+    async def get_user_repos(self, username, with_commit_counts=True):
         repos = await self._request("GET", f"/users/{username}/repos")
         if not repos:
             return []
+        if with_commit_counts:
+            await self.add_commit_counts(repos)
+        return repos
 
-        async def get_commit_count(repo):
-            owner = repo['owner']['login']
-            repo_name = repo['name']
-            # Fetch just one commit to get totalCount efficiently from headers
-            response = await self.client.head(f"/repos/{owner}/{repo_name}/commits?per_page=1")
-            if 'link' in response.headers:
-                link_header = response.headers['link']
-                # Regex to find the last page number
-                match = re.search(r'page=(\d+)[^>]*>; rel="last"', link_header)
-                if match:
-                    return int(match.group(1))
-            # Fallback if Link header is not present or doesn't contain 'last' rel
-            # This might not be accurate for very large repos, but better than nothing
-            commits_data = await self._request("GET", f"/repos/{owner}/{repo_name}/commits?per_page=1")
-            return len(commits_data) if commits_data else 0
-
+    async def get_commit_count(self, owner, repo_name):
+        # Fetch just one commit to get totalCount efficiently from headers. Through _send, so
+        # the gather in add_commit_counts stays within the concurrency limit
+        response = await self._send("HEAD", f"/repos/{owner}/{repo_name}/commits?per_page=1")
+        if 'link' in response.headers:
+            link_header = response.headers['link']
+            # Regex to find the last page number
+            match = re.search(r'[?&]page=(\d+)[^>]*>; rel="last"', link_header)
+            if match:
+                return int(match.group(1))
+        # Fallback if Link header is not present or doesn't contain 'last' rel
+        # This might not be accurate for very large repos, but better than nothing
+        commits_data = await self._request("GET", f"/repos/{owner}/{repo_name}/commits?per_page=1")
+        return len(commits_data) if commits_data else 0
+
+    async def add_commit_counts(self, repos):
+        """Sets `commits_count` on each repo, one request per repo."""
         # Gather all commit count fetching tasks concurrently
-        commit_counts = await asyncio.gather(*[get_commit_count(repo) for repo in repos])
+        commit_counts = await asyncio.gather(*[self.get_commit_count(repo['owner']['login'], repo['name']) for repo in repos])
 
         for i, repo in enumerate(repos):
             repo['commits_count'] = commit_counts[i]
@@ -166,38 +321,75 @@ class GithubAPI:
     async def get_public_events(self, per_page=100):
         return await self._request("GET", "/events", params={"per_page": per_page})
 
+    async def get_public_events_page(self, page=1, per_page=100, etag=None, projection=None):
+        """Fetches one page of the public events feed as a conditional request.
+
+        Returns (events, etag, poll_interval, has_next). `events` is None when the page
+        has not changed since `etag` (HTTP 304) or the request failed. With a `projection`
+        (e.g. PUBLIC_EVENT_FIELDS) only those fields of each event are kept.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await self._request("GET", "/events", return_response=True,
+                                       params={"per_page": per_page, "page": page}, headers=headers)
+        if response is None:
+            return None, etag, None, False
+        poll_interval = int(response.headers.get('X-Poll-Interval', 60))
+        has_next = 'rel="next"' in response.headers.get('link', '')
+        if response.status_code == 304:
+            return None, etag, poll_interval, has_next
+        if projection:
+            events, _ = decode_items(response.content, projection)
+        else:
+            events = json_codec.loads(response.content)
+        return events, response.headers.get('ETag', etag), poll_interval, has_next
+
     async def get_repo_events(self, owner, repo_name, limit=100):
         """Fetches recent events for a specific repository."""
         return await self._request("GET", f"/repos/{owner}/{repo_name}/events", params={"per_page": limit})
 
     async def get_authenticated_user(self):
         """Gets the username of the authenticated user."""
-        data = await self._request("GET", "/user")
+        data = await self.get_authenticated_profile()
         return data['login'] if data and 'login' in data else None
 
-    async def _get_paginated_list(self, endpoint):
-        """Gets a full list from a paginated endpoint concurrently."""
+    async def get_authenticated_profile(self):
+        """Gets the authenticated user's profile, including its follower and following counts."""
+        return await self._request("GET", "/user")
+
+    async def get_rate_limit(self):
+        """Gets the rate-limit buckets ({'core': {'limit', 'remaining', 'reset', ...}, 'search': ...}).
+        Reading them does not count against any bucket."""
+        data = await self._request("GET", "/rate_limit")
+        return data.get('resources') if data else None
+
+    async def _get_paginated_list(self, endpoint, strict=False):
+        """Gets a full list from a paginated endpoint concurrently.
+
+        Pages that fail are skipped, unless `strict` is set: then any failed page makes the
+        whole call return None, for callers that must not mistake a partial list for a full one.
+        """
         result_list = []
+        failed_pages = 0
         
         # 1. Fetch first page with response object to check headers
         params = {"per_page": 100, "page": 1}
         response = await self._request("GET", endpoint, return_response=True, params=params)
         
         if not response:
-            return result_list
+            return None if strict else result_list
             
-        data = response.json()
+        data = decode_logins(response.content)
         if not data:
             return result_list
             
-        result_list.extend([item['login'] for item in data])
+        result_list.extend(data)
         
         if len(data) < 100:
             return result_list # No more pages
 
         last_page = None
         if 'link' in response.headers:
-            match = re.search(r'page=(\d+)[^>]*>; rel="last"', response.headers['link'])
+            match = re.search(r'[?&]page=(\d+)[^>]*>; rel="last"', response.headers['link'])
             if match:
                 last_page = int(match.group(1))
 
@@ -209,35 +401,41 @@ class GithubAPI:
                 tasks = []
                 for page in range(start_page, end_page):
                     page_params = {"per_page": 100, "page": page}
-                    tasks.append(self._request("GET", endpoint, params=page_params))
+                    tasks.append(self._request("GET", endpoint, params=page_params, decode=decode_logins))
                     
                 results = await asyncio.gather(*tasks)
                 for page_data in results:
                     if page_data:
-                        result_list.extend([item['login'] for item in page_data])
+                        result_list.extend(page_data)
+                    elif page_data is None:
+                        failed_pages += 1
         else:
             page = 2
             while True:
                 tasks = []
                 for p in range(page, page + chunk_size):
                     page_params = {"per_page": 100, "page": p}
-                    tasks.append(self._request("GET", endpoint, params=page_params))
+                    tasks.append(self._request("GET", endpoint, params=page_params, decode=decode_logins))
                     
                 results = await asyncio.gather(*tasks)
                 
                 finished = False
                 for page_data in results:
                     if page_data:
-                        result_list.extend([item['login'] for item in page_data])
+                        result_list.extend(page_data)
                         if len(page_data) < 100:
                             finished = True
                     else:
+                        failed_pages += page_data is None
                         finished = True
                         
                 if finished:
                     break
                 page += chunk_size
 
+        if failed_pages and strict:
+            logger.warning(f"{failed_pages} page(s) of {endpoint} could not be fetched; discarding the partial list.")
+            return None
         return result_list
 
     async def get_following(self, username):
@@ -248,11 +446,30 @@ class GithubAPI:
         """Gets the full list of users who follow a user concurrently."""
         return await self._get_paginated_list(f"/users/{username}/followers")
 
-    async def get_my_followers(self):
-        """Gets the full list of users who follow the authenticated user concurrently."""
-        return await self._get_paginated_list("/user/followers")
+    async def get_my_followers(self, strict=False):
+        """Gets the full list of users who follow the authenticated user concurrently.
+        With `strict`, returns None instead of a list missing failed pages."""
+        return await self._get_paginated_list("/user/followers", strict=strict)
+
+    async def get_comprehensive_user_data(self, username, since_date_events=None, validator=None):
+        """Fetches a user's profile and enrichment data.
+
+        Without a `validator` everything is fetched in parallel. With one, the data is
+        fetched in cascade stages: the profile first, then only the enrichment stages
+        the criteria use, stopping at the first stage that disqualifies the user.
+        Data of stages that did not run is None.
+        """
+        if validator is not None:
+            user_details = await self.get_user_details(username)
+            if not user_details:
+                return None, None, None, None, None, None
+            enrichment = {}
+            is_disqualified, _ = validator.is_disqualified(user_details)
+            if not is_disqualified:
+                await validator.evaluate_enrichment(self, user_details, enrichment)
+            return (user_details, enrichment.get('repos'), enrichment.get('starred'), enrichment.get('orgs'),
+                    enrichment.get('events'), enrichment.get('readme'))
 
-    async def get_comprehensive_user_data(self, username, since_date_events=None):
         user_details, repos_data, starred_repos_data, orgs_data, events_data, profile_readme_content = await asyncio.gather(
             self.get_user_details(username),
             self.get_user_repos(username),
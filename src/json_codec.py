@@ -0,0 +1,82 @@
+"""JSON decoding for API payloads, using orjson when it is installed.
+
+Besides plain `loads`/`dumps`, this module offers projections: small compiled
+extractors that copy only the fields a caller reads out of a decoded object, so the
+full payload can be dropped right after decoding.
+
+    OWNER_FIELDS = Projection('owner.login', 'owner.type', 'created_at')
+    items = decode_items(response.content, OWNER_FIELDS, items_key='items')
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+if orjson:
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
+
+
+class Projection:
+    """Copies a fixed set of dotted field paths out of a decoded JSON object.
+
+    The result keeps the original nesting, so `repo['owner']['login']` still works on a
+    projected repository. Missing fields are left out.
+    """
+    __slots__ = ('paths', '_tree')
+
+    def __init__(self, *paths):
+        self.paths = paths
+        self._tree = {}
+        for path in paths:
+            node = self._tree
+            *parents, leaf = path.split('.')
+            for key in parents:
+                node = node.setdefault(key, {})
+            node[leaf] = None
+
+    def __call__(self, obj):
+        return self._copy(obj, self._tree)
+
+    def _copy(self, obj, tree):
+        out = {}
+        for key, subtree in tree.items():
+            if key not in obj:
+                continue
+            value = obj[key]
+            if subtree is not None and isinstance(value, dict):
+                value = self._copy(value, subtree)
+            out[key] = value
+        return out
+
+
+def decode_items(content, projection, items_key=None):
+    """Decodes a list payload (or the list under `items_key`) and projects every item.
+
+    Returns (items, payload) where `payload` is the decoded top-level object with its
+    item list replaced by the projected one, so the raw items can be freed at once.
+    """
+    payload = loads(content)
+    raw_items = payload.get(items_key) if items_key else payload
+    if not isinstance(raw_items, list):
+        return [], payload
+    items = [projection(item) for item in raw_items]
+    if items_key:
+        payload[items_key] = items
+    else:
+        payload = items
+    return items, payload
@@ -1,11 +1,24 @@
 import logging
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 from pythonjsonlogger import jsonlogger
 
 class SummaryFilter(logging.Filter):
     def filter(self, record):
         return getattr(record, 'is_summary', False)
 
+class ExcludeLoggersFilter(logging.Filter):
+    """Drops records from the named loggers and their children."""
+    def __init__(self, names):
+        super().__init__()
+        self.names = tuple(names)
+
+    def filter(self, record):
+        return not any(record.name == name or record.name.startswith(name + '.') for name in self.names)
+
 def setup_logger():
     """Set up the logger for structured JSON output."""
     logger = logging.getLogger()
@@ -14,6 +27,7 @@ def setup_logger():
     # Remove existing handlers to avoid duplicate logs
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+        handler.close()
 
     # File handler for JSON logs - Only for summaries
     log_handler = logging.FileHandler("reach.log")
@@ -28,4 +42,122 @@ def setup_logger():
     console_handler.setFormatter(console_formatter)
     logger.addHandler(console_handler)
 
-    return logger
\ No newline at end of file
+    return logger
+
+class DatabaseLogHandler(logging.Handler):
+    """Writes log records to the `logs` table from a background thread.
+
+    `emit` only puts the record on a bounded queue, so logging never waits for SQLite.
+    The writer thread collects a batch every `flush_interval` seconds, or as soon as
+    `batch_size` records are waiting, and hands it to the `reach-db` thread, which inserts
+    it in one transaction like every other database write. Every `prune_interval` seconds
+    it also applies the retention policy (`max_rows`, `max_age_days`) there. Records are
+    dropped, and counted in `dropped`, when the queue is full.
+    """
+    _STOP = object()
+
+    def __init__(self, level=logging.INFO, batch_size=200, flush_interval=2.0, max_queue=10000,
+                 max_rows=50000, max_age_days=14, prune_interval=300):
+        super().__init__(level)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.prune_interval = prune_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._thread = threading.Thread(target=self._run, name='reach-log-writer', daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        # Records about a failed log write would feed back into the queue
+        if threading.current_thread() is self._thread:
+            return
+        try:
+            entry = {
+                'timestamp': datetime.fromtimestamp(record.created, timezone.utc),
+                'level': record.levelname,
+                'message': self.format(record),
+            }
+            with self._flushed:
+                self._pending += 1
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._flushed:
+                self._pending -= 1
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self):
+        from . import database
+        from .db_executor import db_executor
+
+        last_prune = 0.0
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    db_executor.call(database.write_log_records, batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    sys.stderr.write(f"Could not write {len(batch)} log records to the database: {e}\n")
+                with self._flushed:
+                    self._pending -= len(batch)
+                    self._flushed.notify_all()
+            if time.monotonic() - last_prune >= self.prune_interval:
+                last_prune = time.monotonic()
+                try:
+                    db_executor.call(database.prune_logs, self.max_rows, self.max_age_days)
+                except Exception as e:
+                    sys.stderr.write(f"Could not prune the logs table: {e}\n")
+
+    def flush(self, timeout=10.0):
+        """Waits until every record emitted so far has been written."""
+        with self._flushed:
+            self._flushed.wait_for(lambda: self._pending <= 0 or not self._thread.is_alive(), timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        super().close()
+
+
+def attach_database_log_handler(settings):
+    """Adds a DatabaseLogHandler to the root logger, configured by `logging.database` in
+    settings. Returns the handler, or None if it is disabled."""
+    db_settings = settings.get('logging', {}).get('database', {})
+    if not db_settings.get('enabled', False):
+        return None
+    handler = DatabaseLogHandler(
+        level=logging.getLevelName(db_settings.get('level', 'INFO').upper()),
+        batch_size=db_settings.get('batch_size', 200),
+        flush_interval=db_settings.get('flush_interval_seconds', 2.0),
+        max_queue=db_settings.get('max_queue', 10000),
+        max_rows=db_settings.get('max_rows', 50000),
+        max_age_days=db_settings.get('max_age_days', 14),
+        prune_interval=db_settings.get('prune_interval_seconds', 300),
+    )
+    # httpx logs one INFO line per request, which would crowd out the bot's own records
+    handler.addFilter(ExcludeLoggersFilter(db_settings.get('exclude_loggers', ['httpx', 'httpcore'])))
+    handler.setFormatter(logging.Formatter("%(name)s - %(message)s"))
+    logging.getLogger().addHandler(handler)
+    return handler
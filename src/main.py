@@ -1,20 +1,44 @@
 import argparse
+import logging
 import time
 import random
 import asyncio
 import os
 from .config_loader import load_config
-from .database import initialize_database, get_user_stats
-from .logger import setup_logger
-from .scanner import scan_for_users
-from .actions import follow_users, unfollow_users
-from .metrics import metrics_tracker
+from .database import initialize_database, get_user_stats, record_stage_costs
+from .logger import setup_logger, attach_database_log_handler
+from .scanner import scan_for_users, import_archive_users
+from .actions import follow_users, unfollow_users, track_follow_backs
+from .metrics import metrics_tracker, counting_api_calls
+from .github_api import GithubAPI
+from .cassette import RecordingTransport, ReplayTransport
+from .snapshot import restore_state_if_needed, export_state_from_settings
+from .profiler import RunProfiler
+from .tracing import configure_tracing, tracer
+from .budget_planner import plan_run
 
 # Import the dashboard app
 from .dashboard.app import app as dashboard_app
 
 LOCK_FILE = "reach.lock"
 
+# API-consuming stages of each action, in the order they run
+ACTION_STAGES = {
+    'scan': ['scan'],
+    'track': ['track'],
+    'unfollow': ['unfollow'],
+    'follow': ['follow'],
+    'all': ['scan', 'unfollow', 'follow'],
+}
+
+async def run_stage(name, plan, coro):
+    """Runs one stage of the run, timing it and recording its API cost in the plan."""
+    with metrics_tracker.stage(name), counting_api_calls() as calls:
+        result = await coro
+    if plan:
+        plan.record(name, calls)
+    return result
+
 async def random_long_sleep(start_time, settings):
     """
     Puts the bot to sleep for a random duration after an initial operational period.
@@ -47,21 +71,45 @@ async def main():
         logger.info("Bot is already running. Exiting.")
         return
 
+    profiler = None
+    db_log_handler = None
     try:
         with open(LOCK_FILE, "w") as f:
             f.write(str(os.getpid()))
 
         logger.info("Bot starting...")
         start_time = time.time()
+        settings, criteria = load_config()
+        # CI checkouts only carry the compact snapshots, so rebuild reach.db from them first
+        restore_state_if_needed(settings)
         initialize_database()
-        settings, _ = load_config()
+        db_log_handler = attach_database_log_handler(settings)
 
         parser = argparse.ArgumentParser(description="Reach GitHub Bot")
-        parser.add_argument("--action", choices=['scan', 'follow', 'unfollow', 'all'], help="The action to perform.")
+        parser.add_argument("--action", choices=['scan', 'import-archive', 'follow', 'unfollow', 'track', 'all'], help="The action to perform.")
         parser.add_argument("--dry-run", action="store_true", help="Simulate actions without making any changes.")
         parser.add_argument("--dashboard", action="store_true", help="Launch the monitoring dashboard.")
+        parser.add_argument("--archive", nargs='+', metavar="PATH", help="GH Archive .json.gz dumps to read with --action import-archive.")
+        parser.add_argument("--record", metavar="PATH", help="Record every API request/response of this run to a cassette file.")
+        parser.add_argument("--replay", metavar="PATH", help="Serve API responses from a recorded cassette instead of the network.")
+        parser.add_argument("--replay-latency-scale", type=float, default=1.0, help="Multiplier for the recorded latency when replaying (0 disables it).")
+        parser.add_argument("--profile", action="store_true", help="Sample stacks into a flamegraph file and report callbacks that block the event loop.")
+        parser.add_argument("--trace", action="store_true", help="Write per-candidate tracing spans to the JSONL file set in settings (tracing.path).")
         args = parser.parse_args()
 
+        configure_tracing(settings, enabled=args.trace)
+
+        if args.profile:
+            profiler = RunProfiler(settings)
+            profiler.start()
+
+        if args.replay:
+            logger.info(f"Replaying API traffic from {args.replay} (latency x{args.replay_latency_scale}).")
+            GithubAPI.transport = ReplayTransport(args.replay, latency_scale=args.replay_latency_scale)
+        if args.record:
+            logger.info(f"Recording API traffic to {args.record}.")
+            GithubAPI.transport = RecordingTransport(args.record, GithubAPI.transport)
+
         if args.dashboard:
             logger.info("Launching dashboard...")
             # Flask app.run is synchronous, so it will block here.
@@ -75,22 +123,51 @@ async def main():
 
         logger.info(f"Action: {args.action}, Dry Run: {args.dry_run}")
 
+        plan = None
+        if args.action in ACTION_STAGES and settings.get('budget', {}).get('enabled', False):
+            plan = await plan_run(settings, criteria, ACTION_STAGES[args.action], dry_run=args.dry_run)
+
         if args.action in ['scan', 'all']:
             logger.info("Scanning for users...")
-            await scan_for_users(dry_run=args.dry_run)
+            await run_stage('scan', plan, scan_for_users(dry_run=args.dry_run, plan=plan))
+
+        if args.action == 'import-archive':
+            if not args.archive:
+                parser.error("--archive is required with --action import-archive.")
+            logger.info("Importing users from GH Archive dumps...")
+            await run_stage('import-archive', plan, import_archive_users(args.archive, dry_run=args.dry_run))
+
+        if args.action == 'track':
+            logger.info("Tracking follow-backs...")
+            await run_stage('track', plan, track_follow_backs(dry_run=args.dry_run))
 
         if args.action in ['unfollow', 'all']:
             logger.info("Processing unfollows...")
-            await unfollow_users(dry_run=args.dry_run)
+            await run_stage('unfollow', plan, unfollow_users(dry_run=args.dry_run))
 
         if args.action in ['follow', 'all']:
             logger.info("Processing follows...")
-            await follow_users(dry_run=args.dry_run)
+            await run_stage('follow', plan, follow_users(dry_run=args.dry_run))
 
         logger.info("Bot run finished.")
+        if profiler:
+            await profiler.stop()
+        if plan:
+            plan.log_report()
+            if not args.dry_run:
+                record_stage_costs(plan.history_costs(), settings['budget'].get('history_weight', 0.3))
         metrics_tracker.log_summary()
+        export_state_from_settings(settings)
         # await random_long_sleep(start_time, settings)  # Disabled to optimize workflow runtime
     finally:
+        if profiler:
+            await profiler.stop()
+        tracer.close()
+        if db_log_handler:
+            logging.getLogger().removeHandler(db_log_handler)
+            db_log_handler.close()
+        if isinstance(GithubAPI.transport, RecordingTransport):
+            GithubAPI.transport.close()
         if os.path.exists(LOCK_FILE):
             os.remove(LOCK_FILE)
 
@@ -0,0 +1,189 @@
+"""Compact on-disk membership index of logins the bot has already seen.
+
+The index answers "is this login already followed, disqualified or validated?" without
+a database round trip. Each login is reduced to a 64-bit hash. The hashes are kept in a
+sorted array for exact lookups, with a Bloom filter in front so that the common case,
+a login that is not in the index, is rejected without touching the array.
+
+File layout (little-endian):
+
+    header   magic, version, key count, Bloom bit count, hash count, build time
+    keys     sorted uint64 login hashes
+    bloom    Bloom filter bits
+
+The file is memory-mapped when loaded, so startup cost and resident memory do not
+depend on the number of logins. It is a cache: missing or stale files are rebuilt
+from the database.
+"""
+import array
+import bisect
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+
+from . import database
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RMIX'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQId')
+HEADER_SIZE = 40  # HEADER padded so the key array stays 8-byte aligned
+
+
+def login_hash(login):
+    """Returns the 64-bit hash of a login. GitHub logins are case-insensitive."""
+    return int.from_bytes(hashlib.blake2b(login.lower().encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _bloom_positions(key, bloom_bits, hash_count):
+    # Double hashing: derive every probe from the two halves of the 64-bit key
+    h1 = key & 0xFFFFFFFF
+    h2 = (key >> 32) | 1
+    return [(h1 + i * h2) % bloom_bits for i in range(hash_count)]
+
+
+class MembershipIndex:
+    """Bloom filter plus sorted hash array, with an in-memory overlay for logins added
+    since the file was built."""
+
+    def __init__(self, keys, bloom, hash_count, built_at, mapping=None):
+        self.keys = keys
+        self.bloom = bloom
+        self.bloom_bits = len(bloom) * 8
+        self.hash_count = hash_count
+        self.built_at = built_at
+        self.added = set()
+        self._mapping = mapping
+
+    @classmethod
+    def from_logins(cls, logins, bits_per_key=10):
+        """Builds an in-memory index from an iterable of logins."""
+        return cls.from_keys({login_hash(login) for login in logins}, bits_per_key)
+
+    @classmethod
+    def from_keys(cls, keys, bits_per_key=10):
+        """Builds an in-memory index from login hashes."""
+        keys = array.array('Q', sorted(keys))
+        bloom_bits = max(64, int(len(keys) * bits_per_key))
+        bloom_bits += -bloom_bits % 8
+        hash_count = max(1, round(bits_per_key * math.log(2)))
+        bloom = bytearray(bloom_bits // 8)
+        for key in keys:
+            for position in _bloom_positions(key, bloom_bits, hash_count):
+                bloom[position >> 3] |= 1 << (position & 7)
+        return cls(memoryview(keys), memoryview(bloom), hash_count, time.time())
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps an index file written by `save`."""
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        magic, version, key_count, bloom_bits, hash_count, built_at = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            view.release()
+            mapping.close()
+            raise ValueError(f"{path} is not a membership index (version {VERSION}).")
+        keys_end = HEADER_SIZE + key_count * 8
+        keys = view[HEADER_SIZE:keys_end].cast('Q')
+        bloom = view[keys_end:keys_end + bloom_bits // 8]
+        return cls(keys, bloom, hash_count, built_at, mapping)
+
+    def save(self, path, bits_per_key=10):
+        """Writes the index, including logins added since it was built, atomically.
+        The build time is kept, so additions do not postpone the next full rebuild."""
+        index = self
+        if self.added:
+            index = MembershipIndex.from_keys(self.added.union(self.keys), bits_per_key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(index.keys), index.bloom_bits, index.hash_count, self.built_at))
+            f.write(b'\0' * (HEADER_SIZE - HEADER.size))
+            f.write(index.keys.tobytes())
+            f.write(index.bloom.tobytes())
+        os.replace(tmp_path, path)
+        logger.info(f"Saved membership index with {len(index)} logins to {path}.")
+
+    def close(self):
+        if self._mapping is not None:
+            self.keys.release()
+            self.bloom.release()
+            self._mapping.close()
+            self._mapping = None
+
+    def _contains_key(self, key):
+        if key in self.added:
+            return True
+        for position in _bloom_positions(key, self.bloom_bits, self.hash_count):
+            if not self.bloom[position >> 3] & (1 << (position & 7)):
+                return False
+        i = bisect.bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def __contains__(self, login):
+        return self._contains_key(login_hash(login))
+
+    def add(self, login):
+        key = login_hash(login)
+        if not self._contains_key(key):
+            self.added.add(key)
+
+    def update(self, logins):
+        for login in logins:
+            self.add(login)
+
+    def __len__(self):
+        return len(self.keys) + len(self.added)
+
+
+def _membership_settings(settings):
+    membership = settings.get('membership', {}) if settings else {}
+    return {
+        'path': membership.get('path', 'membership.idx'),
+        'max_age_hours': membership.get('max_age_hours', 24),
+        'bits_per_key': membership.get('bits_per_key', 10),
+        'skipped_recheck_days': membership.get('skipped_recheck_days', 30),
+    }
+
+
+def build_index_from_database(bits_per_key=10, skipped_recheck_days=None):
+    """Builds an index of the usernames in the users and disqualified tables, leaving out
+    skipped users not checked for `skipped_recheck_days`."""
+    started = time.perf_counter()
+    logins = database.iter_known_usernames(skipped_max_age_days=skipped_recheck_days)
+    index = MembershipIndex.from_logins(logins, bits_per_key)
+    logger.info(f"Built membership index of {len(index)} logins in {time.perf_counter() - started:.2f}s.")
+    return index
+
+
+def load_membership_index(settings=None, dry_run=False, rebuild=False):
+    """Loads the index file, rebuilding it from the database when missing, unreadable,
+    older than `membership.max_age_hours` or when `rebuild` is set (e.g. after
+    disqualifications expired). Dry runs never write the file."""
+    options = _membership_settings(settings)
+    path = options['path']
+    if os.path.exists(path) and not rebuild:
+        try:
+            index = MembershipIndex.load(path)
+            if time.time() - index.built_at < options['max_age_hours'] * 3600:
+                logger.info(f"Loaded membership index of {len(index)} logins from {path}.")
+                return index
+            index.close()
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable membership index {path}: {e}")
+    index = build_index_from_database(options['bits_per_key'], options['skipped_recheck_days'])
+    if not dry_run:
+        index.save(path, options['bits_per_key'])
+    return index
+
+
+def save_membership_index(index, settings=None):
+    """Persists logins added during the run."""
+    options = _membership_settings(settings)
+    if index.added:
+        index.save(options['path'], options['bits_per_key'])
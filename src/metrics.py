@@ -1,9 +1,42 @@
 import time
 import logging
+import contextvars
+from contextlib import contextmanager
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+# Per-task API call counter, set with `counting_api_calls` to attribute calls to a run stage or discovery source
+_api_call_counter = contextvars.ContextVar('api_call_counter', default=None)
+
+
+class ApiCallCounter:
+    """API requests sent while the counter was active. Counters nest: a request counts
+    towards the innermost counter and every counter enclosing it."""
+    __slots__ = ('calls', 'search_calls', 'parent')
+
+    def __init__(self, parent=None):
+        self.calls = 0
+        self.search_calls = 0
+        self.parent = parent
+
+    @property
+    def core_calls(self):
+        return self.calls - self.search_calls
+
+
+@contextmanager
+def counting_api_calls():
+    """Counts the API requests sent by the current task, and by tasks it creates inside
+    the block, into the yielded counter."""
+    counter = ApiCallCounter(_api_call_counter.get())
+    token = _api_call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _api_call_counter.reset(token)
+
+
 class BotMetrics:
     def __init__(self):
         self.start_time = time.time()
@@ -15,9 +48,28 @@ class BotMetrics:
         self.users_scheduled = 0
         self.users_followed = 0
         self.users_unfollowed = 0
+        self.db_calls = 0
+        self.db_queue_wait = 0.0
+        self.db_max_queue_wait = 0.0
+        self.db_time = 0.0
+        self.api_time = 0.0
+        self.api_concurrency_limit = 0
+        self.api_concurrency_peak = 0
+        self.api_concurrency_low = 0
+        self.api_throttled = 0
+        self.api_retries = 0
+        self.api_cache_hits = 0
+        self.api_coalesced = 0
+        # Stage name -> [wall seconds, CPU seconds, runs], in the order stages first ran
+        self.stage_times = {}
 
-    def increment_api_requests(self):
+    def increment_api_requests(self, search=False):
         self.api_requests += 1
+        counter = _api_call_counter.get()
+        while counter is not None:
+            counter.calls += 1
+            counter.search_calls += search
+            counter = counter.parent
 
     def increment_errors(self):
         self.errors += 1
@@ -25,6 +77,42 @@ class BotMetrics:
     def add_sleep_time(self, duration):
         self.total_sleep_time += duration
 
+    def add_db_call(self, queue_wait, duration):
+        """Records one call on the database thread: time spent waiting in its queue and running."""
+        self.db_calls += 1
+        self.db_queue_wait += queue_wait
+        self.db_max_queue_wait = max(self.db_max_queue_wait, queue_wait)
+        self.db_time += duration
+
+    def add_api_time(self, duration):
+        self.api_time += duration
+
+    def set_api_concurrency(self, limit):
+        """Records the current adaptive limit on concurrent API requests."""
+        self.api_concurrency_limit = limit
+        self.api_concurrency_peak = max(self.api_concurrency_peak, limit)
+        self.api_concurrency_low = min(self.api_concurrency_low, limit) if self.api_concurrency_low else limit
+
+    @contextmanager
+    def stage(self, name):
+        """Times a stage of the run. CPU time is process-wide, so it includes the database
+        thread and any tasks running concurrently with the stage."""
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.stage_times.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += time.perf_counter() - wall_start
+            totals[1] += time.process_time() - cpu_start
+            totals[2] += 1
+
+    def format_stage_times(self):
+        lines = []
+        for name, (wall, cpu, runs) in self.stage_times.items():
+            repeat = f" over {runs} runs" if runs > 1 else ""
+            lines.append(f"  {name}: {wall:.2f}s wall, {cpu:.2f}s CPU{repeat}\n")
+        return ''.join(lines)
+
     def log_summary(self):
         """Logs a comprehensive summary of the bot's run."""
         hit_rate = (self.users_scheduled / self.users_processed * 100) if self.users_processed > 0 else 0
@@ -37,6 +125,7 @@ class BotMetrics:
         minutes, seconds = divmod(remainder, 60)
         milliseconds = sleep_td.microseconds // 1000
         formatted_sleep_time = f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+        avg_db_wait_ms = (self.db_queue_wait / self.db_calls * 1000) if self.db_calls > 0 else 0
 
         summary = (
             "\n---SUMMARY---"
@@ -50,7 +139,12 @@ class BotMetrics:
             f"Total users resulting to errors: {self.errors}\n" +
             f"Total number of API requests sent: {self.api_requests}\n" +
             f"Total sleeping time: {formatted_sleep_time}\n" +
-            f"Total runtime: {timedelta(seconds=total_runtime)}\n"
+            f"Database calls: {self.db_calls} ({self.db_time:.2f}s running, avg queue wait {avg_db_wait_ms:.1f}ms, max {self.db_max_queue_wait * 1000:.1f}ms)\n" +
+            f"API concurrency limit: {self.api_concurrency_limit} at the end (range {self.api_concurrency_low}-{self.api_concurrency_peak}), {self.api_throttled} throttled responses, {self.api_retries} retries\n" +
+            f"Duplicate GETs avoided: {self.api_cache_hits} served from the response cache, {self.api_coalesced} coalesced with an in-flight request\n" +
+            f"Time waiting on API responses: {self.api_time:.2f}s (summed over concurrent requests)\n" +
+            f"Total runtime: {timedelta(seconds=total_runtime)} (CPU {time.process_time():.2f}s)\n" +
+            (f"Stage timings:\n{self.format_stage_times()}" if self.stage_times else "")
         )
         logger.info(summary, extra={'is_summary': True})
 
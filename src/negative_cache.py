@@ -0,0 +1,58 @@
+import logging
+
+from .database import record_negative_result, get_negative_cached, prune_negative_cache
+
+logger = logging.getLogger(__name__)
+
+# Hours a login is skipped after its first failure, per reason
+DEFAULT_TTL_HOURS = {'not_found': 720, 'unavailable': 168, 'error': 6}
+
+
+def failure_reason(status_code):
+    """Maps the status of a failed profile lookup to a negative cache reason.
+
+    `GithubAPI` reports rate-limited 403s as 429, so a 403 here is a real permission error.
+    """
+    if status_code in (404, 410):
+        return 'not_found'  # Deleted or renamed account
+    if status_code in (403, 451):
+        return 'unavailable'  # Suspended, blocked or legally withheld
+    return 'error'  # Server errors, rate limiting or no response at all
+
+
+class NegativeCache:
+    """Remembers logins whose profile lookup failed so they are not fetched again every run.
+
+    Entries expire after a per-reason TTL that grows by `backoff_factor` with every
+    repeated failure. Dry runs read the cache but never write to it.
+    """
+
+    def __init__(self, settings=None, dry_run=False):
+        cache_settings = (settings or {}).get('negative_cache', {})
+        self.dry_run = dry_run
+        self.ttl_hours = {**DEFAULT_TTL_HOURS, **cache_settings.get('ttl_hours', {})}
+        self.backoff_factor = cache_settings.get('backoff_factor', 2.0)
+        self.max_ttl_hours = cache_settings.get('max_ttl_hours', 2160)
+        self.hits = 0
+        self.failed = set()  # Logins whose lookup failed during this run
+
+    def prune(self):
+        if not self.dry_run:
+            prune_negative_cache(self.max_ttl_hours)
+
+    def cached(self, usernames):
+        """Returns the logins that should be skipped without any API call."""
+        cached = get_negative_cached(usernames)
+        self.hits += len(cached)
+        return cached
+
+    def record_failure(self, username, status_code):
+        reason = failure_reason(status_code)
+        self.failed.add(username)
+        if self.dry_run:
+            return reason
+        retry_after = record_negative_result(username, reason, status_code, self.ttl_hours[reason],
+                                             self.backoff_factor, self.max_ttl_hours)
+        logger.debug(f"Negative-cached '{username}' ({reason}, status {status_code}) until {retry_after}.",
+                     extra={'props': {"username": username, "reason": reason}})
+        return reason
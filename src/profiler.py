@@ -0,0 +1,229 @@
+"""Run profiling for `python -m src.main --profile`.
+
+Two tools run side by side while the bot works:
+
+* `SamplingProfiler` samples the stack of every bot thread at a fixed interval from a
+  background thread. Stacks of the event loop thread are rooted at the asyncio task
+  that was running (or `loop` when the loop was idle in `select`, i.e. waiting on the
+  network or a sleep), so time can be attributed to coroutines. The result is written
+  in the folded format that flamegraph.pl, speedscope and inferno read.
+* `LoopLagMonitor` keeps a heartbeat coroutine on the loop and a watchdog thread that
+  notices when the heartbeat stops. When the loop stays blocked longer than the
+  threshold, the watchdog captures the loop thread's stack and the task that was
+  running, and the heartbeat fills in how long the block lasted once it resumes.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILER_THREAD_PREFIX = 'reach-profiler'
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def stack_labels(frame, limit=200):
+    """Returns the labels of `frame` and its callers, outermost first."""
+    labels = []
+    while frame is not None and len(labels) < limit:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def task_label(task):
+    """Names a task after its coroutine, e.g. `task:process_user`."""
+    if task is None:
+        return 'loop'
+    coro = task.get_coro()
+    name = getattr(coro, '__qualname__', None) or task.get_name()
+    return f"task:{name}"
+
+
+def _folded_name(label):
+    # The folded format separates frames with ';' and the count with the last space
+    return label.replace(';', ':')
+
+
+class SamplingProfiler:
+    """Samples thread stacks into folded-stack counts."""
+
+    def __init__(self, loop, interval=0.005):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"{PROFILER_THREAD_PREFIX}-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            name = names.get(thread_id, str(thread_id))
+            if name.startswith(PROFILER_THREAD_PREFIX):
+                continue
+            if thread_id == self.loop_thread_id:
+                root = task_label(asyncio.current_task(self.loop))
+            else:
+                root = f"thread:{name}"
+            stack = ';'.join(_folded_name(label) for label in [root] + stack_labels(frame))
+            self.samples[stack] += 1
+        self.sample_count += 1
+
+    def write_folded(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def task_breakdown(self):
+        """Share of loop-thread samples per task root, busiest first."""
+        roots = Counter()
+        for stack, count in self.samples.items():
+            root = stack.split(';', 1)[0]
+            if not root.startswith('thread:'):
+                roots[root] += count
+        total = sum(roots.values())
+        return [(root, count / total) for root, count in roots.most_common()] if total else []
+
+
+class LoopLagMonitor:
+    """Detects callbacks that block the event loop for longer than `threshold` seconds."""
+
+    def __init__(self, loop, threshold=0.1, interval=0.02, max_reports=50):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.threshold = threshold
+        self.interval = interval
+        self.max_reports = max_reports
+        self.stalls = []
+        self.dropped = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._beat = time.perf_counter()
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._heartbeat_task = None
+
+    def start(self):
+        self._beat = time.perf_counter()
+        self._heartbeat_task = self.loop.create_task(self._heartbeat(), name='loop-lag-heartbeat')
+        self._thread = threading.Thread(target=self._watch, name=f"{PROFILER_THREAD_PREFIX}-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            before = time.perf_counter()
+            self._beat = before
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - before - self.interval)
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+            with self._lock:
+                stall, self._pending = self._pending, None
+            if stall is not None:
+                stall['duration'] = lag
+                self._record(stall)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked_for = time.perf_counter() - self._beat - self.interval
+            if blocked_for < self.threshold:
+                continue
+            with self._lock:
+                if self._pending is not None:
+                    continue
+                frame = sys._current_frames().get(self.loop_thread_id)
+                self._pending = {
+                    'task': task_label(asyncio.current_task(self.loop)),
+                    'stack': stack_labels(frame) if frame is not None else [],
+                    'duration': blocked_for,
+                }
+
+    def _record(self, stall):
+        if len(self.stalls) < self.max_reports:
+            self.stalls.append(stall)
+        else:
+            self.dropped += 1
+
+    def log_report(self, top=10):
+        if not self.stalls:
+            logger.info(f"Event loop: no callbacks blocked for more than {self.threshold * 1000:.0f}ms (max lag {self.max_lag * 1000:.1f}ms).")
+            return
+        count = len(self.stalls) + self.dropped
+        logger.warning(f"Event loop was blocked {count} time(s) for more than {self.threshold * 1000:.0f}ms (max lag {self.max_lag * 1000:.1f}ms, total {self.total_lag:.2f}s).")
+        for stall in sorted(self.stalls, key=lambda s: s['duration'], reverse=True)[:top]:
+            stack = '\n    '.join(stall['stack'][-8:])
+            logger.warning(f"Blocked {stall['duration'] * 1000:.0f}ms in {stall['task']}:\n    {stack}")
+
+
+class RunProfiler:
+    """Runs the sampling profiler and the loop lag monitor for the duration of a run."""
+
+    def __init__(self, settings):
+        profiling = settings.get('profiling', {})
+        self.output = profiling.get('output', 'reach-profile.folded')
+        self.sample_interval = profiling.get('sample_interval_ms', 5) / 1000
+        self.lag_threshold = profiling.get('lag_threshold_ms', 100) / 1000
+        self.max_stalls = profiling.get('max_stall_reports', 50)
+        self.sampler = None
+        self.lag_monitor = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self.sampler = SamplingProfiler(loop, self.sample_interval)
+        self.lag_monitor = LoopLagMonitor(loop, self.lag_threshold, max_reports=self.max_stalls)
+        self.sampler.start()
+        self.lag_monitor.start()
+        logger.info(f"Profiling enabled: sampling every {self.sample_interval * 1000:.0f}ms, reporting loop blocks over {self.lag_threshold * 1000:.0f}ms.")
+
+    async def stop(self):
+        if self.sampler is None:
+            return
+        self.sampler.stop()
+        await self.lag_monitor.stop()
+        self.sampler.write_folded(self.output)
+        logger.info(f"Wrote {self.sampler.sample_count} profile samples to {self.output} (folded stacks, e.g. flamegraph.pl {self.output} > profile.svg).")
+        breakdown = ', '.join(f"{root} {share:.0%}" for root, share in self.sampler.task_breakdown()[:8])
+        if breakdown:
+            logger.info(f"Event loop samples by task: {breakdown}")
+        self.lag_monitor.log_report()
+        self.sampler = None
@@ -0,0 +1,88 @@
+"""Deduplication of identical GET requests within one `GithubAPI` session.
+
+`SingleFlight` lets concurrent callers asking for the same key share one in-flight call:
+the first caller runs it and the others await its result. `ResponseCache` keeps recent
+responses for a short TTL so a login found by several discovery sources is only fetched
+once. `GithubAPI._request` checks the cache first, then joins or starts a flight.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+
+def request_key(method, url, params=None, headers=None):
+    """A hashable key for a request; parameter and header order does not matter."""
+    return (
+        method, url,
+        tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+        tuple(sorted((str(k).lower(), str(v)) for k, v in (headers or {}).items())),
+    )
+
+
+class ResponseCache:
+    """A small LRU of responses that expire `ttl` seconds after they arrived."""
+
+    def __init__(self, ttl=300, max_entries=2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key, response):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Shares one in-flight call among concurrent callers with the same key."""
+
+    def __init__(self):
+        self._flights = {}
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    async def do(self, key, call):
+        """Returns (result, shared). `call` is a no-argument coroutine function that only
+        runs if no flight for `key` is in progress; `shared` tells a follower apart.
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            result, error = await asyncio.shield(future)
+            if not isinstance(error, asyncio.CancelledError):
+                if error is not None:
+                    raise error
+                return result, True
+            # The leader was cancelled, so run the call ourselves
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        try:
+            result = await call()
+        except BaseException as e:
+            # Followers get the exception as a value, so an unawaited future never logs it
+            future.set_result((None, e))
+            raise
+        else:
+            future.set_result((result, None))
+            return result, False
+        finally:
+            if self._flights.get(key) is future:
+                del self._flights[key]
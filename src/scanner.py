@@ -1,47 +1,79 @@
 import logging
 import asyncio
 from datetime import datetime, timedelta, timezone
-from .github_api import GithubAPI
-from .database import add_or_update_user, is_user_disqualified, get_repo_last_scanned_at, update_repo_last_scanned_at
-from .scoring import UserValidator
+from .github_api import GithubAPI, SEARCH_REPO_FIELDS
+from .database import add_or_update_user, is_user_disqualified, load_disqualified_usernames, expire_disqualified_users, get_repo_last_scanned_at, update_repo_last_scanned_at, get_search_cursor, update_search_cursor, get_source_stats, record_source_stats
+from .scoring import UserValidator, reason_code
 from .config_loader import load_config
-from .metrics import metrics_tracker
+from .metrics import metrics_tracker, counting_api_calls
+from .gharchive import discover_archive_users
+from .event_poller import PublicEventPoller
+from .search_planner import SearchPlanner, SearchBudget, merge_keywords, query_key, search_window, MAX_TERMS_PER_QUERY
+from .candidate_queue import CandidateQueue
+from .membership import load_membership_index, save_membership_index
+from .negative_cache import NegativeCache
+from .db_executor import run_db
+from .tracing import tracer
+from .source_stats import SourceTally, SourceAllocator
 
 logger = logging.getLogger(__name__)
 
-async def process_user(username, api, validator, dry_run=False):
+async def process_user(username, api, validator, dry_run=False, negative_cache=None, disqualified=None):
     """Process a single user: check if they should be disqualified and if not, schedule them for following.
+    `disqualified` is the in-memory set of disqualified usernames; without it the database is asked.
     Returns True if the user was scheduled, False otherwise.
     """
     metrics_tracker.users_processed += 1
 
-    # Check local database for previous disqualification
-    if is_user_disqualified(username):
+    # Check for a previous disqualification
+    if disqualified is not None:
+        already_disqualified = username in disqualified
+    else:
+        already_disqualified = await run_db(is_user_disqualified, username)
+    if already_disqualified:
         logger.debug(f"User '{username}' is already in the disqualified list. Skipping.", extra={'props': {"username": username}})
         return False
 
-    user_data = await api.get_user_details(username)
+    user_data, status_code = await api.get_user_details(username, with_status=True)
     if not user_data:
-        logger.warning(f"Could not fetch details for user '{username}'. Skipping.", extra={'props': {"username": username}})
+        logger.warning(f"Could not fetch details for user '{username}' (status {status_code}). Skipping.", extra={'props': {"username": username, "status_code": status_code}})
+        if negative_cache:
+            await run_db(negative_cache.record_failure, username, status_code)
         return False
 
     is_disqualified, reason = validator.is_disqualified(user_data)
+    if not is_disqualified and validator.stages:
+        # Later stages cost extra requests, so they only run for users that passed the profile checks
+        is_disqualified, reason = await validator.evaluate_enrichment(api, user_data)
     if is_disqualified:
         safe_reason = reason if reason else "Unspecified reason"
         logger.info(f"User '{username}' was disqualified. Reason: {safe_reason}", extra={'props': {"username": username, "reason": safe_reason}})
         metrics_tracker.users_disqualified += 1
+        if disqualified is not None:
+            disqualified.add(username)
         if not dry_run:
-            add_or_update_user(user_data, status='disqualified')
+            await run_db(add_or_update_user, user_data, status='disqualified', reason=reason_code(reason))
         return False
     else:
         logger.info(f"User '{username}' passed checks. Scheduling for following.", extra={'props': {"username": username}})
         metrics_tracker.users_scheduled += 1
         if not dry_run:
-            add_or_update_user(user_data, status='targeted')
+            await run_db(add_or_update_user, user_data, status='targeted')
         return True
 
-async def scan_for_users(dry_run=False):
-    """Main async function to scan for users based on the new simplified criteria."""
+def expire_stale_disqualifications(settings, dry_run=False):
+    """Runs the bulk disqualification expiry sweep with the TTLs from settings.yml.
+    Returns the number of expired disqualifications."""
+    if dry_run:
+        return 0
+    ttl_days = dict(settings.get('disqualification', {}).get('ttl_days', {}))
+    default_ttl_days = ttl_days.pop('default', 90)
+    return expire_disqualified_users(ttl_days, default_ttl_days)
+
+async def scan_for_users(dry_run=False, plan=None):
+    """Main async function to scan for users based on the new simplified criteria.
+    With a budget_planner.RunPlan, validation stops at the plan's candidate cap and its
+    cost is recorded in the plan."""
     if dry_run:
         logger.info("DRY-RUN enabled. No database changes will be made.")
 
@@ -50,8 +82,15 @@ async def scan_for_users(dry_run=False):
     # Get the max follow limit to cap scheduling
     max_follows_per_run = settings.get('limits', {}).get('max_follow', 350)
     
-    found_users = set()
+    # Discovered logins mapped to where they were found; the first source wins
+    found_users = {}
     already_followed_users = set()
+    tally = SourceTally()
+
+    search_settings = settings.get('search', {})
+    query_terms = {query_key(terms): terms for terms in merge_keywords(criteria.get('repository_keywords', ['portfolio']),
+                                                                        search_settings.get('max_terms_per_query', MAX_TERMS_PER_QUERY))}
+    keyword_keys, target_repos, poll_events = await allocate_sources(settings, list(query_terms), criteria.get('target_repos', []))
 
     async with GithubAPI() as api:
         # Get the authenticated user's username
@@ -59,117 +98,273 @@ async def scan_for_users(dry_run=False):
         if auth_user:
             logger.info(f"Authenticated as {auth_user}. Fetching list of users already being followed.")
             # We fetch these to filter them out from search results immediately
-            already_followed_users = set(await api.get_following(auth_user))
+            with metrics_tracker.stage('scan.following'):
+                already_followed_users = set(await api.get_following(auth_user))
             logger.info(f"Found {len(already_followed_users)} users that are already being followed.")
 
+        # Task 2: Star/Fork Activity, polled in the background for the rest of the scan
+        poller_task = None
+        if poll_events:
+            logger.info("Polling the public event feed for users who recently starred or forked repositories...")
+            events_settings = settings.get('public_events', {})
+            poller = PublicEventPoller(
+                api, lambda login: found_users.setdefault(login, 'public_events'),
+                max_pages=events_settings.get('max_pages', 3),
+                dedupe_size=events_settings.get('dedupe_size', 10000)
+            )
+            # The task copies the current context, so its requests land in this counter
+            with counting_api_calls() as events_calls:
+                poller_task = asyncio.create_task(poller.run(events_settings.get('poll_window_seconds', 0)))
+
         # Task 1: Keyword-based search
         logger.info("Searching for users based on keywords...")
-        keywords = criteria.get('repository_keywords', ['portfolio'])
-        search_results = []
-        two_weeks_ago = (datetime.now(timezone.utc) - timedelta(days=14)).strftime('%Y-%m-%d')
         max_followers = criteria.get('negative_signals', {}).get('max_followers', 100)
+        qualifiers = f'in:name,description,readme followers:<={max_followers} sort:created-desc'
+        window_start, window_end = search_window(search_settings.get('window_days', 14))
+        planner = SearchPlanner(
+            api,
+            budget=SearchBudget(reserve=search_settings.get('budget_reserve', 1)),
+            min_window=timedelta(hours=search_settings.get('min_window_hours', 1)),
+            projection=SEARCH_REPO_FIELDS
+        )
 
-        for keyword in keywords:
-            query = f'{keyword} in:name,description,readme created:>={two_weeks_ago} followers:<={max_followers} sort:created-desc'
-            logger.info(f"Built search query: {query}")
-            for page in range(1, 6):
-                result = await api.search_repositories(query, limit=100, page=page)
-                search_results.append(result)
-                # GitHub Search API limit is 30 req/min. Sleep ~2.1s to avoid 403 secondary limits.
-                await asyncio.sleep(2.1)
-        for result in search_results:
-            if result:
-                for repo in result:
-                    owner = repo.get('owner')
-                    if owner and owner.get('type') == 'User':
-                        found_users.add(owner['login'])
-
-        # Task 2: Star/Fork Activity
-        logger.info("Searching for users who recently starred or forked repositories...")
-        public_events = await api.get_public_events()
-        if public_events:
-            fourteen_days_ago = datetime.now(timezone.utc) - timedelta(days=14)
-            for event in public_events:
-                event_time = datetime.fromisoformat(event['created_at'].replace('Z', '+00:00'))
-                if event['type'] in ['WatchEvent', 'ForkEvent'] and event_time > fourteen_days_ago:
-                    actor = event.get('actor')
-                    if actor:
-                        found_users.add(actor['login'])
+        full_sweep_interval = timedelta(hours=search_settings.get('full_sweep_hours', 24))
+        newest_created = ''
+        search_source = 'keyword'
+
+        def add_repo_owner(repo):
+            nonlocal newest_created
+            # ISO-8601 UTC timestamps compare correctly as strings
+            newest_created = max(newest_created, repo.get('created_at') or '')
+            owner = repo.get('owner')
+            if owner and owner.get('type') == 'User':
+                found_users.setdefault(owner['login'], search_source)
+
+        for key in keyword_keys:
+            terms = query_terms[key]
+            cursor = await run_db(get_search_cursor, key)
+            # Only search repositories newer than the cursor, with a periodic full-window sweep for stragglers
+            full_sweep = (not cursor or not cursor['newest_created_at'] or not cursor['last_full_sweep_at']
+                          or cursor['last_full_sweep_at'] < window_end - full_sweep_interval)
+            start = window_start if full_sweep else max(window_start, cursor['newest_created_at'] + timedelta(seconds=1))
+            logger.info(f"Searching '{key}' from {start} ({'full sweep' if full_sweep else 'incremental'}).")
+
+            newest_created = ''
+            search_source = f"keyword:{key}"
+            failed_pages = planner.failed_pages
+            with metrics_tracker.stage('scan.keyword_search'), counting_api_calls() as search_calls:
+                await planner.search(terms, start, window_end, qualifiers, add_repo_owner)
+            tally.add_calls(search_source, search_calls.calls)
+            if planner.failed_pages == failed_pages and not dry_run:
+                newest = datetime.fromisoformat(newest_created.replace('Z', '+00:00')) if newest_created else None
+                await run_db(update_search_cursor, key, newest, full_sweep=full_sweep)
+        logger.info(f"Keyword search used {planner.pages_fetched} search requests ({planner.shards} window splits).")
 
         # Task 3: High-Signal Repo Watcher
         logger.info("Task 3: Checking for new stars on high-signal learning repositories...")
-        target_repos = criteria.get('target_repos', [])
-        for repo_full_name in target_repos:
-            try:
-                owner, repo_name = repo_full_name.split('/')
-                last_scanned = get_repo_last_scanned_at(repo_full_name)
+        with metrics_tracker.stage('scan.repo_watch'):
+            for repo_full_name in target_repos:
+                try:
+                    owner, repo_name = repo_full_name.split('/')
+                    last_scanned = await run_db(get_repo_last_scanned_at, repo_full_name)
                 
-                # Default to 24 hours ago if never scanned, to avoid mass-processing old stars
-                if not last_scanned:
-                    last_scanned = datetime.now(timezone.utc) - timedelta(hours=24)
-                    logger.info(f"First time scanning {repo_full_name}. Defaulting to events since {last_scanned}.")
-                else:
-                    logger.info(f"Scanning {repo_full_name} for stars since {last_scanned}.")
-
-                events = await api.get_repo_events(owner, repo_name, limit=100)
-                if not events:
-                    continue
-
-                newest_event_time = last_scanned
-                new_stars_found = 0
-
-                for event in events:
-                    if event['type'] == 'WatchEvent':
-                        event_time = datetime.fromisoformat(event['created_at'].replace('Z', '+00:00'))
+                    # Default to 24 hours ago if never scanned, to avoid mass-processing old stars
+                    if not last_scanned:
+                        last_scanned = datetime.now(timezone.utc) - timedelta(hours=24)
+                        logger.info(f"First time scanning {repo_full_name}. Defaulting to events since {last_scanned}.")
+                    else:
+                        logger.info(f"Scanning {repo_full_name} for stars since {last_scanned}.")
+
+                    with counting_api_calls() as repo_calls:
+                        events = await api.get_repo_events(owner, repo_name, limit=100)
+                    tally.add_calls(f"repo:{repo_full_name}", repo_calls.calls)
+                    if not events:
+                        continue
+
+                    newest_event_time = last_scanned
+                    new_stars_found = 0
+
+                    for event in events:
+                        if event['type'] == 'WatchEvent':
+                            event_time = datetime.fromisoformat(event['created_at'].replace('Z', '+00:00'))
                         
-                        # Keep track of the newest event time to update the DB
-                        if event_time > newest_event_time:
-                            newest_event_time = event_time
-
-                        if event_time > last_scanned:
-                            actor = event.get('actor')
-                            if actor:
-                                found_users.add(actor['login'])
-                                new_stars_found += 1
+                            # Keep track of the newest event time to update the DB
+                            if event_time > newest_event_time:
+                                newest_event_time = event_time
+
+                            if event_time > last_scanned:
+                                actor = event.get('actor')
+                                if actor:
+                                    found_users.setdefault(actor['login'], f"repo:{repo_full_name}")
+                                    new_stars_found += 1
                 
-                if new_stars_found > 0:
-                    logger.info(f"Found {new_stars_found} new stars on {repo_full_name}.")
+                    if new_stars_found > 0:
+                        logger.info(f"Found {new_stars_found} new stars on {repo_full_name}.")
                 
-                # Update state to the timestamp of the newest event we saw (or kept same if no new events)
-                # We add a tiny buffer (1 second) to avoid duplicate processing of the exact same timestamp
-                if newest_event_time > last_scanned:
-                    update_repo_last_scanned_at(repo_full_name, newest_event_time)
-
-            except Exception as e:
-                logger.error(f"Error scanning repo {repo_full_name}: {e}")
-
-        if not found_users:
-            logger.info("Scan complete: No potential users found in this run.")
-            return
-
-        # NEW: Filter out already followed users strategically BEFORE processing
-        original_count = len(found_users)
-        found_users = {u for u in found_users if u not in already_followed_users}
-        skipped_count = original_count - len(found_users)
-        
-        if skipped_count > 0:
-            logger.info(f"Strategically skipped {skipped_count} users who are already being followed to save API calls.")
-
-        logger.info(f"[SCAN COMPLETE] Found a total of {len(found_users)} unique potential users to process.")
-        logger.info(f"Processing users with a limit of {max_follows_per_run} scheduled follows for this run.")
-
-        # Process found users concurrently in chunks until we hit the max_follows_per_run limit
-        scheduled_count = 0
-        found_users_list = list(found_users)
-        chunk_size = 20
-        
-        for i in range(0, len(found_users_list), chunk_size):
-            if scheduled_count >= max_follows_per_run:
-                logger.info(f"Reached scheduling limit of {max_follows_per_run} users. Stopping scan processing.")
-                break
-            
-            chunk = found_users_list[i:i + chunk_size]
-            tasks = [process_user(username, api, validator, dry_run) for username in chunk]
-            results = await asyncio.gather(*tasks)
-            
-            scheduled_count += sum(1 for is_scheduled in results if is_scheduled)
+                    # Update state to the timestamp of the newest event we saw (or kept same if no new events)
+                    # We add a tiny buffer (1 second) to avoid duplicate processing of the exact same timestamp
+                    if newest_event_time > last_scanned:
+                        await run_db(update_repo_last_scanned_at, repo_full_name, newest_event_time)
+
+                except Exception as e:
+                    logger.error(f"Error scanning repo {repo_full_name}: {e}")
+
+        if poller_task is not None:
+            # The other sources are done; polling longer would only delay validation
+            poller.stop()
+            with metrics_tracker.stage('scan.public_events_wait'):
+                await poller_task
+            tally.add_calls('public_events', events_calls.calls)
+        tally.add_found(found_users)
+
+        queue = CandidateQueue(settings, dry_run)
+        expired = await run_db(expire_stale_disqualifications, settings, dry_run)
+        membership = await run_db(load_membership_index, settings, dry_run, rebuild=expired > 0)
+        negative_cache = NegativeCache(settings, dry_run)
+        processed_before = metrics_tracker.users_processed
+        with metrics_tracker.stage('scan.validate'), counting_api_calls() as validate_calls:
+            await process_candidates(found_users, already_followed_users, api, validator, max_follows_per_run, dry_run, queue, membership, negative_cache, tally,
+                                     max_candidates=plan.max_candidates if plan else None)
+        if plan:
+            plan.record('scan.validate', validate_calls, units=metrics_tracker.users_processed - processed_before)
+        tally.log_summary()
+        if not dry_run:
+            await run_db(save_membership_index, membership, settings)
+            await run_db(record_source_stats, tally.as_dict(), settings.get('source_allocation', {}).get('decay', 0.8))
+
+async def import_archive_users(paths, dry_run=False):
+    """Discovers users from local GH Archive dumps and validates them like scan_for_users does.
+    Discovery itself costs no API calls.
+    """
+    settings, criteria = load_config()
+    validator = UserValidator(criteria)
+    max_follows_per_run = settings.get('limits', {}).get('max_follow', 350)
+
+    logger.info(f"Importing star/fork activity from {len(paths)} GH Archive file(s)...")
+    found_users, matches = discover_archive_users(paths, criteria.get('target_repos', []), criteria.get('repository_keywords', []))
+    for source, count in matches.most_common(10):
+        logger.info(f"Archive source {source}: {count} matching events.")
+
+    if not found_users:
+        logger.info("Archive import: No potential users found in the dumps.")
+        return
+
+    async with GithubAPI() as api:
+        already_followed_users = set()
+        auth_user = await api.get_authenticated_user()
+        if auth_user:
+            already_followed_users = set(await api.get_following(auth_user))
+        queue = CandidateQueue(settings, dry_run)
+        expired = await run_db(expire_stale_disqualifications, settings, dry_run)
+        membership = await run_db(load_membership_index, settings, dry_run, rebuild=expired > 0)
+        negative_cache = NegativeCache(settings, dry_run)
+        with metrics_tracker.stage('import.validate'):
+            await process_candidates(found_users, already_followed_users, api, validator, max_follows_per_run, dry_run, queue, membership, negative_cache)
+        if not dry_run:
+            await run_db(save_membership_index, membership, settings)
+
+async def allocate_sources(settings, keyword_keys, target_repos):
+    """Picks the keyword queries and target repos to scan this run, best expected yield first,
+    and whether to poll the public feed. Without `source_allocation.enabled` every source runs."""
+    allocation = settings.get('source_allocation', {})
+    if not allocation.get('enabled'):
+        return keyword_keys, target_repos, True
+    allocator = SourceAllocator(await run_db(get_source_stats), settings)
+    selected, skipped = allocator.plan(
+        {'keyword': [f"keyword:{key}" for key in keyword_keys],
+         'repo': [f"repo:{repo}" for repo in target_repos],
+         'public_events': ['public_events']},
+        min_keep={'public_events': 0}
+    )
+    if skipped:
+        logger.info(f"Skipping {len(skipped)} low-yield sources this run: {', '.join(skipped)}")
+    return ([s.split(':', 1)[1] for s in selected['keyword']],
+            [s.split(':', 1)[1] for s in selected['repo']],
+            bool(selected['public_events']))
+
+async def trace_candidate(username, source, api, validator, dry_run=False, negative_cache=None, disqualified=None, tally=None):
+    """Runs process_user as the root span of the candidate's trace, tagged with its discovery
+    source, and charges the outcome and API calls to that source in `tally`."""
+    with tracer.span('candidate', candidate=username, source=source) as span, counting_api_calls() as calls:
+        scheduled = await process_user(username, api, validator, dry_run, negative_cache, disqualified)
+        span.set(scheduled=scheduled)
+    if tally is not None:
+        failed = negative_cache is not None and username in negative_cache.failed
+        tally.record_outcome(source, scheduled, calls.calls, failed=failed)
+    return scheduled
+
+async def process_candidates(found_users, already_followed_users, api, validator, max_follows_per_run, dry_run=False, queue=None, membership=None, negative_cache=None, tally=None, max_candidates=None):
+    """Queues discovered users and validates queued candidates concurrently in chunks until
+    `max_follows_per_run` users are scheduled. `found_users` maps login -> discovery source.
+    Logins in the `membership` index (already followed, disqualified or validated) and logins
+    whose profile lookup failed recently (`negative_cache`) are skipped without an API call.
+
+    Candidates left in the queue when the limit is reached, or when the run dies, are
+    picked up by the next run. With a `tally` (SourceTally), each candidate's outcome and API
+    calls are charged to its discovery source. `max_candidates` caps how many candidates are
+    validated, to stay inside the run's API budget. Returns the number of users scheduled.
+    """
+    queue = queue or CandidateQueue(dry_run=dry_run)
+    await run_db(queue.prune)
+    negative_cache = negative_cache or NegativeCache(dry_run=dry_run)
+    await run_db(negative_cache.prune)
+    disqualified = await run_db(load_disqualified_usernames)
+
+    # NEW: Filter out already followed users strategically BEFORE processing
+    original_count = len(found_users)
+    if membership is not None:
+        membership.update(already_followed_users)
+        known = membership.__contains__
+    else:
+        known = already_followed_users.__contains__
+    found_users = {u: source for u, source in found_users.items() if not known(u)}
+    skipped_count = original_count - len(found_users)
+
+    if skipped_count > 0:
+        logger.info(f"Strategically skipped {skipped_count} users who are already followed or known to save API calls.")
+
+    failed_before = await run_db(negative_cache.cached, found_users)
+    if failed_before:
+        found_users = {u: source for u, source in found_users.items() if u not in failed_before}
+        logger.info(f"Skipped {len(failed_before)} users whose profile lookup failed recently (negative cache).")
+
+    await run_db(queue.enqueue, found_users)
+    queued = await run_db(len, queue)
+    logger.info(f"[SCAN COMPLETE] Found a total of {len(found_users)} unique potential users; {queued} candidates queued.")
+    logger.info(f"Processing users with a limit of {max_follows_per_run} scheduled follows for this run.")
+
+    # Process queued users concurrently in chunks until we hit the max_follows_per_run limit
+    scheduled_count = 0
+    validated_count = 0
+    chunk_size = 20
+
+    while scheduled_count < max_follows_per_run:
+        if max_candidates is not None and validated_count >= max_candidates:
+            queued = await run_db(len, queue)
+            logger.info(f"Validated {validated_count} candidates, all the API budget allows. {queued} candidates stay queued for the next run.")
+            break
+        lease_size = chunk_size if max_candidates is None else min(chunk_size, max_candidates - validated_count)
+        leased = await run_db(queue.lease, lease_size)
+        if not leased:
+            break
+        # Candidates queued by earlier runs may have been followed since
+        chunk = [username for username, _ in leased if not known(username)]
+        failed_before = await run_db(negative_cache.cached, chunk)
+        chunk = [username for username in chunk if username not in failed_before]
+        sources = dict(leased)
+        tasks = [trace_candidate(username, sources[username], api, validator, dry_run, negative_cache, disqualified, tally) for username in chunk]
+        results = await asyncio.gather(*tasks)
+        await run_db(queue.complete, [username for username, _ in leased])
+        if membership is not None:
+            membership.update(u for u in chunk if u not in negative_cache.failed)
+
+        scheduled_count += sum(1 for is_scheduled in results if is_scheduled)
+        validated_count += len(chunk)
+    else:
+        queued = await run_db(len, queue)
+        logger.info(f"Reached scheduling limit of {max_follows_per_run} users. {queued} candidates stay queued for the next run.")
+
+    if validator is not None:
+        validator.log_stage_stats()
+
+    return scheduled_count
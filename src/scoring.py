@@ -3,13 +3,63 @@ from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# Short codes stored with a disqualification, used to pick its TTL from settings.yml
+REASON_CODES = {
+    "Organization account": 'organization',
+    "Follower count exceeds threshold": 'followers',
+    "Following count exceeds threshold": 'following',
+    "Account inactive for extended period": 'inactive',
+    "Seniority keyword detected in bio": 'seniority',
+    "Established external portfolio link found": 'portfolio',
+    "Excluded keyword found in bio": 'excluded_keyword',
+    "User is in explicit exclusion list": 'excluded_user',
+    "No recent public activity": 'inactive',
+    "Member of an excluded organization": 'excluded_org',
+    "Owns a popular repository": 'popular_repo',
+    "Seniority keyword detected in profile README": 'seniority',
+    "Excluded keyword found in profile README": 'excluded_keyword',
+    "Total commits below minimum": 'low_commits',
+}
+
+# Enrichment stages run after the profile checks, cheapest first. A stage only runs when
+# the criteria use one of its signals and every earlier stage passed.
+ENRICHMENT_STAGES = ('events', 'orgs', 'repos', 'readme', 'commits')
+
+def reason_code(reason):
+    """Returns the short code for a disqualification reason returned by UserValidator."""
+    return REASON_CODES.get(reason, 'other')
+
 class UserValidator:
     def __init__(self, criteria_config):
         self.criteria = criteria_config
         self.negative_signals = criteria_config.get('negative_signals', {})
+        self.stages = self._needed_stages()
+        # Per-stage cascade statistics: users evaluated and disqualified at that stage
+        self.stage_stats = {stage: {'evaluated': 0, 'disqualified': 0} for stage in ('profile',) + ENRICHMENT_STAGES}
+
+    def _needed_stages(self):
+        signals = self.negative_signals
+        needed = {
+            'events': 'max_event_inactivity_days' in signals,
+            'orgs': bool(signals.get('exclude_orgs')),
+            'repos': 'max_repo_stars' in signals or 'min_total_commits' in signals,
+            'readme': bool(signals.get('check_profile_readme')),
+            'commits': 'min_total_commits' in signals,
+        }
+        return [stage for stage in ENRICHMENT_STAGES if needed[stage]]
+
+    def _count(self, stage, disqualified):
+        self.stage_stats[stage]['evaluated'] += 1
+        if disqualified:
+            self.stage_stats[stage]['disqualified'] += 1
 
     def is_disqualified(self, user_data):
-        """Checks if a user meets any of the disqualification criteria."""
+        """Checks the profile-level disqualification criteria (the first cascade stage)."""
+        result = self._check_profile(user_data)
+        self._count('profile', result[0])
+        return result
+
+    def _check_profile(self, user_data):
         # Check for organization account type
         if user_data.get('type') == "Organization":
             return True, "Organization account"
@@ -56,3 +106,64 @@ class UserValidator:
             return True, "User is in explicit exclusion list"
 
         return False, None
+
+    async def evaluate_enrichment(self, api, user_data, enrichment=None):
+        """Runs the enrichment stages the criteria need, fetching each stage's data lazily.
+
+        Stops at the first stage that disqualifies the user. Fetched data is stored in
+        `enrichment` (keyed by stage). Returns (is_disqualified, reason).
+        """
+        enrichment = {} if enrichment is None else enrichment
+        username = user_data['login']
+        for stage in self.stages:
+            is_disqualified, reason = await getattr(self, f'_check_{stage}')(api, username, enrichment)
+            self._count(stage, is_disqualified)
+            if is_disqualified:
+                return True, reason
+        return False, None
+
+    async def _check_events(self, api, username, enrichment):
+        events = enrichment['events'] = await api.get_user_events(username) or []
+        latest = max((event['created_at'] for event in events if event.get('created_at')), default=None)
+        max_days = self.negative_signals['max_event_inactivity_days']
+        if not latest or (datetime.now(timezone.utc) - datetime.fromisoformat(latest.replace('Z', '+00:00'))).days > max_days:
+            return True, "No recent public activity"
+        return False, None
+
+    async def _check_orgs(self, api, username, enrichment):
+        orgs = enrichment['orgs'] = await api.get_user_organizations(username) or []
+        excluded = {o.lower() for o in self.negative_signals.get('exclude_orgs', [])}
+        if any(org.get('login', '').lower() in excluded for org in orgs):
+            return True, "Member of an excluded organization"
+        return False, None
+
+    async def _check_repos(self, api, username, enrichment):
+        # Commit counts cost one request per repository, so they are left to the commits stage
+        repos = enrichment['repos'] = await api.get_user_repos(username, with_commit_counts=False) or []
+        max_stars = self.negative_signals.get('max_repo_stars')
+        if max_stars is not None and any(not r.get('fork') and r.get('stargazers_count', 0) > max_stars for r in repos):
+            return True, "Owns a popular repository"
+        return False, None
+
+    async def _check_readme(self, api, username, enrichment):
+        readme = enrichment['readme'] = await api.get_repo_readme_content(username, username)
+        if readme:
+            readme_lower = readme.lower()
+            if any(k.lower() in readme_lower for k in self.negative_signals.get('seniority_keywords', [])):
+                return True, "Seniority keyword detected in profile README"
+            if any(k.lower() in readme_lower for k in self.negative_signals.get('exclude_keywords', [])):
+                return True, "Excluded keyword found in profile README"
+        return False, None
+
+    async def _check_commits(self, api, username, enrichment):
+        repos = await api.add_commit_counts(enrichment.get('repos') or [])
+        if sum(repo.get('commits_count', 0) for repo in repos) < self.negative_signals['min_total_commits']:
+            return True, "Total commits below minimum"
+        return False, None
+
+    def log_stage_stats(self):
+        """Logs how many users each cascade stage evaluated and disqualified."""
+        parts = [f"{stage} {stats['disqualified']}/{stats['evaluated']}" for stage, stats in self.stage_stats.items()
+                 if stats['evaluated']]
+        if parts:
+            logger.info(f"Validation cascade (disqualified/evaluated per stage): {', '.join(parts)}.")
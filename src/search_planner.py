@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from .metrics import metrics_tracker
+
+logger = logging.getLogger(__name__)
+
+# GitHub only returns the first 1,000 results of any search
+SEARCH_RESULT_CAP = 1000
+# GitHub allows at most five AND/OR/NOT operators in a search query
+MAX_TERMS_PER_QUERY = 6
+
+
+def tokenize(name):
+    """The lowercase words of a keyword or repository name, split on separators."""
+    return set(re.split(r'[-_.\s]+', name.lower())) - {''}
+
+
+def merge_keywords(keywords, max_terms=MAX_TERMS_PER_QUERY):
+    """Drops keywords subsumed by a broader one and packs the rest into OR groups.
+
+    GitHub tokenizes repository names on separators, so `portfolio` already matches
+    `developer-portfolio`; searching both only returns the same repositories twice.
+    Returns a list of keyword lists, each at most `max_terms` long.
+    """
+    unique = list(dict.fromkeys(k.lower() for k in keywords))
+    kept = [k for k in unique if not any(other != k and tokenize(other) < tokenize(k) for other in unique)]
+    dropped = [k for k in unique if k not in kept]
+    if dropped:
+        logger.info(f"Search planner dropped keywords covered by broader ones: {', '.join(dropped)}")
+    return [kept[i:i + max_terms] for i in range(0, len(kept), max_terms)]
+
+
+def build_query(terms, start, end, qualifiers):
+    """Builds an OR query over `terms` restricted to repositories created in [start, end]."""
+    quoted = [f'"{t}"' if len(tokenize(t)) > 1 else t for t in terms]
+    window = f"created:{start.strftime('%Y-%m-%dT%H:%M:%SZ')}..{end.strftime('%Y-%m-%dT%H:%M:%SZ')}"
+    return ' '.join([' OR '.join(quoted), qualifiers, window]).strip()
+
+
+class SearchBudget:
+    """Tracks the search rate-limit bucket from response headers.
+
+    Instead of a fixed pause after every call, requests go out as long as the bucket
+    has budget left and only wait for the reset once it is exhausted.
+    """
+
+    def __init__(self, reserve=1):
+        self.reserve = reserve
+        self.remaining = None
+        self.reset = None
+
+    def update(self, remaining, reset):
+        if remaining is not None:
+            self.remaining = remaining
+            self.reset = reset
+
+    async def acquire(self):
+        if self.remaining is not None and self.remaining <= self.reserve and self.reset:
+            sleep_duration = max(0, self.reset - time.time()) + 1
+            logger.info(f"Search budget exhausted ({self.remaining} left). Waiting {sleep_duration:.0f}s for the reset.")
+            metrics_tracker.add_sleep_time(sleep_duration)
+            await asyncio.sleep(sleep_duration)
+            self.remaining = None
+        if self.remaining is not None:
+            self.remaining -= 1
+
+
+class SearchPlanner:
+    """Runs repository searches with early termination and date-window sharding.
+
+    A query stops paginating as soon as a page comes back short or the reported
+    `total_count` has been read. When a window holds more than GitHub's 1,000 result
+    cap, it is split into two `created:` windows until each fits (or the window is
+    down to `min_window`). A `projection` limits the repository fields kept per result.
+    """
+
+    def __init__(self, api, budget=None, per_page=100, min_window=timedelta(hours=1), projection=None):
+        self.api = api
+        self.projection = projection
+        self.budget = budget or SearchBudget()
+        self.per_page = per_page
+        self.min_window = min_window
+        self.pages_fetched = 0
+        self.failed_pages = 0
+        self.shards = 0
+
+    async def _fetch(self, query, page):
+        await self.budget.acquire()
+        items, total_count, rate = await self.api.search_repositories_page(query, per_page=self.per_page, page=page,
+                                                                           projection=self.projection)
+        self.budget.update(*rate)
+        self.pages_fetched += 1
+        if items is None:
+            self.failed_pages += 1
+        return items, total_count
+
+    async def search(self, terms, start, end, qualifiers, on_repo):
+        """Feeds every repository matching `terms` created in [start, end] to `on_repo`.
+        Returns the number of repositories seen.
+        """
+        query = build_query(terms, start, end, qualifiers)
+        items, total_count = await self._fetch(query, 1)
+        if items is None:
+            return 0
+
+        if total_count > SEARCH_RESULT_CAP and end - start > self.min_window:
+            middle = start + (end - start) / 2
+            logger.info(f"{total_count} results for '{query}' exceed the search cap. Splitting the created: window at {middle}.")
+            self.shards += 1
+            return (await self.search(terms, start, middle, qualifiers, on_repo) +
+                    await self.search(terms, middle + timedelta(seconds=1), end, qualifiers, on_repo))
+
+        seen = 0
+        reachable = min(total_count, SEARCH_RESULT_CAP)
+        page = 1
+        while True:
+            for repo in items:
+                on_repo(repo)
+            seen += len(items)
+            if len(items) < self.per_page or seen >= reachable:
+                break
+            page += 1
+            items, _ = await self._fetch(query, page)
+            if items is None:
+                break
+        logger.info(f"Search '{query}': {seen} of {total_count} repositories in {page} page(s).")
+        return seen
+
+
+def query_key(terms):
+    """Identifies a keyword group across runs, e.g. for its incremental search cursor."""
+    return ' OR '.join(terms)
+
+
+def search_window(days, now=None):
+    """Returns the (start, end) datetimes of the last `days` days."""
+    end = (now or datetime.now(timezone.utc)).replace(microsecond=0)
+    return end - timedelta(days=days), end
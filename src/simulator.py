@@ -0,0 +1,328 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+import httpx
+
+# Captured at import time so simulated latency keeps working when benchmarks
+# replace asyncio.sleep with a no-op to skip the bot's own pacing delays.
+_real_sleep = asyncio.sleep
+
+SECONDARY_LIMIT_MESSAGE = "You have exceeded a secondary rate limit. Please wait a few minutes before you try again."
+
+
+def _isoformat(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class RateLimitBucket:
+    """A GitHub style rate-limit bucket that refills completely at `reset`."""
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset = int(time.time()) + window
+
+    def consume(self):
+        now = time.time()
+        if now >= self.reset:
+            self.remaining = self.limit
+            self.reset = int(now) + self.window
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def headers(self):
+        return {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(self.reset),
+            'X-RateLimit-Resource': self.name,
+        }
+
+    def to_dict(self):
+        return {'limit': self.limit, 'remaining': self.remaining, 'reset': self.reset, 'used': self.limit - self.remaining}
+
+
+class FakeGitHub:
+    """An in-process model of the parts of the GitHub REST API the bot uses.
+
+    The population of users, repositories and events is generated deterministically
+    from `seed`, so two runs against the same configuration see the same data. Use
+    `transport()` to get an httpx.MockTransport for GithubAPI.
+    """
+
+    def __init__(self, num_users=1000, following=0, followers=0, auth_user='reach-bot',
+                 search_total=1000, search_days=14, public_events=300, public_feed_period=60, repo_events=100,
+                 latency=0.0, latency_jitter=0.0, secondary_limit_every=0, retry_after=1,
+                 core_limit=1_000_000, search_limit=1_000_000, seed=0):
+        self.num_users = num_users
+        self.auth_user = auth_user
+        self.search_total = search_total
+        self.search_days = search_days
+        self.public_events = public_events
+        self.public_feed_period = public_feed_period
+        self.repo_events = repo_events
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.secondary_limit_every = secondary_limit_every
+        self.retry_after = retry_after
+        self.seed = seed
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.core = RateLimitBucket('core', core_limit, 3600)
+        self.search = RateLimitBucket('search', search_limit, 60)
+
+        self.following = {self.login(i) for i in range(min(following, num_users))}
+        self.followers = [self.login(i) for i in range(0, min(followers, num_users))]
+        self.deleted = set()
+
+        self.requests = Counter()
+        self.total_requests = 0
+        self.secondary_limited = 0
+        self._routes = [
+            ('GET', re.compile(r'^/user$'), self._get_auth_user),
+            ('GET', re.compile(r'^/rate_limit$'), self._get_rate_limit),
+            ('GET', re.compile(r'^/user/followers$'), self._get_my_followers),
+            ('GET', re.compile(r'^/user/following/(?P<login>[^/]+)$'), self._check_following),
+            ('PUT', re.compile(r'^/user/following/(?P<login>[^/]+)$'), self._follow),
+            ('DELETE', re.compile(r'^/user/following/(?P<login>[^/]+)$'), self._unfollow),
+            ('GET', re.compile(r'^/search/repositories$'), self._search_repositories),
+            ('GET', re.compile(r'^/events$'), self._get_public_events),
+            ('GET', re.compile(r'^/users/(?P<login>[^/]+)$'), self._get_user),
+            ('GET', re.compile(r'^/users/(?P<login>[^/]+)/following$'), self._get_following),
+            ('GET', re.compile(r'^/users/(?P<login>[^/]+)/followers$'), self._get_followers),
+            ('GET', re.compile(r'^/users/(?P<login>[^/]+)/following/(?P<target>[^/]+)$'), self._check_follows),
+            ('GET', re.compile(r'^/users/(?P<login>[^/]+)/repos$'), self._get_user_repos),
+            ('GET', re.compile(r'^/users/(?P<login>[^/]+)/(starred|orgs|events)$'), self._empty_list),
+            ('GET', re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/events$'), self._get_repo_events),
+            ('GET', re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/commits$'), self._get_commits),
+            ('HEAD', re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/commits$'), self._get_commits),
+            ('GET', re.compile(r'^/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/readme$'), self._not_found),
+        ]
+
+    # --- Population -------------------------------------------------------
+
+    @staticmethod
+    def login(index):
+        return f"user{index}"
+
+    def _index(self, login):
+        match = re.fullmatch(r'user(\d+)', login)
+        if not match or int(match.group(1)) >= self.num_users or login in self.deleted:
+            return None
+        return int(match.group(1))
+
+    def _rng(self, *key):
+        return random.Random(zlib.crc32(repr((self.seed,) + key).encode('utf-8')))
+
+    def user(self, index):
+        rng = self._rng('user', index)
+        login = self.login(index)
+        created = self.now - timedelta(days=rng.randint(30, 3000))
+        updated = self.now - timedelta(days=rng.choice([rng.randint(0, 30), rng.randint(0, 400)]))
+        return {
+            'login': login,
+            'id': 1_000_000 + index,
+            'html_url': f"https://github.com/{login}",
+            'type': 'Organization' if rng.random() < 0.02 else 'User',
+            'followers': rng.choice([rng.randint(0, 60), rng.randint(0, 400)]),
+            'following': rng.randint(0, 700),
+            'public_repos': rng.randint(0, 80),
+            'bio': rng.choice([None, "Aspiring web developer", "Student", "Engineer at Google"]),
+            'blog': rng.choice(['', '', '', 'https://linkedin.com/in/' + login, 'https://' + login + '.dev']),
+            'created_at': _isoformat(created),
+            'updated_at': _isoformat(updated),
+        }
+
+    def _user_stub(self, login):
+        return {'login': login, 'id': 1_000_000 + (self._index(login) or 0), 'type': 'User'}
+
+    def _event(self, event_id, actor_index, event_type, repo_name, minutes_ago):
+        return {
+            'id': str(event_id),
+            'type': event_type,
+            'actor': {'login': self.login(actor_index), 'id': 1_000_000 + actor_index},
+            'repo': {'name': repo_name},
+            'created_at': _isoformat(self.now - timedelta(minutes=minutes_ago)),
+        }
+
+    # --- Transport --------------------------------------------------------
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request):
+        self.total_requests += 1
+        if self.latency or self.latency_jitter:
+            await _real_sleep(self.latency + random.uniform(0, self.latency_jitter))
+
+        path = request.url.path
+        for method, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if method == request.method and match:
+                self.requests[handler.__name__.lstrip('_')] += 1
+                bucket = self.search if path.startswith('/search/') else self.core
+                if path != '/rate_limit':
+                    if self.secondary_limit_every and self.total_requests % self.secondary_limit_every == 0:
+                        self.secondary_limited += 1
+                        return self._json(request, 403, {'message': SECONDARY_LIMIT_MESSAGE}, bucket,
+                                          headers={'Retry-After': str(self.retry_after)})
+                    if not bucket.consume():
+                        return self._json(request, 403, {'message': 'API rate limit exceeded'}, bucket)
+                return handler(request, bucket, **match.groupdict())
+        self.requests['unknown'] += 1
+        return self._json(request, 404, {'message': 'Not Found'}, self.core)
+
+    def _json(self, request, status, payload, bucket, headers=None):
+        all_headers = bucket.headers()
+        all_headers.update(headers or {})
+        return httpx.Response(status, headers=all_headers, content=json.dumps(payload).encode('utf-8'), request=request)
+
+    def _page(self, request, bucket, items, total=None):
+        """Returns one page of `items` with a GitHub style Link header."""
+        per_page = int(request.url.params.get('per_page', 30))
+        page = int(request.url.params.get('page', 1))
+        total = len(items) if total is None else total
+        last_page = max(1, -(-total // per_page))
+        start = (page - 1) * per_page
+        body = items[start:start + per_page]
+
+        links = []
+        base = str(request.url.copy_with(query=None))
+        params = dict(request.url.params)
+        for rel, target in (('next', page + 1), ('last', last_page)):
+            if target <= last_page and page < last_page:
+                params['page'] = target
+                links.append(f'<{base}?{urlencode(params)}>; rel="{rel}"')
+        headers = {'Link': ', '.join(links)} if links else {}
+        return self._json(request, 200, body, bucket, headers=headers)
+
+    # --- Handlers ---------------------------------------------------------
+
+    def _get_auth_user(self, request, bucket):
+        return self._json(request, 200, {'login': self.auth_user, 'id': 1, 'followers': len(self.followers),
+                                         'following': len(self.following)}, bucket)
+
+    def _get_rate_limit(self, request, bucket):
+        resources = {'core': self.core.to_dict(), 'search': self.search.to_dict()}
+        return self._json(request, 200, {'resources': resources, 'rate': resources['core']}, bucket)
+
+    def _get_user(self, request, bucket, login):
+        index = self._index(login)
+        if index is None:
+            return self._json(request, 404, {'message': 'Not Found'}, bucket)
+        return self._json(request, 200, self.user(index), bucket)
+
+    def _get_following(self, request, bucket, login):
+        items = [self._user_stub(u) for u in sorted(self.following)] if login == self.auth_user else []
+        return self._page(request, bucket, items)
+
+    def _get_followers(self, request, bucket, login):
+        items = [self._user_stub(u) for u in self.followers] if login == self.auth_user else []
+        return self._page(request, bucket, items)
+
+    def _get_my_followers(self, request, bucket):
+        return self._page(request, bucket, [self._user_stub(u) for u in self.followers])
+
+    def _check_following(self, request, bucket, login):
+        return httpx.Response(204 if login in self.following else 404, headers=bucket.headers(), request=request)
+
+    def _check_follows(self, request, bucket, login, target):
+        follows = target == self.auth_user and login in self.followers
+        return httpx.Response(204 if follows else 404, headers=bucket.headers(), request=request)
+
+    def _follow(self, request, bucket, login):
+        if self._index(login) is None:
+            return self._json(request, 404, {'message': 'Not Found'}, bucket)
+        self.following.add(login)
+        return httpx.Response(204, headers=bucket.headers(), request=request)
+
+    def _unfollow(self, request, bucket, login):
+        self.following.discard(login)
+        return httpx.Response(204, headers=bucket.headers(), request=request)
+
+    def _search_repositories(self, request, bucket):
+        query = request.url.params.get('q', '')
+        per_page = int(request.url.params.get('per_page', 30))
+        page = int(request.url.params.get('page', 1))
+        if (page - 1) * per_page >= 1000:
+            return self._json(request, 422, {'message': 'Only the first 1000 search results are available'}, bucket)
+
+        # Matching repositories are spread evenly over the last `search_days` (at whole
+        # seconds, like GitHub timestamps), newest first. A created:A..B qualifier
+        # narrows them down to that window.
+        step = self.search_days * 86400 / max(self.search_total, 1)
+        first, last = 0, self.search_total - 1
+        window = re.search(r'created:(\S+)\.\.(\S+)', query)
+        if window:
+            window_start, window_end = (datetime.fromisoformat(v.replace('Z', '+00:00')) for v in window.groups())
+            first = max(first, math.ceil((self.now - window_end).total_seconds() / step))
+            last = min(last, math.ceil(((self.now - window_start).total_seconds() + 1) / step) - 1)
+        total = max(0, last - first + 1)
+
+        offset = self._rng('search', re.sub(r'created:\S+', '', query)).randrange(max(self.num_users, 1))
+        start = first + (page - 1) * per_page
+        items = []
+        for i in range(start, min(start + per_page, first + total, first + 1000)):
+            owner = self.user((offset + i) % self.num_users)
+            items.append({
+                'id': 5_000_000 + i,
+                'name': f"portfolio-{i}",
+                'full_name': f"{owner['login']}/portfolio-{i}",
+                'owner': {'login': owner['login'], 'id': owner['id'], 'type': owner['type']},
+                'description': f"Repository matching {query[:40]}",
+                'created_at': _isoformat(self.now - timedelta(seconds=int(i * step))),
+                'stargazers_count': 0,
+            })
+        return self._json(request, 200, {'total_count': total, 'incomplete_results': False, 'items': items}, bucket)
+
+    def _get_public_events(self, request, bucket):
+        types = ['WatchEvent', 'ForkEvent', 'PushEvent', 'CreateEvent', 'IssuesEvent']
+        minute = int(time.time()) // self.public_feed_period
+        rng = self._rng('public', minute)
+        events = [self._event(minute * 10_000 + i, rng.randrange(self.num_users), types[i % len(types)], f"someone/repo{i}", i // 10)
+                  for i in range(self.public_events)]
+        page = request.url.params.get('page', '1')
+        etag = f'W/"{minute:x}-{page}"'
+        if request.headers.get('If-None-Match') == etag:
+            # Conditional hits are free on GitHub
+            bucket.remaining += 1
+            return httpx.Response(304, headers={**bucket.headers(), 'ETag': etag, 'X-Poll-Interval': '60'}, request=request)
+        response = self._page(request, bucket, events)
+        response.headers['ETag'] = etag
+        response.headers['X-Poll-Interval'] = '60'
+        return response
+
+    def _get_repo_events(self, request, bucket, owner, repo):
+        rng = self._rng('repo', owner, repo)
+        events = [self._event(zlib.crc32(f"{owner}/{repo}/{i}".encode('utf-8')), rng.randrange(self.num_users),
+                              'WatchEvent' if i % 4 else 'ForkEvent', f"{owner}/{repo}", i)
+                  for i in range(self.repo_events)]
+        return self._page(request, bucket, events)
+
+    def _get_user_repos(self, request, bucket, login):
+        index = self._index(login)
+        if index is None:
+            return self._json(request, 404, {'message': 'Not Found'}, bucket)
+        repos = [{'name': f"repo{i}", 'owner': {'login': login}, 'fork': False, 'pushed_at': _isoformat(self.now)}
+                 for i in range(self._rng('repos', index).randint(0, 5))]
+        return self._page(request, bucket, repos)
+
+    def _get_commits(self, request, bucket, owner, repo):
+        return self._page(request, bucket, [{'sha': f"{i:040x}"} for i in range(3)])
+
+    def _empty_list(self, request, bucket, login, *args):
+        return self._json(request, 200, [], bucket)
+
+    def _not_found(self, request, bucket, **kwargs):
+        return self._json(request, 404, {'message': 'Not Found'}, bucket)
@@ -0,0 +1,295 @@
+"""Compact, compressed snapshots of the bot state for the CI state commit.
+
+Instead of committing the whole `reach.db`, each run writes a small delta with the
+rows that changed since the previous snapshot. Deltas are periodically folded into a
+new base snapshot. At startup a missing database is rebuilt from the base plus deltas.
+
+Layout of the snapshot directory:
+
+    manifest.json              {"base": "base-<stamp>.jsonl.gz", "deltas": ["delta-<stamp>.jsonl.gz", ...]}
+    base-<stamp>.jsonl.gz      every row of every snapshotted table
+    delta-<stamp>.jsonl.gz     upserts and deletes since the previous file
+
+Every line of a snapshot file is either {"t": table, "op": "u", "row": {...}} or
+{"t": table, "op": "d", "key": key}.
+
+    python -m src.snapshot export|restore|compact
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, insert, select, text
+
+from . import database
+from .config_loader import load_config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+RESTORE_BATCH_SIZE = 5000
+
+# Tables included in snapshots, mapped to the natural key used to diff their rows.
+# Transient tables (logs, bot_status) are intentionally left out.
+SNAPSHOT_TABLES = {
+    'users': 'username',
+    'disqualified_users': 'username',
+    'repo_state': 'repo_name',
+    'search_cursors': 'query_key',
+    'candidates': 'username',
+    'negative_cache': 'username',
+    'followers': 'username',
+    'source_stats': 'source',
+    'stage_costs': 'stage',
+}
+
+
+def _snapshot_settings(settings):
+    snapshot = settings.get('snapshot', {}) if settings else {}
+    return {
+        'enabled': snapshot.get('enabled', True),
+        'dir': snapshot.get('dir', 'state'),
+        'compact_every': snapshot.get('compact_every', 24),
+        'compact_ratio': snapshot.get('compact_ratio', 0.5),
+    }
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _decoders(table):
+    """Returns per-column functions that turn snapshot JSON values back into DB values."""
+    decoders = {}
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            decoders[column.name] = lambda v: datetime.fromisoformat(v) if v else None
+    return decoders
+
+
+def _row_digest(line):
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=8).digest()
+
+
+def _read_manifest(state_dir):
+    path = os.path.join(state_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(state_dir, manifest):
+    path = os.path.join(state_dir, MANIFEST)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _snapshot_files(manifest):
+    return ([manifest['base']] if manifest.get('base') else []) + manifest.get('deltas', [])
+
+
+def _iter_entries(state_dir, manifest):
+    """Streams the entries of the base snapshot followed by every delta, in order."""
+    for name in _snapshot_files(manifest):
+        with gzip.open(os.path.join(state_dir, name), 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _iter_table_rows(table_name):
+    """Streams (key, serialized row) pairs for a table straight from the database."""
+    table = database.Base.metadata.tables[table_name]
+    key_column = SNAPSHOT_TABLES[table_name]
+    names = [column.name for column in table.columns]
+    with database.engine.connect() as conn:
+        result = conn.execution_options(yield_per=RESTORE_BATCH_SIZE).execute(select(table))
+        for row in result:
+            record = {name: _encode_value(value) for name, value in zip(names, row)}
+            yield record[key_column], json.dumps(record, sort_keys=True, separators=(',', ':'))
+
+
+def _snapshot_digests(state_dir, manifest):
+    """Replays the snapshot chain into {table: {key: row digest}} without keeping rows."""
+    digests = {table: {} for table in SNAPSHOT_TABLES}
+    for entry in _iter_entries(state_dir, manifest):
+        table_digests = digests.setdefault(entry['t'], {})
+        if entry['op'] == 'u':
+            row = entry['row']
+            line = json.dumps(row, sort_keys=True, separators=(',', ':'))
+            table_digests[row[SNAPSHOT_TABLES[entry['t']]]] = _row_digest(line)
+        else:
+            table_digests.pop(entry['key'], None)
+    return digests
+
+
+def _new_file_name(prefix):
+    return f"{prefix}-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{time.time_ns() % 1_000_000:06d}.jsonl.gz"
+
+
+def write_base(state_dir):
+    """Writes every snapshotted row into a new base file and drops the old chain."""
+    os.makedirs(state_dir, exist_ok=True)
+    old_manifest = _read_manifest(state_dir) or {}
+    name = _new_file_name('base')
+    rows = 0
+    with gzip.open(os.path.join(state_dir, name), 'wt', encoding='utf-8') as f:
+        for table_name in SNAPSHOT_TABLES:
+            for _, line in _iter_table_rows(table_name):
+                f.write(f'{{"t":"{table_name}","op":"u","row":{line}}}\n')
+                rows += 1
+
+    _write_manifest(state_dir, {'base': name, 'deltas': []})
+    for old_name in _snapshot_files(old_manifest):
+        old_path = os.path.join(state_dir, old_name)
+        if os.path.exists(old_path):
+            os.remove(old_path)
+    logger.info(f"Wrote base snapshot {name} with {rows} rows.")
+    return name
+
+
+def export_state(state_dir='state', compact_every=24, compact_ratio=0.5):
+    """Writes the rows changed since the last snapshot as a new delta file.
+
+    Falls back to a new base snapshot when there is none yet, when `compact_every`
+    deltas have accumulated, or when the deltas add up to more than `compact_ratio`
+    times the size of the base. Returns the name of the written file, or None.
+    """
+    manifest = _read_manifest(state_dir)
+    if not manifest or not manifest.get('base'):
+        return write_base(state_dir)
+
+    digests = _snapshot_digests(state_dir, manifest)
+    name = _new_file_name('delta')
+    path = os.path.join(state_dir, name)
+    upserts = deletes = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for table_name in SNAPSHOT_TABLES:
+            previous = digests.get(table_name, {})
+            seen = set()
+            for key, line in _iter_table_rows(table_name):
+                seen.add(key)
+                if previous.get(key) != _row_digest(line):
+                    f.write(f'{{"t":"{table_name}","op":"u","row":{line}}}\n')
+                    upserts += 1
+            for key in previous.keys() - seen:
+                f.write(json.dumps({'t': table_name, 'op': 'd', 'key': key}) + '\n')
+                deletes += 1
+
+    if not upserts and not deletes:
+        os.remove(path)
+        logger.info("No state changes since the last snapshot.")
+        return None
+
+    manifest['deltas'].append(name)
+    _write_manifest(state_dir, manifest)
+    base_size = os.path.getsize(os.path.join(state_dir, manifest['base']))
+    delta_size = sum(os.path.getsize(os.path.join(state_dir, d)) for d in manifest['deltas'])
+    if len(manifest['deltas']) >= compact_every or delta_size > base_size * compact_ratio:
+        logger.info(f"Compacting {len(manifest['deltas'])} deltas ({delta_size} bytes) into a new base snapshot.")
+        return write_base(state_dir)
+
+    logger.info(f"Wrote delta snapshot {name}: {upserts} upserts, {deletes} deletes ({os.path.getsize(path)} bytes).")
+    return name
+
+
+def restore_state(state_dir='state'):
+    """Rebuilds the database from the base snapshot and its deltas.
+
+    Rows are applied in bulk with INSERT OR REPLACE inside one transaction, so memory
+    stays bounded by RESTORE_BATCH_SIZE. Returns the number of entries applied.
+    """
+    manifest = _read_manifest(state_dir)
+    if not manifest or not manifest.get('base'):
+        logger.info(f"No snapshot found in '{state_dir}'. Nothing to restore.")
+        return 0
+
+    database.initialize_database()
+    tables = database.Base.metadata.tables
+    decoders = {name: _decoders(tables[name]) for name in SNAPSHOT_TABLES}
+    applied = 0
+    pending = {}
+
+    def flush(conn):
+        for table_name, rows in pending.items():
+            if rows:
+                conn.execute(insert(tables[table_name]).prefix_with('OR REPLACE'), rows)
+        pending.clear()
+
+    with database.engine.begin() as conn:
+        conn.execute(text("PRAGMA synchronous = OFF"))
+        for entry in _iter_entries(state_dir, manifest):
+            table_name = entry['t']
+            if table_name not in SNAPSHOT_TABLES:
+                continue
+            if entry['op'] == 'u':
+                row = entry['row']
+                for column, decode in decoders[table_name].items():
+                    if column in row:
+                        row[column] = decode(row[column])
+                pending.setdefault(table_name, []).append(row)
+                if len(pending[table_name]) >= RESTORE_BATCH_SIZE:
+                    flush(conn)
+            else:
+                # Deletes must see every earlier upsert of the same key
+                flush(conn)
+                key_column = tables[table_name].c[SNAPSHOT_TABLES[table_name]]
+                conn.execute(tables[table_name].delete().where(key_column == entry['key']))
+            applied += 1
+        flush(conn)
+
+    logger.info(f"Restored {applied} snapshot entries from '{state_dir}' into {database.DB_FILE}.")
+    return applied
+
+
+def restore_state_if_needed(settings):
+    """Rebuilds the database from snapshots when the database file does not exist yet."""
+    options = _snapshot_settings(settings)
+    if not options['enabled'] or os.path.exists(database.DB_FILE):
+        return 0
+    return restore_state(options['dir'])
+
+
+def export_state_from_settings(settings):
+    """Writes the end-of-run snapshot using the `snapshot` section of settings.yml."""
+    options = _snapshot_settings(settings)
+    if not options['enabled']:
+        return None
+    return export_state(options['dir'], options['compact_every'], options['compact_ratio'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or restore compact snapshots of reach.db.")
+    parser.add_argument('command', choices=['export', 'restore', 'compact'])
+    parser.add_argument('--dir', help="Snapshot directory (defaults to snapshot.dir in settings.yml).")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] - %(message)s")
+    settings, _ = load_config()
+    options = _snapshot_settings(settings)
+    state_dir = args.dir or options['dir']
+
+    if args.command == 'export':
+        database.initialize_database()
+        export_state(state_dir, options['compact_every'], options['compact_ratio'])
+    elif args.command == 'compact':
+        database.initialize_database()
+        write_base(state_dir)
+    else:
+        if os.path.exists(database.DB_FILE):
+            parser.error(f"{database.DB_FILE} already exists; move it away before restoring.")
+        restore_state(state_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Per-source yield accounting and a bandit that allocates discovery effort between sources.
+
+Every discovered login carries its source: `keyword:<query key>`, `repo:<owner/name>` or
+`public_events`. `SourceTally` adds up, per source and per run, the API calls spent on
+discovery and on validating its candidates, the candidates found, and how many were
+disqualified or scheduled. The run's tally is stored in `source_stats` with older runs
+decayed, so the yield estimate follows sources that dry up or come alive.
+
+`SourceAllocator` treats each source as an arm of a multi-armed bandit whose reward is
+scheduled users per API call. It uses Thompson sampling with a Gamma-Poisson model:
+every run it draws a yield for each source from its posterior, runs sources best first,
+and skips those that fall well below the best draw. Sources with little data have wide
+posteriors and keep being tried now and then, so a skipped source can come back.
+"""
+import logging
+import random
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('api_calls', 'candidates', 'disqualified', 'scheduled')
+
+
+class SourceTally:
+    """One run's per-source counts."""
+
+    def __init__(self):
+        self.tallies = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+
+    def add_calls(self, source, calls):
+        self.tallies[source]['api_calls'] += calls
+
+    def add_found(self, found_users):
+        """Counts discovered logins, given as {login: source}."""
+        for source, count in Counter(found_users.values()).items():
+            self.tallies[source]['candidates'] += count
+
+    def record_outcome(self, source, scheduled, api_calls=0, failed=False):
+        """Records a validated candidate. Failed lookups count their calls only."""
+        tally = self.tallies[source]
+        tally['api_calls'] += api_calls
+        if scheduled:
+            tally['scheduled'] += 1
+        elif not failed:
+            tally['disqualified'] += 1
+
+    def as_dict(self):
+        return {source: dict(tally) for source, tally in self.tallies.items()}
+
+    def log_summary(self, top=10):
+        ranked = sorted(self.tallies.items(), key=lambda item: (item[1]['scheduled'], -item[1]['api_calls']), reverse=True)
+        for source, tally in ranked[:top]:
+            per_call = tally['scheduled'] / tally['api_calls'] if tally['api_calls'] else 0
+            logger.info(f"Source {source}: {tally['candidates']} found, {tally['disqualified']} disqualified, "
+                        f"{tally['scheduled']} scheduled for {tally['api_calls']} API calls ({per_call:.3f} per call).")
+
+
+class SourceAllocator:
+    """Chooses which discovery sources to run, and in what order, from their past yield."""
+
+    def __init__(self, stats, settings=None, rng=None):
+        allocation = (settings or {}).get('source_allocation', {})
+        self.stats = stats
+        self.prior_scheduled = allocation.get('prior_scheduled', 1.0)
+        self.prior_calls = allocation.get('prior_calls', 20.0)
+        self.skip_below = allocation.get('skip_below', 0.25)
+        self.min_sources = allocation.get('min_sources', 3)
+        self.rng = rng or random.Random()
+
+    def posterior(self, source):
+        """Gamma posterior (shape, rate) of the source's scheduled users per API call."""
+        stat = self.stats.get(source, {})
+        return self.prior_scheduled + stat.get('scheduled', 0.0), self.prior_calls + stat.get('api_calls', 0.0)
+
+    def sample_yield(self, source):
+        shape, rate = self.posterior(source)
+        return self.rng.gammavariate(shape, 1.0 / rate)
+
+    def plan(self, groups, min_keep=None):
+        """Splits each group's sources into the ones to run (best draw first) and the ones
+        to skip this run.
+
+        `groups` maps a group name (e.g. 'keyword') to its sources. A source is skipped when
+        its draw is below `skip_below` times the best draw over all groups, but each group
+        keeps at least `min_keep[group]` sources (default `min_sources`).
+        """
+        min_keep = min_keep or {}
+        draws = {source: self.sample_yield(source) for sources in groups.values() for source in sources}
+        if not draws:
+            return {group: [] for group in groups}, []
+        threshold = max(draws.values()) * self.skip_below
+        selected, skipped = {}, []
+        for group, sources in groups.items():
+            ranked = sorted(sources, key=draws.get, reverse=True)
+            keep = min_keep.get(group, self.min_sources)
+            selected[group] = [s for i, s in enumerate(ranked) if i < keep or draws[s] >= threshold]
+            skipped.extend(s for s in ranked if s not in selected[group])
+        return selected, skipped
@@ -0,0 +1,152 @@
+"""Summarizes a trace file written with --trace.
+
+    python -m src.trace_viewer reach-traces.jsonl --top 10
+
+Prints the slowest traces with their critical path (the slowest child at every level),
+the span paths that cost the most time and API requests across all traces, and a
+per-source breakdown of candidate latency and API cost.
+"""
+import argparse
+import re
+from collections import defaultdict
+
+from . import json_codec
+
+_ORIGIN = re.compile(r'^https?://[^/]+')
+_ROUTE_PATTERNS = [
+    (re.compile(r'^/repos/[^/]+/[^/]+'), '/repos/{owner}/{repo}'),
+    (re.compile(r'^/users/[^/]+'), '/users/{user}'),
+    (re.compile(r'^/user/following/[^/]+'), '/user/following/{user}'),
+]
+
+
+def load_spans(path):
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                spans.append(json_codec.loads(line))
+    return spans
+
+
+def route(url):
+    """Replaces logins and repository names in an API path so calls can be grouped."""
+    path = _ORIGIN.sub('', url.split('?', 1)[0])
+    for pattern, replacement in _ROUTE_PATTERNS:
+        path = pattern.sub(replacement, path, count=1)
+    return path
+
+
+def span_label(span):
+    if span['name'] == 'http':
+        return f"http {span['attrs'].get('method', '')} {route(span['attrs'].get('url', ''))}"
+    return span['name']
+
+
+def build_traces(spans):
+    """Groups spans by trace. Returns {trace_id: (root, children_by_parent_id)}."""
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span['trace_id']].append(span)
+    traces = {}
+    for trace_id, members in by_trace.items():
+        ids = {span['span_id'] for span in members}
+        children = defaultdict(list)
+        roots = []
+        for span in members:
+            if span['parent_id'] in ids:
+                children[span['parent_id']].append(span)
+            else:
+                roots.append(span)
+        root = max(roots, key=lambda s: s['duration_ms'])
+        traces[trace_id] = (root, children)
+    return traces
+
+
+def critical_path(root, children):
+    path = [root]
+    while children.get(path[-1]['span_id']):
+        path.append(max(children[path[-1]['span_id']], key=lambda s: s['duration_ms']))
+    return path
+
+
+def walk(span, children, prefix=()):
+    """Yields (path labels, span) for `span` and its descendants."""
+    path = prefix + (span_label(span),)
+    yield path, span
+    for child in children.get(span['span_id'], []):
+        yield from walk(child, children, path)
+
+
+def api_calls(span, children):
+    return sum(1 for _, s in walk(span, children) if s['name'] == 'http')
+
+
+def path_costs(traces):
+    """Total time and API requests per span path across all traces, costliest first."""
+    costs = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'api_calls': 0})
+    for root, children in traces.values():
+        for path, span in walk(root, children):
+            cost = costs[' > '.join(path)]
+            cost['count'] += 1
+            cost['total_ms'] += span['duration_ms']
+            cost['api_calls'] += span['name'] == 'http'
+    return sorted(costs.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+
+
+def source_costs(traces):
+    """Candidate latency, API cost and scheduling rate per discovery source."""
+    sources = defaultdict(lambda: {'candidates': 0, 'total_ms': 0.0, 'api_calls': 0, 'scheduled': 0})
+    for root, children in traces.values():
+        if root['name'] != 'candidate':
+            continue
+        source = sources[root['attrs'].get('source') or 'unknown']
+        source['candidates'] += 1
+        source['total_ms'] += root['duration_ms']
+        source['api_calls'] += api_calls(root, children)
+        source['scheduled'] += bool(root['attrs'].get('scheduled'))
+    return sorted(sources.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+
+
+def describe(span):
+    attrs = span['attrs']
+    subject = attrs.get('candidate') or attrs.get('url') or ''
+    source = f" [{attrs['source']}]" if attrs.get('source') else ''
+    return f"{span['name']} {subject}{source}".strip()
+
+
+def print_report(spans, top=10):
+    traces = build_traces(spans)
+    print(f"{len(spans)} spans in {len(traces)} traces\n")
+
+    print("Slowest traces:")
+    slowest = sorted(traces.values(), key=lambda t: t[0]['duration_ms'], reverse=True)[:top]
+    for root, children in slowest:
+        print(f"{root['duration_ms']:>10.1f}ms  {describe(root)} ({api_calls(root, children)} API calls)")
+        for depth, span in enumerate(critical_path(root, children)[1:], start=1):
+            print(f"{'':>14}{'  ' * depth}{span['duration_ms']:.1f}ms {span_label(span)}")
+
+    print("\nCostliest span paths:")
+    print(f"{'total ms':>12} {'count':>7} {'avg ms':>9} {'API':>6}  path")
+    for path, cost in path_costs(traces)[:top]:
+        print(f"{cost['total_ms']:>12.1f} {cost['count']:>7} {cost['total_ms'] / cost['count']:>9.1f} {cost['api_calls']:>6}  {path}")
+
+    by_source = source_costs(traces)
+    if by_source:
+        print("\nCandidates by discovery source:")
+        print(f"{'candidates':>10} {'avg ms':>9} {'API/cand':>9} {'scheduled':>10}  source")
+        for source, cost in by_source[:top]:
+            n = cost['candidates']
+            print(f"{n:>10} {cost['total_ms'] / n:>9.1f} {cost['api_calls'] / n:>9.1f} {cost['scheduled']:>10}  {source}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank the slowest and costliest paths in a trace file.")
+    parser.add_argument('path', nargs='?', default='reach-traces.jsonl')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+    print_report(load_spans(args.path), args.top)
+
+
+if __name__ == '__main__':
+    main()
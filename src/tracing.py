@@ -0,0 +1,148 @@
+"""Lightweight tracing spans, written to a local JSONL file.
+
+Spans nest through a context variable, so a span opened inside a coroutine becomes
+the parent of every span opened further down the same task, including database calls
+made through `run_db`. Each candidate gets its own trace:
+
+    with tracer.span('candidate', candidate=username, source=source):
+        await process_user(...)
+
+Tracing is off unless `configure_tracing` enables it, in which case `span` costs a
+context-variable lookup. Sampling is decided once per trace, at its root span, and
+finished spans are buffered and written in batches. Read the file with
+`python -m src.trace_viewer`.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from . import json_codec
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attrs', 'start', 'sampled', '_started_at')
+
+    def __init__(self, name, trace_id, parent_id, sampled, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attrs = attrs
+        self.start = time.time()
+        self._started_at = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, duration, status):
+        return {
+            'trace_id': self.trace_id, 'span_id': self.span_id, 'parent_id': self.parent_id,
+            'name': self.name, 'start': round(self.start, 6), 'duration_ms': round(duration * 1000, 3),
+            'status': status, 'attrs': self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is off, so instrumented code can call `set` unconditionally."""
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlSink:
+    """Appends finished spans to a JSONL file, one span per line, in batches."""
+
+    def __init__(self, path, batch_size=200):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self._buffer = []
+        # Spans finish on the event loop and on the database thread
+        self._lock = threading.Lock()
+
+    def export(self, span_dict):
+        with self._lock:
+            self._buffer.append(span_dict)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with open(self.path, 'a') as f:
+            f.write(''.join(json_codec.dumps(span) + '\n' for span in self._buffer))
+        self.written += len(self._buffer)
+        self._buffer = []
+
+
+class Tracer:
+    def __init__(self):
+        self.sink = None
+        self.sample_rate = 1.0
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def configure(self, sink, sample_rate=1.0):
+        self.sink = sink
+        self.sample_rate = sample_rate
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Opens a span as a child of the current one, or as the root of a new trace."""
+        if self.sink is None:
+            yield NOOP_SPAN
+            return
+        parent = _current_span.get()
+        if parent is None:
+            span = Span(name, f"{random.getrandbits(128):032x}", None, random.random() < self.sample_rate, attrs)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled, attrs)
+        token = _current_span.set(span)
+        status = 'ok'
+        try:
+            yield span
+        except BaseException as e:
+            status = 'error'
+            span.attrs['error'] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            if span.sampled and self.sink is not None:
+                self.sink.export(span.to_dict(time.perf_counter() - span._started_at, status))
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.flush()
+            logger.info(f"Wrote {self.sink.written} trace spans to {self.sink.path}.")
+            self.sink = None
+
+
+tracer = Tracer()
+
+
+def configure_tracing(settings, enabled=False):
+    """Enables tracing when `enabled` (the --trace flag) or `tracing.enabled` is set."""
+    tracing = settings.get('tracing', {})
+    if not (enabled or tracing.get('enabled', False)):
+        return
+    path = tracing.get('path', 'reach-traces.jsonl')
+    sample_rate = tracing.get('sample_rate', 1.0)
+    tracer.configure(JsonlSink(path, batch_size=tracing.get('batch_size', 200)), sample_rate)
+    logger.info(f"Tracing to {path} (sampling {sample_rate:.0%} of traces).")
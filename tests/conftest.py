@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Points src.database at a fresh SQLite file for the duration of a test."""
+    from src import database
+
+    db_file = str(tmp_path / 'reach.db')
+    test_engine = create_engine(f"sqlite:///{db_file}")
+    # Patched too so that use_database() in a test cannot leak DB_FILE into later tests
+    monkeypatch.setattr(database, 'DB_FILE', db_file)
+    monkeypatch.setattr(database, 'engine', test_engine)
+    monkeypatch.setattr(database, 'Session', sessionmaker(bind=test_engine))
+    database.initialize_database()
+    yield database
+    test_engine.dispose()
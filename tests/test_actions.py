@@ -1,7 +1,11 @@
+import httpx
 import pytest
 import random
 from unittest.mock import patch, MagicMock
-from src.actions import follow_users, unfollow_users
+from src.actions import follow_users, unfollow_users, track_follow_backs
+from src.github_api import GithubAPI
+from src.simulator import FakeGitHub
+from src.database import TargetRow
 from datetime import datetime, timedelta, timezone
 
 @pytest.mark.asyncio
@@ -12,7 +16,7 @@ from datetime import datetime, timedelta, timezone
 async def test_follow_users_dry_run(mock_load_config, mock_github_api, mock_update_status, mock_get_users):
     """Tests the follow action in dry-run mode."""
     mock_load_config.return_value = ({'limits': {'max_follow': 50}, 'delays': {}}, {})
-    mock_get_users.return_value = [{'username': 'testuser1'}]
+    mock_get_users.return_value = [TargetRow('testuser1', 1.0)]
 
     await follow_users(dry_run=True)
 
@@ -20,12 +24,17 @@ async def test_follow_users_dry_run(mock_load_config, mock_github_api, mock_upda
     mock_github_api.return_value.__aenter__.return_value.follow_user.assert_not_called()
     mock_update_status.assert_called_with('testuser1', 'skipped')
 
+def _add_db_user(db, username):
+    session = db.Session()
+    session.add(db.User(username=username, github_id=hash(username) % 100000, status='followed'))
+    session.commit()
+    session.close()
+
 @pytest.mark.asyncio
-@patch('src.actions.get_all_usernames_in_db')
 @patch('src.actions.update_user_status')
 @patch('src.actions.GithubAPI')
 @patch('src.actions.load_config')
-async def test_unfollow_users_dry_run(mock_load_config, mock_github_api, mock_update_status, mock_get_all_usernames):
+async def test_unfollow_users_dry_run(mock_load_config, mock_github_api, mock_update_status, temp_db):
     """Tests the unfollow action in dry-run mode."""
     mock_load_config.return_value = ({'limits': {'max_unfollow': 50}}, {})
     
@@ -37,7 +46,7 @@ async def test_unfollow_users_dry_run(mock_load_config, mock_github_api, mock_up
     # These follow bot
     mock_api_instance.get_my_followers.return_value = ['follower_user']
     # These are in DB
-    mock_get_all_usernames.return_value = {'user_in_db'}
+    _add_db_user(temp_db, 'user_in_db')
 
     await unfollow_users(dry_run=True)
 
@@ -46,11 +55,10 @@ async def test_unfollow_users_dry_run(mock_load_config, mock_github_api, mock_up
     mock_api_instance.unfollow_user.assert_not_called()
 
 @pytest.mark.asyncio
-@patch('src.actions.get_all_usernames_in_db')
 @patch('src.actions.update_user_status')
 @patch('src.actions.GithubAPI')
 @patch('src.actions.load_config')
-async def test_unfollow_user_filters_correctly(mock_load_config, mock_github_api, mock_update_status, mock_get_all_usernames):
+async def test_unfollow_user_filters_correctly(mock_load_config, mock_github_api, mock_update_status, temp_db):
     """Tests that users are filtered correctly for unfollowing."""
     mock_load_config.return_value = ({'limits': {'max_unfollow': 10}}, {})
     
@@ -62,7 +70,7 @@ async def test_unfollow_user_filters_correctly(mock_load_config, mock_github_api
     # user3: following, not follower, in db -> EXCLUDED (in db)
     mock_api_instance.get_following.return_value = ['user1', 'user2', 'user3']
     mock_api_instance.get_my_followers.return_value = ['user2']
-    mock_get_all_usernames.return_value = {'user3'}
+    _add_db_user(temp_db, 'user3')
     
     mock_api_instance.unfollow_user.return_value = True
 
@@ -71,3 +79,67 @@ async def test_unfollow_user_filters_correctly(mock_load_config, mock_github_api
     # Should only unfollow user1
     mock_api_instance.unfollow_user.assert_called_once_with('user1')
     mock_update_status.assert_called_once_with('user1', 'unfollowed')
+
+
+def test_select_unfollow_candidates_samples_in_sql(temp_db):
+    _add_db_user(temp_db, 'in_db')
+    following = [f"user{i}" for i in range(100)] + ['in_db', 'fan']
+
+    sample, total = temp_db.select_unfollow_candidates(following, ['fan', 'stranger'], limit=10)
+
+    assert total == 100
+    assert len(sample) == len(set(sample)) == 10
+    assert not set(sample) & {'in_db', 'fan'}
+
+
+def test_sync_followers_marks_follow_backs_in_bulk(temp_db):
+    for name in ('alice', 'bob', 'carol'):
+        _add_db_user(temp_db, name)
+
+    first = temp_db.sync_followers(['alice', 'stranger'])
+    assert first == {'followers': 2, 'new': 2, 'lost': 0, 'followed_back': 1, 'stopped_following': 0, 'checked': 3}
+
+    second = temp_db.sync_followers(['bob', 'stranger'])
+    assert second['new'] == 1 and second['lost'] == 1
+    assert second['followed_back'] == 1 and second['stopped_following'] == 1
+
+    session = temp_db.Session()
+    users = {u.username: u for u in session.query(temp_db.User)}
+    followers = {f.username for f in session.query(temp_db.Follower)}
+    session.close()
+    assert users['bob'].followed_back_at is not None
+    assert users['alice'].followed_back_at is None
+    assert all(u.last_checked_at is not None for u in users.values())
+    assert followers == {'bob', 'stranger'}
+
+
+def test_sync_followers_dry_run_rolls_back(temp_db):
+    _add_db_user(temp_db, 'alice')
+    assert temp_db.sync_followers(['alice'], dry_run=True)['followed_back'] == 1
+    assert temp_db.sync_followers(['alice'])['followed_back'] == 1
+
+
+@pytest.mark.asyncio
+async def test_track_follow_backs_keeps_snapshot_when_a_page_fails(temp_db, monkeypatch):
+    sim = FakeGitHub(num_users=400, followers=350)
+    fail_page = {'page': None}
+
+    async def flaky(request):
+        if request.url.path == '/user/followers' and request.url.params.get('page') == fail_page['page']:
+            return httpx.Response(502, request=request)
+        return await sim.handle(request)
+
+    monkeypatch.setenv('GITHUB_PAT', 'test')
+    monkeypatch.setattr(GithubAPI, 'transport', httpx.MockTransport(flaky))
+    _add_db_user(temp_db, sim.login(300))
+
+    assert (await track_follow_backs())['followers'] == 350
+    fail_page['page'] = '3'
+    assert await track_follow_backs() is None
+
+    session = temp_db.Session()
+    try:
+        assert session.query(temp_db.Follower).count() == 350
+        assert session.query(temp_db.User).filter_by(username=sim.login(300)).one().followed_back_at is not None
+    finally:
+        session.close()
@@ -0,0 +1,63 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.budget_planner import plan_run
+from src.github_api import GithubAPI
+from src.metrics import counting_api_calls
+from src.scanner import scan_for_users
+from src.simulator import FakeGitHub
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, result=None):
+    return await _real_sleep(0, result)
+
+
+SETTINGS = {'limits': {'max_follow': 100, 'max_unfollow': 20}, 'budget': {'reserve': 150, 'default_candidate_cost': 5}}
+CRITERIA = {'repository_keywords': ['portfolio'], 'target_repos': ['org/repo'], 'negative_signals': {'max_followers': 100}}
+
+
+@pytest.mark.asyncio
+async def test_plan_caps_the_scan_to_what_is_left_after_unfollow_and_follow(temp_db, monkeypatch):
+    sim = FakeGitHub(num_users=500, following=250, followers=120, core_limit=1000)
+    monkeypatch.setattr(GithubAPI, 'transport', sim.transport())
+    monkeypatch.setenv('GITHUB_PAT', 'test')
+
+    plan = await plan_run(SETTINGS, CRITERIA, ['scan', 'unfollow', 'follow'])
+
+    assert plan.available == 1000 - 150
+    # 1 profile + 3 following pages + 2 follower pages + 20 unfollows
+    assert plan.planned['unfollow']['core'] == 26
+    assert plan.planned['follow']['core'] == 100
+    # Scan: 1 profile + 3 following pages + 1 target repo + 3 public event pages = 8 fixed
+    assert plan.max_candidates == (850 - 126 - 8) // 5
+    assert plan.planned['scan']['core'] == 8 + plan.max_candidates * 5
+
+
+@pytest.mark.asyncio
+async def test_scan_stops_validating_at_the_planned_cap_and_records_its_cost(temp_db, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    sim = FakeGitHub(num_users=300, search_total=300, core_limit=400)
+    monkeypatch.setattr(GithubAPI, 'transport', sim.transport())
+    monkeypatch.setenv('GITHUB_PAT', 'test')
+
+    plan = await plan_run(SETTINGS, CRITERIA, ['scan'])
+    assert 0 < plan.max_candidates < 300
+    with patch('src.scanner.load_config', return_value=(SETTINGS, CRITERIA)), patch('asyncio.sleep', _no_sleep):
+        with counting_api_calls() as calls:
+            await scan_for_users(dry_run=False, plan=plan)
+    plan.record('scan', calls)
+
+    assert plan.units['scan.validate'] <= plan.max_candidates
+    assert temp_db.count_queued_candidates() > 0
+    costs = plan.history_costs()
+    assert costs['scan.validate']['units'] == plan.units['scan.validate']
+    assert costs['scan.discovery']['search_calls'] == calls.search_calls > 0
+    assert costs['scan.discovery']['core_calls'] + costs['scan.validate']['core_calls'] == calls.core_calls
+
+    temp_db.record_stage_costs(costs)
+    history = temp_db.get_stage_costs()
+    assert history['scan.validate']['units'] == plan.units['scan.validate']
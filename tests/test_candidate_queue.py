@@ -0,0 +1,42 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from src.candidate_queue import CandidateQueue
+from src.scanner import process_candidates
+
+
+def test_queue_leases_by_source_priority_and_carries_over(temp_db):
+    queue = CandidateQueue()
+    queue.enqueue({'kw': 'keyword:portfolio', 'star': 'repo:owner/name', 'event': 'public_events'})
+
+    assert queue.lease(2) == [('star', 'repo:owner/name'), ('event', 'public_events')]
+    queue.complete(['star', 'event'])
+
+    # A new queue (next run) still sees the leftover, and leased rows are not handed out twice
+    next_run = CandidateQueue()
+    assert next_run.lease(10) == [('kw', 'keyword:portfolio')]
+    assert next_run.lease(10) == []
+    assert len(next_run) == 1
+
+
+def test_expired_leases_are_retried_then_pruned(temp_db):
+    queue = CandidateQueue({'queue': {'lease_seconds': -1, 'max_attempts': 2}})
+    queue.enqueue({'alice': 'keyword:portfolio'})
+
+    assert queue.lease(1) == [('alice', 'keyword:portfolio')]
+    assert queue.lease(1) == [('alice', 'keyword:portfolio')]
+    assert queue.lease(1) == []
+    assert queue.prune() == 1
+    assert len(queue) == 0
+
+
+def test_process_candidates_stops_at_limit_and_keeps_the_rest(temp_db):
+    queue = CandidateQueue()
+    found = {f"user{i}": 'keyword:portfolio' for i in range(50)}
+
+    with patch('src.scanner.process_user', AsyncMock(return_value=True)) as process_user:
+        scheduled = asyncio.run(process_candidates(found, {'user0'}, None, None, 25, queue=queue))
+
+    assert scheduled == 40
+    assert process_user.call_count == 40
+    assert len(queue) == 9
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src import scanner
+from src.cassette import RecordingTransport, ReplayTransport, compare, summarize
+from src.github_api import GithubAPI
+from src.scanner import scan_for_users
+from src.search_planner import search_window
+from src.simulator import FakeGitHub
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, result=None):
+    return await _real_sleep(0, result)
+
+
+async def _workload(transport):
+    async with GithubAPI(pat='test', transport=transport) as api:
+        details = await api.get_user_details('user3')
+        following = await api.get_following('reach-bot')
+        missing = await api.get_user_details('nobody')
+    return details, following, missing
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_returns_identical_responses(tmp_path):
+    path = tmp_path / 'run.cassette.jsonl.gz'
+    sim = FakeGitHub(num_users=300, following=150)
+    recorder = RecordingTransport(str(path), sim.transport())
+    recorded = await _workload(recorder)
+    recorder.close()
+
+    replay = ReplayTransport(str(path), latency_scale=0)
+    replayed = await _workload(replay)
+
+    assert replayed == recorded
+    assert recorded[2] is None
+    assert not replay.misses
+    assert summarize(str(path))['endpoints'] == {'GET /users/{user}': 2, 'GET /users/{user}/following': 2}
+
+
+@pytest.mark.asyncio
+async def test_compare_reports_added_requests(tmp_path):
+    sim = FakeGitHub(num_users=10)
+    before = RecordingTransport(str(tmp_path / 'before.gz'), sim.transport())
+    async with GithubAPI(pat='test', transport=before) as api:
+        await api.get_user_details('user1')
+    before.close()
+
+    after = RecordingTransport(str(tmp_path / 'after.gz'), sim.transport())
+    async with GithubAPI(pat='test', transport=after) as api:
+        await api.get_user_details('user1')
+        await api.get_user_details('user2')
+    after.close()
+
+    summary_before, summary_after, deltas = compare(str(tmp_path / 'before.gz'), str(tmp_path / 'after.gz'))
+    assert (summary_before['requests'], summary_after['requests']) == (1, 2)
+    assert deltas == {'GET /users/{user}': 1}
+
+
+@pytest.mark.asyncio
+async def test_full_scan_replays_after_the_search_window_moved(temp_db, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('GITHUB_PAT', 'test')
+    settings = {'limits': {'max_follow': 1000}}
+    criteria = {'repository_keywords': ['portfolio'], 'target_repos': ['org/repo'],
+                'negative_signals': {'max_followers': 100}}
+    path = tmp_path / 'scan.cassette.jsonl.gz'
+
+    recorder = RecordingTransport(str(path), FakeGitHub(num_users=200, search_total=200).transport())
+    monkeypatch.setattr(GithubAPI, 'transport', recorder)
+    with patch('src.scanner.load_config', return_value=(settings, criteria)), patch('asyncio.sleep', _no_sleep):
+        await scan_for_users(dry_run=False)
+    recorder.close()
+    recorded = sorted(user.username for user in temp_db.Session().query(temp_db.User))
+    assert recorded
+
+    # Replay into a fresh database and working directory (for the membership index) an
+    # hour later, so every created: window differs
+    (tmp_path / 'replay').mkdir()
+    monkeypatch.chdir(tmp_path / 'replay')
+    replay_engine = create_engine(f"sqlite:///{tmp_path / 'replay.db'}")
+    monkeypatch.setattr(temp_db, 'engine', replay_engine)
+    monkeypatch.setattr(temp_db, 'Session', sessionmaker(bind=replay_engine))
+    temp_db.initialize_database()
+    monkeypatch.setattr(scanner, 'search_window', lambda days: tuple(t + timedelta(hours=1) for t in search_window(days)))
+    replay = ReplayTransport(str(path), latency_scale=0)
+    monkeypatch.setattr(GithubAPI, 'transport', replay)
+    with patch('src.scanner.load_config', return_value=(settings, criteria)), patch('asyncio.sleep', _no_sleep):
+        await scan_for_users(dry_run=False)
+    replay_engine.dispose()
+
+    assert not replay.misses
+    assert sum(replay.served.values()) == recorder.count
+    assert replay.served['GET /search/repositories'] > 0
+    assert sorted(user.username for user in temp_db.Session().query(temp_db.User)) == recorded
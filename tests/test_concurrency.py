@@ -0,0 +1,52 @@
+import asyncio
+
+from src.concurrency import AIMDLimiter, OK, THROTTLED
+
+
+async def _complete(limiter, latency, outcome=OK, count=1):
+    for _ in range(count):
+        await limiter.acquire()
+        await limiter.release(latency, outcome)
+
+
+def test_limit_grows_additively_while_latency_is_healthy():
+    async def main():
+        limiter = AIMDLimiter(initial=4, max_limit=6, min_samples=4)
+        await _complete(limiter, 0.1, count=4)
+        assert limiter.limit == 5
+        await _complete(limiter, 0.1, count=20)
+        return limiter
+
+    assert asyncio.run(main()).limit == 6
+
+
+def test_limit_is_cut_once_per_congestion_event():
+    async def main():
+        limiter = AIMDLimiter(initial=8, min_samples=4, cooldown=60)
+        await _complete(limiter, 0.1, THROTTLED, count=3)
+        assert limiter.limit == 4
+        await _complete(limiter, 0.1, count=4)
+        # A latency spike after the cooldown has passed cuts again
+        limiter._last_decrease -= 60
+        await _complete(limiter, 1.0, count=8)
+        return limiter
+
+    assert asyncio.run(main()).limit == 2.5
+
+
+def test_in_flight_requests_never_exceed_the_limit():
+    async def main():
+        limiter = AIMDLimiter(initial=3, max_limit=3)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            await limiter.acquire()
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.001)
+            await limiter.release(0.001)
+
+        await asyncio.gather(*(request() for _ in range(20)))
+        return peak
+
+    assert asyncio.run(main()) == 3
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+
+
+def _add_users(db, rows):
+    session = db.Session()
+    for i, (status, score, followers) in enumerate(rows):
+        session.add(db.User(username=f"user{i}", github_id=i, status=status, score=score, followers_count=followers))
+    session.commit()
+    session.close()
+
+
+def test_get_users_page_walks_keyset_order(temp_db):
+    _add_users(temp_db, [('targeted', 1.0, 5), ('followed', 3.0, 5), ('targeted', 2.0, 5), ('targeted', 2.0, 5), ('followed', 1.0, 5)])
+
+    seen = []
+    cursor = None
+    while True:
+        page = temp_db.get_users_page(cursor=cursor, limit=2, columns=['username', 'status', 'score'])
+        seen.extend((u['status'], u['score'], u['username']) for u in page['users'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [
+        ('followed', 3.0, 'user1'),
+        ('followed', 1.0, 'user4'),
+        ('targeted', 2.0, 'user2'),
+        ('targeted', 2.0, 'user3'),
+        ('targeted', 1.0, 'user0'),
+    ]
+
+
+def test_get_users_page_includes_null_scores(temp_db):
+    _add_users(temp_db, [('targeted', None, 5), ('targeted', 2.0, 5), ('targeted', None, 5), ('targeted', 1.0, 5), ('unfollowed', 1.0, 5)])
+
+    seen = []
+    cursor = None
+    while True:
+        page = temp_db.get_users_page(cursor=cursor, limit=1, columns=['username'])
+        seen.extend(u['username'] for u in page['users'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == ['user1', 'user3', 'user0', 'user2', 'user4']
+
+
+def test_get_users_page_filters_and_projects(temp_db):
+    _add_users(temp_db, [('targeted', 1.0, 5), ('targeted', 1.0, 50), ('followed', 1.0, 10)])
+
+    page = temp_db.get_users_page(columns=['username'], statuses=['targeted'], min_followers=10)
+
+    assert page == {'users': [{'username': 'user1'}], 'next_cursor': None}
+
+
+def test_iter_users_streams_projected_rows(temp_db):
+    _add_users(temp_db, [('followed', 1.0, 5), ('followed', 2.0, 5)])
+    session = temp_db.Session()
+    session.query(temp_db.User).filter_by(username='user1').update({'followed_at': datetime(2026, 1, 1, tzinfo=timezone.utc)})
+    session.commit()
+    session.close()
+
+    rows = list(temp_db.iter_users(columns=['username', 'score'], batch_size=1,
+                                   followed_after=datetime(2025, 12, 1, tzinfo=timezone.utc)))
+
+    assert rows == [('user1', 2.0)]
+
+
+def test_disqualification_expiry_sweep_uses_reason_ttl(temp_db):
+    now = datetime.now(timezone.utc)
+    session = temp_db.Session()
+    session.add_all([
+        temp_db.DisqualifiedUser(username='old-org', reason='organization', disqualified_at=now - timedelta(days=100)),
+        temp_db.DisqualifiedUser(username='old-inactive', reason='inactive', disqualified_at=now - timedelta(days=100)),
+        temp_db.DisqualifiedUser(username='legacy', reason=None, disqualified_at=now - timedelta(days=100)),
+        temp_db.DisqualifiedUser(username='fresh', reason='inactive', disqualified_at=now - timedelta(days=1)),
+    ])
+    session.commit()
+    session.close()
+
+    assert temp_db.expire_disqualified_users({'organization': 3650, 'inactive': 30}, default_ttl_days=90) == 2
+    assert temp_db.load_disqualified_usernames() == {'old-org', 'fresh'}
+    assert temp_db.is_user_disqualified('fresh')
+    assert not temp_db.is_user_disqualified('legacy')
+
+
+def test_initialize_database_adds_missing_columns(temp_db):
+    from sqlalchemy import inspect, text
+    with temp_db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE disqualified_users"))
+        conn.execute(text("CREATE TABLE disqualified_users (id INTEGER PRIMARY KEY, username VARCHAR UNIQUE NOT NULL, disqualified_at DATETIME)"))
+
+    temp_db.initialize_database()
+
+    columns = {c['name'] for c in inspect(temp_db.engine).get_columns('disqualified_users')}
+    assert 'reason' in columns
+    temp_db.add_or_update_user({'login': 'org', 'id': 1, 'html_url': '', 'created_at': '2020-01-01T00:00:00Z',
+                                'updated_at': '2020-01-01T00:00:00Z'}, status='disqualified', reason='organization')
+    assert temp_db.load_disqualified_usernames() == {'org'}
+
+
+def test_selection_queries_return_projected_rows(temp_db):
+    _add_users(temp_db, [('targeted', 1.0, 5), ('targeted', 3.0, 5), ('followed', 2.0, 5)])
+
+    targets = temp_db.get_users_by_status_and_score('targeted', min_score=0, limit=10)
+    assert targets == [temp_db.TargetRow('user1', 3.0), temp_db.TargetRow('user0', 1.0)]
+    assert not hasattr(targets[0], '__dict__')
+
+    followed = temp_db.get_users_to_check(check_interval_days=1, limit=10)
+    assert [row.username for row in followed] == ['user2']
+    assert followed[0].last_checked_at is None
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import time
+
+from src.db_executor import run_db
+from src.metrics import metrics_tracker
+
+
+def test_db_calls_run_in_order_on_one_thread_without_blocking_the_loop(monkeypatch):
+    monkeypatch.setattr(metrics_tracker, 'db_calls', 0)
+    monkeypatch.setattr(metrics_tracker, 'db_max_queue_wait', 0.0)
+    order = []
+
+    def slow_write(i):
+        time.sleep(0.02)
+        order.append(i)
+        return threading.current_thread().name
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        tick_task = asyncio.create_task(ticker())
+        threads = await asyncio.gather(*(run_db(slow_write, i) for i in range(5)))
+        tick_task.cancel()
+        return threads, ticks
+
+    threads, ticks = asyncio.run(main())
+
+    assert order == [0, 1, 2, 3, 4]
+    assert len(set(threads)) == 1 and threads[0].startswith('reach-db')
+    assert ticks > 5  # the event loop kept running while the writes were in progress
+    assert metrics_tracker.db_calls == 5
+    assert metrics_tracker.db_max_queue_wait >= 0.05
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from src.event_poller import PublicEventPoller, RingBufferSet
+from src.github_api import GithubAPI
+from src.simulator import FakeGitHub
+
+
+def test_ring_buffer_set_forgets_oldest_items():
+    seen = RingBufferSet(2)
+    assert seen.add('a') and seen.add('b')
+    assert not seen.add('a')
+    assert seen.add('c')
+    assert 'a' not in seen and 'b' in seen and len(seen) == 2
+
+
+@pytest.mark.asyncio
+async def test_poller_walks_pages_and_uses_etags():
+    sim = FakeGitHub(num_users=50, public_events=250, public_feed_period=10**9)
+    found = []
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        poller = PublicEventPoller(api, found.append)
+        assert await poller.poll_once() == 3
+        # Feed has not moved, same ETags: every page answers 304 and nothing is reprocessed
+        assert await poller.poll_once() == 0
+
+    assert poller.poll_interval == 60
+    assert sim.requests['get_public_events'] == 4
+    # 2 of every 5 generated events are stars or forks
+    assert len(found) == 100
+
+
+@pytest.mark.asyncio
+async def test_stop_ends_the_poll_window_early():
+    sim = FakeGitHub(num_users=50, public_events=50, public_feed_period=10**9)
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        poller = PublicEventPoller(api, lambda login: None)
+        task = asyncio.create_task(poller.run(window_seconds=600))
+        await asyncio.sleep(0.05)
+        poller.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+    assert poller.polls == 1
@@ -0,0 +1,60 @@
+import asyncio
+import gzip
+import json
+from unittest.mock import patch
+from src.gharchive import ArchiveMatcher, discover_archive_users, iter_archive_events
+from src.scanner import import_archive_users
+
+
+def _write_dump(path, events):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event) + '\n')
+        f.write('{"type": "WatchEvent", broken\n')
+
+
+def _event(event_type, login, repo):
+    return {'type': event_type, 'actor': {'login': login}, 'repo': {'name': repo}, 'created_at': '2026-01-01T00:00:00Z'}
+
+
+def test_iter_archive_events_keeps_only_star_and_fork_events(tmp_path):
+    path = tmp_path / '2026-01-01-0.json.gz'
+    _write_dump(path, [_event('PushEvent', 'a', 'x/y'), _event('WatchEvent', 'b', 'x/y'), _event('ForkEvent', 'c', 'x/y')])
+
+    assert [e['actor']['login'] for e in iter_archive_events(path)] == ['b', 'c']
+
+
+def test_discover_archive_users_matches_target_repos_and_keywords(tmp_path):
+    first, second = tmp_path / 'a.json.gz', tmp_path / 'b.json.gz'
+    _write_dump(first, [
+        _event('WatchEvent', 'alice', 'jekyll/Jekyll'),
+        _event('ForkEvent', 'bob', 'someone/my-portfolio-site'),
+        _event('WatchEvent', 'carol', 'someone/unrelated'),
+    ])
+    _write_dump(second, [_event('WatchEvent', 'dependabot[bot]', 'jekyll/jekyll'), _event('WatchEvent', 'alice', 'x/cv')])
+
+    found, matches = discover_archive_users([first, second], ['jekyll/jekyll'], ['portfolio', 'cv'])
+
+    assert found == {'alice': 'repo:jekyll/jekyll', 'bob': 'keyword:portfolio'}
+    assert matches == {'repo:jekyll/jekyll': 1, 'keyword:portfolio': 1, 'keyword:cv': 1}
+
+
+def test_archive_matcher_matches_whole_words_only():
+    matcher = ArchiveMatcher([], ['cv', 'blog', 'developer-portfolio'])
+
+    assert matcher.match('someone/my-cv') == 'keyword:cv'
+    assert matcher.match('someone/cv.github.io') == 'keyword:cv'
+    assert matcher.match('someone/Portfolio_Developer') == 'keyword:developer-portfolio'
+    assert matcher.match('opencv/opencv') is None
+    assert matcher.match('oracle/weblogic') is None
+
+
+def test_import_without_matches_makes_no_api_calls(tmp_path):
+    path = tmp_path / 'quiet.json.gz'
+    _write_dump(path, [_event('WatchEvent', 'alice', 'someone/unrelated')])
+    criteria = {'repository_keywords': ['portfolio'], 'target_repos': []}
+
+    with patch('src.scanner.load_config', return_value=({}, criteria)), patch('src.scanner.GithubAPI') as github_api:
+        asyncio.run(import_archive_users([str(path)], dry_run=True))
+
+    github_api.assert_not_called()
@@ -0,0 +1,23 @@
+import json
+
+from src.json_codec import Projection, decode_items, dumps, loads
+
+
+def test_projection_keeps_only_requested_nested_fields():
+    projection = Projection('created_at', 'owner.login', 'owner.type', 'missing.field')
+    repo = {'id': 1, 'created_at': '2026-01-01T00:00:00Z', 'owner': {'login': 'dev', 'type': 'User', 'url': 'x'}}
+
+    assert projection(repo) == {'created_at': '2026-01-01T00:00:00Z', 'owner': {'login': 'dev', 'type': 'User'}}
+
+
+def test_decode_items_projects_search_payload():
+    content = json.dumps({'total_count': 2, 'items': [{'id': 1, 'full_name': 'a/b'}, {'id': 2, 'full_name': 'c/d'}]}).encode()
+
+    items, payload = decode_items(content, Projection('full_name'), items_key='items')
+
+    assert items == [{'full_name': 'a/b'}, {'full_name': 'c/d'}]
+    assert payload == {'total_count': 2, 'items': items}
+
+
+def test_codec_round_trip():
+    assert loads(dumps({'a': [1, 'é']})) == {'a': [1, 'é']}
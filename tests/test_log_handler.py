@@ -0,0 +1,77 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.logger import DatabaseLogHandler, attach_database_log_handler
+
+
+def logged_messages(database):
+    session = database.Session()
+    try:
+        return [(log.level, log.message) for log in session.query(database.Log).order_by(database.Log.id)]
+    finally:
+        session.close()
+
+
+def test_handler_writes_batches_at_or_above_its_level(temp_db, monkeypatch):
+    batches, threads = [], set()
+    write = temp_db.write_log_records
+
+    def record_batch(records):
+        batches.append(len(records))
+        threads.add(threading.current_thread().name)
+        write(records)
+
+    monkeypatch.setattr(temp_db, 'write_log_records', record_batch)
+
+    handler = DatabaseLogHandler(level=logging.INFO, batch_size=3, flush_interval=0.05)
+    logger = logging.getLogger('test_log_handler')
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+    try:
+        logger.debug("not stored")
+        for i in range(7):
+            logger.info(f"message {i}")
+        logger.warning("last")
+        handler.flush()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    messages = logged_messages(temp_db)
+    assert messages == [('INFO', f"message {i}") for i in range(7)] + [('WARNING', "last")]
+    assert max(batches) <= 3 and sum(batches) == 8
+    # Log rows are written by the same single database thread as everything else
+    assert all(name.startswith('reach-db') for name in threads)
+    assert handler.written == 8 and handler.dropped == 0
+
+
+def test_prune_logs_keeps_the_newest_rows_within_the_age_limit(temp_db):
+    now = datetime.now(timezone.utc)
+    temp_db.write_log_records([
+        {'timestamp': now - timedelta(days=30), 'level': 'INFO', 'message': 'expired'},
+        *({'timestamp': now - timedelta(minutes=10 - i), 'level': 'INFO', 'message': f"recent {i}"} for i in range(5)),
+    ])
+
+    assert temp_db.prune_logs(max_age_days=14) == 1
+    assert temp_db.prune_logs(max_rows=3) == 2
+    assert [message for _, message in logged_messages(temp_db)] == ['recent 2', 'recent 3', 'recent 4']
+    assert temp_db.prune_logs(max_rows=3, max_age_days=14) == 0
+
+
+
+def test_attached_handler_leaves_out_httpx_request_lines(temp_db):
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.INFO)
+    handler = attach_database_log_handler({'logging': {'database': {'enabled': True, 'flush_interval_seconds': 0.05}}})
+    try:
+        logging.getLogger('httpx').info("HTTP Request: GET https://api.github.com/users/octocat \"HTTP/1.1 200 OK\"")
+        logging.getLogger('src.scanner').info("Scheduled octocat")
+        handler.flush()
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+        handler.close()
+
+    assert logged_messages(temp_db) == [('INFO', "src.scanner - Scheduled octocat")]
@@ -0,0 +1,55 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.membership import MembershipIndex, load_membership_index
+
+
+def test_index_round_trips_through_mmap(tmp_path):
+    path = str(tmp_path / 'membership.idx')
+    index = MembershipIndex.from_logins(f"user{i}" for i in range(5000))
+    index.add('Newcomer')
+    index.save(path)
+
+    loaded = MembershipIndex.load(path)
+    assert 'user42' in loaded
+    assert 'USER4999' in loaded
+    assert 'newcomer' in loaded
+    assert 'user5000' not in loaded
+    assert len(loaded) == 5001
+    loaded.close()
+
+
+def test_load_rebuilds_stale_index_from_database(temp_db, tmp_path):
+    session = temp_db.Session()
+    session.add(temp_db.User(username='followed-user', github_id=1, status='followed'))
+    session.add(temp_db.DisqualifiedUser(username='spammer'))
+    session.commit()
+    session.close()
+    settings = {'membership': {'path': str(tmp_path / 'membership.idx'), 'max_age_hours': 1}}
+
+    index = load_membership_index(settings)
+    assert 'followed-user' in index and 'spammer' in index
+    assert os.path.exists(settings['membership']['path'])
+
+    # A stale file is ignored and rebuilt with the current database contents
+    stale = MembershipIndex.from_logins(['someone-else'])
+    stale.built_at = time.time() - 7200
+    stale.save(settings['membership']['path'])
+    assert 'followed-user' in load_membership_index(settings)
+
+
+def test_skipped_users_expire_from_the_index(temp_db, tmp_path):
+    old = datetime.now(timezone.utc) - timedelta(days=60)
+    session = temp_db.Session()
+    session.add(temp_db.User(username='old-skip', github_id=1, status='skipped', last_scanned_at=old))
+    session.add(temp_db.User(username='new-skip', github_id=2, status='skipped'))
+    session.add(temp_db.User(username='old-follow', github_id=3, status='followed', last_scanned_at=old))
+    session.commit()
+    session.close()
+    settings = {'membership': {'path': str(tmp_path / 'membership.idx'), 'skipped_recheck_days': 30}}
+
+    index = load_membership_index(settings)
+
+    assert 'old-skip' not in index
+    assert 'new-skip' in index and 'old-follow' in index
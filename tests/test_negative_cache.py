@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+from src.github_api import GithubAPI
+from src.negative_cache import NegativeCache, failure_reason
+from src.scanner import process_user
+from src.simulator import FakeGitHub
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, result=None):
+    return await _real_sleep(0, result)
+
+
+def test_failure_reasons():
+    assert failure_reason(404) == 'not_found'
+    assert failure_reason(451) == 'unavailable'
+    assert failure_reason(502) == 'error'
+    assert failure_reason(None) == 'error'
+
+
+def test_repeated_failures_back_off_exponentially(temp_db):
+    cache = NegativeCache({'negative_cache': {'ttl_hours': {'error': 1}, 'backoff_factor': 2}})
+    for _ in range(3):
+        cache.record_failure('flaky', 502)
+
+    session = temp_db.Session()
+    entry = session.query(temp_db.NegativeResult).filter_by(username='flaky').one()
+    session.close()
+    assert entry.failures == 3
+    assert entry.reason == 'error'
+    # 1h, then 2h, then 4h after the last failure
+    assert abs((entry.retry_after - entry.last_failed_at) - timedelta(hours=4)) < timedelta(seconds=1)
+    assert cache.cached(['flaky', 'healthy']) == {'flaky'}
+
+
+def test_process_user_records_missing_accounts(temp_db):
+    api = AsyncMock()
+    api.get_user_details.return_value = (None, 404)
+    cache = NegativeCache()
+
+    assert asyncio.run(process_user('ghost', api, validator=None, negative_cache=cache)) is False
+    assert NegativeCache().cached(['ghost']) == {'ghost'}
+    assert cache.failed == {'ghost'}
+
+
+def test_rate_limited_lookups_are_cached_as_errors(temp_db, monkeypatch):
+    sim = FakeGitHub(num_users=10, secondary_limit_every=1)
+    monkeypatch.setattr('src.github_api.asyncio.sleep', _no_sleep)
+    cache = NegativeCache()
+
+    async def lookup():
+        async with GithubAPI(pat='test', transport=sim.transport()) as api:
+            return await process_user('user1', api, validator=None, negative_cache=cache)
+
+    assert asyncio.run(lookup()) is False
+    session = temp_db.Session()
+    entry = session.query(temp_db.NegativeResult).filter_by(username='user1').one()
+    session.close()
+    assert (entry.reason, entry.status_code) == ('error', 429)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from src.metrics import BotMetrics
+from src.profiler import LoopLagMonitor, SamplingProfiler
+
+
+def test_loop_lag_monitor_reports_the_blocking_coroutine():
+    async def blocking_step():
+        time.sleep(0.3)
+
+    async def main():
+        monitor = LoopLagMonitor(asyncio.get_running_loop(), threshold=0.1, interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(blocking_step())
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(main())
+
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert stall['task'] == 'task:test_loop_lag_monitor_reports_the_blocking_coroutine.<locals>.blocking_step'
+    assert any(label.startswith('blocking_step ') for label in stall['stack'])
+    assert stall['duration'] >= 0.2
+    assert monitor.max_lag >= 0.2
+
+
+def test_sampling_profiler_writes_folded_stacks_rooted_at_tasks(tmp_path):
+    async def busy_worker():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    async def main():
+        profiler = SamplingProfiler(asyncio.get_running_loop(), interval=0.002)
+        profiler.start()
+        await asyncio.create_task(busy_worker(), name='worker')
+        profiler.stop()
+        return profiler
+
+    profiler = asyncio.run(main())
+    path = tmp_path / 'profile.folded'
+    profiler.write_folded(path)
+
+    lines = path.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    worker_stacks = [line for line in lines if line.startswith('task:test_sampling_profiler_writes_folded_stacks_rooted_at_tasks.<locals>.busy_worker;')]
+    assert worker_stacks
+    assert all('busy_worker (test_profiler.py' in line for line in worker_stacks)
+    roots = dict(profiler.task_breakdown())
+    assert roots['task:test_sampling_profiler_writes_folded_stacks_rooted_at_tasks.<locals>.busy_worker'] > 0.5
+
+
+def test_stage_times_accumulate_in_the_summary():
+    metrics = BotMetrics()
+    for _ in range(2):
+        with metrics.stage('scan.validate'):
+            time.sleep(0.01)
+
+    wall, cpu, runs = metrics.stage_times['scan.validate']
+    assert runs == 2
+    assert wall >= 0.02
+    assert cpu >= 0
+    assert 'scan.validate:' in metrics.format_stage_times()
+    assert 'over 2 runs' in metrics.format_stage_times()
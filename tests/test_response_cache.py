@@ -0,0 +1,45 @@
+import asyncio
+
+from src.response_cache import ResponseCache, SingleFlight, request_key
+
+
+def test_followers_receive_the_leaders_exception():
+    calls = 0
+
+    async def failing_call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ConnectionError("reset")
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do('key', failing_call) for _ in range(3)), return_exceptions=True)
+        assert 'key' not in flight
+        return results
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_response_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('src.response_cache.time.monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=10, max_entries=2)
+    key = request_key('GET', '/users/a', {'per_page': 100, 'page': 1})
+
+    cache.put(key, 'a')
+    assert cache.get(request_key('GET', '/users/a', {'page': 1, 'per_page': 100})) == 'a'
+    cache.put('b', 'b')
+    cache.put('c', 'c')
+    assert cache.get(key) is None
+    assert len(cache) == 2
+    now[0] += 11
+    assert cache.get('c') is None
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = ResponseCache(ttl=0)
+    cache.put('key', 'value')
+    assert cache.get('key') is None
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
 from src.scanner import scan_for_users
+from src.membership import MembershipIndex
 
 @pytest.mark.asyncio
 async def test_scan_for_users_pagination():
@@ -10,7 +11,10 @@ async def test_scan_for_users_pagination():
     with patch('src.scanner.GithubAPI') as mock_github_api_cls, \
          patch('src.scanner.load_config') as mock_load_config, \
          patch('src.scanner.UserValidator') as mock_validator, \
-         patch('src.scanner.process_user') as mock_process_user:
+         patch('src.scanner.process_user') as mock_process_user, \
+         patch('src.scanner.get_search_cursor', return_value=None), \
+         patch('src.scanner.load_membership_index', return_value=MembershipIndex.from_logins([])), \
+         patch('src.scanner.load_disqualified_usernames', return_value=set()):
 
         # Setup Mock API
         mock_api = AsyncMock()
@@ -21,8 +25,8 @@ async def test_scan_for_users_pagination():
         mock_api.get_following.return_value = []
         mock_api.get_public_events.return_value = [] # Skip event scanning for this test
 
-        # Mock search_repositories to return empty list (we just want to check calls)
-        mock_api.search_repositories.return_value = []
+        # Mock an empty search result (we just want to check calls)
+        mock_api.search_repositories_page.return_value = ([], 0, (29, None))
 
         # Setup Mock Config
         # minimal config
@@ -37,10 +41,9 @@ async def test_scan_for_users_pagination():
         await scan_for_users(dry_run=True)
 
         # Verification
-        # We expect search_repositories to be called 5 times (pages 1-5) for the single keyword 'portfolio'
-        assert mock_api.search_repositories.call_count == 5
-        
-        # Check arguments for each call
-        calls = mock_api.search_repositories.call_args_list
+        # Page 1 comes back short, so the planner must not request any further pages
+        assert mock_api.search_repositories_page.call_count == 1
+
+        calls = mock_api.search_repositories_page.call_args_list
         pages_requested = [call.kwargs.get('page') for call in calls]
-        assert sorted(pages_requested) == [1, 2, 3, 4, 5]
+        assert pages_requested == [1]
@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from src.github_api import GithubAPI
+from src.search_planner import SearchPlanner, SearchBudget, merge_keywords, build_query, search_window
+from src.simulator import FakeGitHub
+
+
+def test_merge_keywords_drops_subsumed_and_groups():
+    keywords = ['portfolio-website', 'developer-portfolio', 'portfolio', 'showcase', 'resume', 'cv', 'my-site', 'blog', 'Resume']
+
+    assert merge_keywords(keywords, max_terms=4) == [['portfolio', 'showcase', 'resume', 'cv'], ['my-site', 'blog']]
+
+
+def test_build_query_quotes_multi_token_terms():
+    start, end = datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 15, tzinfo=timezone.utc)
+
+    assert build_query(['portfolio', 'my-site'], start, end, 'in:name') == \
+        'portfolio OR "my-site" in:name created:2026-01-01T00:00:00Z..2026-01-15T00:00:00Z'
+
+
+@pytest.mark.asyncio
+async def test_planner_stops_on_short_page():
+    sim = FakeGitHub(num_users=1000, search_total=250)
+    owners = set()
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        planner = SearchPlanner(api)
+        start, end = search_window(14, now=sim.now)
+        seen = await planner.search(['portfolio'], start, end, '', lambda repo: owners.add(repo['owner']['login']))
+
+    assert seen == 250
+    assert planner.pages_fetched == 3
+    assert planner.shards == 0
+
+
+@pytest.mark.asyncio
+async def test_planner_shards_windows_over_the_result_cap():
+    sim = FakeGitHub(num_users=5000, search_total=3000)
+    ids = set()
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        planner = SearchPlanner(api)
+        start, end = search_window(14, now=sim.now)
+        await planner.search(['portfolio'], start, end, '', lambda repo: ids.add(repo['id']))
+
+    assert len(ids) == 3000
+    assert planner.shards >= 2
+
+
+@pytest.mark.asyncio
+async def test_search_budget_waits_only_when_exhausted(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr('src.search_planner.asyncio.sleep', fake_sleep)
+    budget = SearchBudget(reserve=1)
+    budget.update(3, None)
+    await budget.acquire()
+    budget.update(1, int(datetime.now(timezone.utc).timestamp()) + 30)
+    await budget.acquire()
+
+    assert len(sleeps) == 1 and 29 <= sleeps[0] <= 32
@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from src.github_api import GithubAPI
+from src.metrics import metrics_tracker, counting_api_calls
+from src.scanner import scan_for_users
+from src.simulator import FakeGitHub
+
+_real_sleep = asyncio.sleep
+
+
+async def _no_sleep(delay, result=None):
+    return await _real_sleep(0, result)
+
+
+@pytest.mark.asyncio
+async def test_paginated_following_follows_link_headers():
+    sim = FakeGitHub(num_users=500, following=250)
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        following = await api.get_following(sim.auth_user)
+
+    assert len(following) == 250
+    assert sim.requests['get_following'] == 3
+
+
+@pytest.mark.asyncio
+async def test_check_is_follower_asks_whether_the_user_follows_the_bot():
+    sim = FakeGitHub(num_users=10, following=10, followers=2)
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        with counting_api_calls() as calls:
+            assert await api.check_is_follower(sim.login(1), me=sim.auth_user)
+            assert not await api.check_is_follower(sim.login(5), me=sim.auth_user)
+            assert not await api.check_is_follower(sim.login(5), me=sim.auth_user)
+
+    # The repeated 404 is served from the response cache
+    assert calls.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_secondary_rate_limit_is_retried_after_retry_after(monkeypatch):
+    sim = FakeGitHub(num_users=10, secondary_limit_every=2, retry_after=7)
+    delays = []
+
+    async def record_sleep(delay, result=None):
+        delays.append(delay)
+        return await _real_sleep(0, result)
+
+    monkeypatch.setattr('src.github_api.asyncio.sleep', record_sleep)
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        assert (await api.get_user_details('user0'))['login'] == 'user0'
+        assert (await api.get_user_details('user1'))['login'] == 'user1'
+        assert api.limiter.limit == 4
+
+    assert sim.secondary_limited == 1
+    assert delays == [7]
+
+
+@pytest.mark.asyncio
+async def test_secondary_rate_limit_returns_403_once_retries_run_out(monkeypatch):
+    sim = FakeGitHub(num_users=10, secondary_limit_every=1)
+    monkeypatch.setattr('src.github_api.asyncio.sleep', _no_sleep)
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        assert await api.get_user_details('user1') is None
+
+    assert sim.secondary_limited == api.max_retries + 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_gets_share_one_request(monkeypatch):
+    sim = FakeGitHub(num_users=10, latency=0.01)
+    monkeypatch.setattr(metrics_tracker, 'api_coalesced', 0)
+    monkeypatch.setattr(metrics_tracker, 'api_cache_hits', 0)
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        results = await asyncio.gather(*(api.get_user_details('user1') for _ in range(5)))
+        again = await api.get_user_details('user1')
+        missing = await api.get_user_details('nobody', with_status=True)
+        missing_again = await api.get_user_details('nobody', with_status=True)
+
+    assert all(user['login'] == 'user1' for user in results + [again])
+    assert missing == missing_again == (None, 404)
+    assert sim.requests['get_user'] == 2
+    assert metrics_tracker.api_coalesced == 4
+    assert metrics_tracker.api_cache_hits == 2
+
+
+@pytest.mark.asyncio
+async def test_scan_for_users_end_to_end(temp_db, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    sim = FakeGitHub(num_users=200, search_total=200)
+    monkeypatch.setattr(GithubAPI, 'transport', sim.transport())
+    monkeypatch.setenv('GITHUB_PAT', 'test')
+    monkeypatch.setattr(metrics_tracker, 'users_scheduled', 0)
+    settings = {'limits': {'max_follow': 1000}}
+    criteria = {'repository_keywords': ['portfolio'], 'target_repos': ['org/repo'],
+                'negative_signals': {'max_followers': 100}}
+
+    with patch('src.scanner.load_config', return_value=(settings, criteria)), patch('asyncio.sleep', _no_sleep):
+        await scan_for_users(dry_run=False)
+
+    scheduled = temp_db.get_users_by_status_and_score('targeted', min_score=0, limit=1000)
+    assert metrics_tracker.users_scheduled == len(scheduled) > 0
+    assert sim.requests['get_user'] > 0
+    stats = temp_db.get_source_stats()
+    assert sum(stat['scheduled'] for stat in stats.values()) == len(scheduled)
+    assert stats['keyword:portfolio']['api_calls'] > stats['keyword:portfolio']['scheduled']
+    assert stats['repo:org/repo']['api_calls'] >= 1
+
+
+@pytest.mark.asyncio
+async def test_second_scan_searches_incrementally(temp_db, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    sim = FakeGitHub(num_users=3000, search_total=2500)
+    monkeypatch.setattr(GithubAPI, 'transport', sim.transport())
+    monkeypatch.setenv('GITHUB_PAT', 'test')
+    settings = {'limits': {'max_follow': 0}}
+    criteria = {'repository_keywords': ['portfolio'], 'negative_signals': {'max_followers': 100}}
+
+    with patch('src.scanner.load_config', return_value=(settings, criteria)), patch('asyncio.sleep', _no_sleep):
+        await scan_for_users(dry_run=False)
+        first_run = sim.requests['search_repositories']
+        await scan_for_users(dry_run=False)
+
+    cursor = temp_db.get_search_cursor('portfolio')
+    assert cursor['newest_created_at'] == sim.now
+    assert first_run > 3
+    # Nothing was created since the first run, so one page confirms there is nothing new
+    assert sim.requests['search_repositories'] - first_run == 1
+
+
+@pytest.mark.asyncio
+async def test_commit_counts_go_through_the_limiter_and_counters():
+    sim = FakeGitHub(num_users=10)
+    repos = [{'name': f"repo{i}", 'owner': {'login': 'user1'}} for i in range(5)]
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        acquired = 0
+        acquire = api.limiter.acquire
+
+        async def counting_acquire():
+            nonlocal acquired
+            acquired += 1
+            await acquire()
+
+        api.limiter.acquire = counting_acquire
+        with counting_api_calls() as calls:
+            await api.add_commit_counts(repos)
+
+    assert [repo['commits_count'] for repo in repos] == [3] * 5
+    assert calls.calls == acquired == 5
+
+
+@pytest.mark.asyncio
+async def test_only_point_resources_are_cached():
+    sim = FakeGitHub(num_users=300, following=150, search_total=50)
+
+    async with GithubAPI(pat='test', transport=sim.transport()) as api:
+        await api.get_user_details('user1')
+        await api.get_following(sim.auth_user)
+        await api.search_repositories('portfolio', 30)
+        cached = len(api.response_cache)
+
+    assert cached == 1
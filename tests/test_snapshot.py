@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+from src import snapshot
+
+
+def _add_user(db, username, status='targeted'):
+    session = db.Session()
+    session.add(db.User(username=username, github_id=hash(username) % 10**9, status=status,
+                        followed_at=datetime(2026, 1, 2, 3, 4, 5)))
+    session.commit()
+    session.close()
+
+
+def test_export_writes_base_then_small_deltas(temp_db, tmp_path):
+    state_dir = str(tmp_path / 'state')
+    _add_user(temp_db, 'alice')
+    _add_user(temp_db, 'bob')
+
+    assert snapshot.export_state(state_dir).startswith('base-')
+    assert snapshot.export_state(state_dir, compact_ratio=100) is None
+
+    temp_db.update_user_status('alice', 'followed')
+    temp_db.update_user_status('bob', 'unfollowed')
+    temp_db.update_repo_last_scanned_at('org/repo', datetime(2026, 1, 1))
+    delta = snapshot.export_state(state_dir, compact_ratio=100)
+
+    assert delta.startswith('delta-')
+    entries = list(snapshot._iter_entries(state_dir, {'deltas': [delta]}))
+    assert sorted((e['t'], e['op']) for e in entries) == [('repo_state', 'u'), ('users', 'd'), ('users', 'u')]
+
+
+def test_restore_rebuilds_database_from_chain(temp_db, tmp_path):
+    state_dir = str(tmp_path / 'state')
+    _add_user(temp_db, 'alice')
+    _add_user(temp_db, 'bob')
+    snapshot.export_state(state_dir)
+    temp_db.update_user_status('alice', 'followed')
+    temp_db.update_user_status('bob', 'unfollowed')
+    temp_db.add_disqualified_user('carol')
+    snapshot.export_state(state_dir, compact_ratio=100)
+    expected = temp_db.get_user_data_from_db('alice')
+
+    temp_db.use_database(str(tmp_path / 'restored.db'))
+    snapshot.restore_state(state_dir)
+
+    assert temp_db.get_all_usernames_in_db() == {'alice'}
+    assert temp_db.get_user_data_from_db('alice') == expected
+    session = temp_db.Session()
+    assert [u.username for u in session.query(temp_db.DisqualifiedUser)] == ['carol']
+    session.close()
+
+
+def test_compaction_folds_deltas_into_new_base(temp_db, tmp_path):
+    state_dir = str(tmp_path / 'state')
+    _add_user(temp_db, 'alice')
+    snapshot.export_state(state_dir, compact_every=2, compact_ratio=100)
+    _add_user(temp_db, 'bob')
+    snapshot.export_state(state_dir, compact_every=2, compact_ratio=100)
+    _add_user(temp_db, 'carol')
+    name = snapshot.export_state(state_dir, compact_every=2, compact_ratio=100)
+
+    manifest = snapshot._read_manifest(state_dir)
+    assert name == manifest['base'] and manifest['deltas'] == []
+    assert sorted(os.listdir(state_dir)) == sorted([manifest['base'], snapshot.MANIFEST])
+
+
+def test_restore_is_needed_only_without_a_database_file(temp_db, tmp_path):
+    state_dir = str(tmp_path / 'state')
+    _add_user(temp_db, 'alice')
+    snapshot.export_state(state_dir)
+    settings = {'snapshot': {'dir': state_dir}}
+
+    assert snapshot.restore_state_if_needed(settings) == 0
+    temp_db.use_database(str(tmp_path / 'fresh.db'))
+    assert snapshot.restore_state_if_needed(settings) == 1
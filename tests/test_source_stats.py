@@ -0,0 +1,70 @@
+import asyncio
+import random
+
+from src.database import get_source_stats, record_source_stats
+from src.metrics import counting_api_calls, metrics_tracker
+from src.source_stats import SourceAllocator, SourceTally
+
+
+def test_allocator_runs_high_yield_sources_first_and_skips_dry_ones():
+    stats = {
+        'keyword:portfolio': {'scheduled': 60, 'api_calls': 300},
+        'keyword:resume': {'scheduled': 0, 'api_calls': 2000},
+        'repo:a/b': {'scheduled': 30, 'api_calls': 200},
+        'repo:c/d': {'scheduled': 1, 'api_calls': 1500},
+        'public_events': {'scheduled': 40, 'api_calls': 150},
+    }
+    allocator = SourceAllocator(stats, {'source_allocation': {'min_sources': 0}}, rng=random.Random(1))
+
+    selected, skipped = allocator.plan({
+        'keyword': ['keyword:resume', 'keyword:portfolio'],
+        'repo': ['repo:c/d', 'repo:a/b'],
+        'public_events': ['public_events'],
+    })
+
+    assert selected == {'keyword': ['keyword:portfolio'], 'repo': ['repo:a/b'], 'public_events': ['public_events']}
+    assert sorted(skipped) == ['keyword:resume', 'repo:c/d']
+
+
+def test_allocator_keeps_a_minimum_per_group_and_explores_unseen_sources():
+    stats = {'keyword:resume': {'scheduled': 0, 'api_calls': 2000}, 'keyword:portfolio': {'scheduled': 60, 'api_calls': 300}}
+    allocator = SourceAllocator(stats, {'source_allocation': {'min_sources': 1}}, rng=random.Random(3))
+
+    runs = [allocator.plan({'keyword': ['keyword:resume', 'keyword:new']})[0]['keyword'] for _ in range(50)]
+
+    assert all(len(run) >= 1 for run in runs)
+    assert sum('keyword:new' in run for run in runs) > sum('keyword:resume' in run for run in runs)
+
+
+def test_record_source_stats_decays_older_runs(temp_db):
+    record_source_stats({'keyword:portfolio': {'api_calls': 100, 'candidates': 50, 'disqualified': 40, 'scheduled': 10}})
+    record_source_stats({'public_events': {'api_calls': 10, 'scheduled': 2}}, decay=0.5)
+
+    stats = get_source_stats()
+    assert stats['keyword:portfolio'] == {'api_calls': 50.0, 'candidates': 25.0, 'disqualified': 20.0, 'scheduled': 5.0, 'runs': 1}
+    assert stats['public_events']['scheduled'] == 2.0
+    assert stats['public_events']['runs'] == 1
+
+
+def test_api_calls_are_counted_per_task(monkeypatch):
+    monkeypatch.setattr(metrics_tracker, 'api_requests', 0)
+    tally = SourceTally()
+
+    async def fake_requests(n):
+        for _ in range(n):
+            metrics_tracker.increment_api_requests()
+            await asyncio.sleep(0)
+
+    async def main():
+        with counting_api_calls() as background:
+            task = asyncio.create_task(fake_requests(3))
+        with counting_api_calls() as foreground:
+            await fake_requests(2)
+        await task
+        return background.calls, foreground.calls
+
+    assert asyncio.run(main()) == (3, 2)
+    tally.add_found({'alice': 'public_events', 'bob': 'public_events', 'carol': 'keyword:portfolio'})
+    tally.record_outcome('public_events', True, api_calls=4)
+    tally.record_outcome('public_events', False, api_calls=1, failed=True)
+    assert tally.as_dict()['public_events'] == {'api_calls': 5, 'candidates': 2, 'disqualified': 0, 'scheduled': 1}
@@ -0,0 +1,60 @@
+import asyncio
+
+from src import trace_viewer
+from src.db_executor import run_db
+from src.tracing import JsonlSink, tracer
+
+
+def test_spans_link_parents_across_tasks_and_the_db_thread(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracer, 'sink', None)
+    monkeypatch.setattr(tracer, 'sample_rate', 1.0)
+    tracer.configure(JsonlSink(str(path), batch_size=2), sample_rate=1.0)
+
+    def save_user(username):
+        return username
+
+    async def fetch(username):
+        with tracer.span('http', method='GET', url=f"/users/{username}") as span:
+            await asyncio.sleep(0)
+            span.set(status_code=200)
+
+    async def candidate(username, source):
+        with tracer.span('candidate', candidate=username, source=source):
+            await fetch(username)
+            await run_db(save_user, username)
+
+    async def main():
+        await asyncio.gather(candidate('alice', 'keyword:portfolio'), candidate('bob', 'public_events'))
+
+    asyncio.run(main())
+    tracer.close()
+
+    spans = trace_viewer.load_spans(path)
+    assert len(spans) == 6
+    roots = {s['attrs']['candidate']: s for s in spans if s['name'] == 'candidate'}
+    assert roots['alice']['trace_id'] != roots['bob']['trace_id']
+    for root in roots.values():
+        children = [s for s in spans if s['parent_id'] == root['span_id']]
+        assert sorted(s['name'] for s in children) == ['db.save_user', 'http']
+        assert all(s['trace_id'] == root['trace_id'] for s in children)
+
+    trace_viewer.print_report(spans, top=5)
+    out = capsys.readouterr().out
+    assert '6 spans in 2 traces' in out
+    assert 'candidate > http GET /users/{user}' in out
+    assert 'keyword:portfolio' in out
+
+
+def test_unsampled_traces_write_nothing(tmp_path, monkeypatch):
+    path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracer, 'sink', None)
+    monkeypatch.setattr(tracer, 'sample_rate', 1.0)
+    tracer.configure(JsonlSink(str(path)), sample_rate=0.0)
+
+    with tracer.span('candidate', candidate='alice'):
+        with tracer.span('http'):
+            pass
+    tracer.close()
+
+    assert not path.exists()
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+from src.scoring import UserValidator
+
+NOW = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _profile(**overrides):
+    return {'login': 'dev', 'type': 'User', 'followers': 5, 'following': 5, 'updated_at': NOW, **overrides}
+
+
+def _api():
+    api = AsyncMock()
+    api.get_user_events.return_value = [{'created_at': NOW}]
+    api.get_user_organizations.return_value = [{'login': 'BigCorp'}]
+    api.get_user_repos.return_value = [{'name': 'site', 'stargazers_count': 3}]
+    return api
+
+
+def test_default_criteria_need_no_enrichment():
+    validator = UserValidator({'negative_signals': {'max_followers': 100}})
+    assert validator.stages == []
+
+
+def test_cascade_stops_at_first_failing_stage_and_skips_later_fetches():
+    validator = UserValidator({'negative_signals': {
+        'max_event_inactivity_days': 30, 'exclude_orgs': ['bigcorp'], 'min_total_commits': 10}})
+    api = _api()
+
+    assert validator.is_disqualified(_profile()) == (False, None)
+    result = asyncio.run(validator.evaluate_enrichment(api, _profile()))
+
+    assert result == (True, "Member of an excluded organization")
+    api.get_user_repos.assert_not_called()
+    api.add_commit_counts.assert_not_called()
+    assert validator.stage_stats['profile'] == {'evaluated': 1, 'disqualified': 0}
+    assert validator.stage_stats['events'] == {'evaluated': 1, 'disqualified': 0}
+    assert validator.stage_stats['orgs'] == {'evaluated': 1, 'disqualified': 1}
+    assert validator.stage_stats['repos']['evaluated'] == 0
+
+
+def test_comprehensive_data_with_validator_fetches_lazily():
+    from src.github_api import GithubAPI
+
+    validator = UserValidator({'negative_signals': {'max_followers': 10, 'exclude_orgs': ['bigcorp']}})
+    api = AsyncMock()
+    api.get_user_details.return_value = _profile(followers=500)
+
+    result = asyncio.run(GithubAPI.get_comprehensive_user_data(api, 'dev', validator=validator))
+
+    assert result[0]['login'] == 'dev'
+    assert result[1:] == (None, None, None, None, None)
+    api.get_user_organizations.assert_not_called()
+    assert validator.stage_stats['profile']['disqualified'] == 1